@@ -0,0 +1,1000 @@
+"""Assignment 2 - Tree Backend Tests
+
+=== Module Description ===
+This module contains tests for the ways of storing and changing a tree for
+the treemap visualiser: the layout of the nodes of an AbstractTree, its
+treemap layouts, squarified or not, how they are brought up to date and
+cached, its colours
+and paths, batches of changes, undoing changes and compaction, and the
+alternative trees and their vectorised layout, each of which is checked
+against a FileSystemTree with the same nodes, which it must behave exactly
+like, and the histogram the visualiser times its updates with.
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from hypothesis import given
+from hypothesis.strategies import integers, lists, tuples, sampled_from
+
+from tree_data import AbstractTree, FileSystemTree, _NO_SUBTREES
+from population import PopulationTree
+from lazy_tree import LazyFileSystemTree, lazy_scan
+from file_scanner import flatten_tree
+from tree_snapshot import save_snapshot
+from array_tree import ArrayTree, array_tree_from_tree, scan_array_tree, \
+    load_array_snapshot
+from tree_colour import PathColours, ExtensionColours, DepthColours
+from tree_paths import PathTable
+from tree_journal import TreeJournal
+from tree_layout import LayoutCache
+import tree_squarify
+import array_layout
+from array_layout import VectorisedNode, leaf_rect_arrays
+from latency_histogram import LatencyHistogram, BUCKETS
+from a2_scanners_test import EXAMPLE_LAYOUT, _make_layout
+
+
+def _make_tree(folder_sizes):
+    """Return a FileSystemTree with one folder for each list of file sizes
+    in <folder_sizes>, and a file of size 3 next to the folders.
+
+    @type folder_sizes: list[list[int]]
+    @rtype: FileSystemTree
+    """
+    folders = list()
+    for i, sizes in enumerate(folder_sizes):
+        files = [FileSystemTree('f' + str(j), [], size)
+                 for j, size in enumerate(sizes)]
+        folders.append(FileSystemTree('d' + str(i), files))
+    return FileSystemTree('root', folders + [FileSystemTree('g', [], 3)])
+
+
+def _rects(tree, rect):
+    """Return the rectangles of the treemap of <tree>, without colours.
+
+    @type tree: AbstractTree | ArrayNode
+    @type rect: (int, int, int, int)
+    @rtype: list[(int, int, int, int)]
+    """
+    return [leaf_rect for leaf_rect, _ in tree.generate_treemap(rect)]
+
+
+class NodeLayoutTest(unittest.TestCase):
+    def test_no_dict(self):
+        for leaf in [FileSystemTree('f', [], 5),
+                     PopulationTree(False, 'Japan', [], 12),
+                     LazyFileSystemTree('d', 5, None, 'd')]:
+            self.assertFalse(hasattr(leaf, '__dict__'))
+            with self.assertRaises(AttributeError):
+                leaf.size = 5
+
+    def test_leaves_share_subtrees(self):
+        tree = _make_tree([[15, 5], [], [10]])
+        leaves = [tree._subtrees[0]._subtrees[0], tree._subtrees[1],
+                  tree._subtrees[3]]
+        for leaf in leaves:
+            self.assertIs(leaf._subtrees, _NO_SUBTREES)
+            self.assertEqual(leaf._subtrees, [])
+        with self.assertRaises(TypeError):
+            leaves[0]._subtrees.append(FileSystemTree('g', [], 1))
+        self.assertEqual(len(_NO_SUBTREES), 0)
+
+    def test_add_subtree_to_leaf(self):
+        tree = _make_tree([[15, 5], []])
+        folder = tree._subtrees[1]
+        folder._add_subtree(FileSystemTree('g', [], 4))
+        self.assertEqual([subtree._root for subtree in folder._subtrees],
+                         ['g'])
+        self.assertEqual((folder.data_size, tree.data_size), (4, 27))
+        self.assertIs(tree._subtrees[2]._subtrees, _NO_SUBTREES)
+        self.assertEqual(len(_NO_SUBTREES), 0)
+
+    def test_names_interned(self):
+        first = FileSystemTree(os.path.join('a', '__init__.py'), [], 1)
+        second = FileSystemTree(''.join(['__init', '__.py']), [], 2)
+        self.assertIs(first._root, second._root)
+
+
+class TreeLayoutTest(unittest.TestCase):
+    @given(lists(lists(integers(0, 1000), max_size=8), max_size=8),
+           integers(0, 1200), integers(0, 900))
+    def test_views(self, folder_sizes, width, height):
+        tree = _make_tree(folder_sizes)
+        rect = (0, 0, width, height)
+        leaf_rects = list(tree._leaf_rects(rect))
+        layout = tree.layout(rect)
+        self.assertEqual(layout.rect, rect)
+        self.assertEqual(len(layout), len(leaf_rects))
+        self.assertEqual(list(layout), leaf_rects)
+        self.assertEqual(layout.treemap(),
+                         [(leaf_rect, leaf.colour)
+                          for leaf, leaf_rect in leaf_rects])
+        self.assertEqual(tree.generate_treemap(rect), layout.treemap())
+        self.assertEqual(layout.rect_dict(), dict(
+            (leaf_rect, leaf) for leaf, leaf_rect in leaf_rects))
+        self.assertEqual(tree.rect_dict(rect), layout.rect_dict())
+
+    @given(lists(lists(integers(0, 1000), max_size=8), max_size=8),
+           integers(0, 1200), integers(0, 1000))
+    def test_leaf_at(self, folder_sizes, x, y):
+        tree = _make_tree(folder_sizes)
+        for layout in (tree.layout((0, 0, 1024, 738)),
+                       tree.layout((0, 0, 1024, 738), squarified=True),
+                       tree.layout((10, 20, 300, 200), 100)):
+            # The leaf whose pixels, as pygame draws them, include (x, y).
+            expected = [leaf for leaf, (left, top, width, height) in layout
+                        if left <= x < left + width and
+                        top <= y < top + height]
+            self.assertLessEqual(len(expected), 1)
+            self.assertIs(layout.leaf_at((x, y)),
+                          expected[0] if expected else None)
+
+    def test_leaf_at_after_change(self):
+        tree = _make_tree([[15, 5, 10]])
+        layout = tree.layout((0, 0, 800, 1000))
+        first = tree._subtrees[0]._subtrees[0]
+        self.assertIs(layout.leaf_at((0, 0)), first)
+        # A leaf which has been deleted is no longer found.
+        parent = first._parent_tree
+        first.del_leaf()
+        tree.relayout(layout, parent)
+        self.assertIs(layout.leaf_at((0, 0)), parent._subtrees[1])
+        # Nor are leaves with no area.
+        layout = tree.layout((0, 0, 800, 0))
+        self.assertEqual(len(layout), 3)
+        self.assertIsNone(layout.leaf_at((0, 0)))
+
+    def test_leaf_at_wide_folder(self):
+        tree = _make_tree([[1 + i % 7 for i in range(3000)], [4, 0, 2]])
+        for squarified in (False, True):
+            layout = tree.layout((0, 0, 300, 200), squarified=squarified)
+            for x in range(0, 300, 7):
+                for y in range(0, 200, 11):
+                    self.assertIs(layout.leaf_at((x, y)),
+                                  layout._scan_for_leaf((x, y)))
+            # The index of the wide folder is kept while only another
+            # folder changes.
+            wide, other = tree._subtrees[0], tree._subtrees[1]
+            other._subtrees[0].del_leaf()
+            tree.relayout(layout, other)
+            self.assertIn(wide, layout._indexes)
+            for x in range(0, 300, 7):
+                for y in range(0, 200, 11):
+                    self.assertIs(layout.leaf_at((x, y)),
+                                  layout._scan_for_leaf((x, y)))
+
+    def test_array_tree(self):
+        tree = _make_tree([[15, 5, 10], [], [0, 7]])
+        rect = (0, 0, 800, 1000)
+        expected = tree.layout(rect)
+        layout = array_tree_from_tree(tree).root().layout(rect)
+        self.assertEqual(layout.treemap(), expected.treemap())
+        self.assertEqual(layout.leaf_at((400, 999)).get_separator(),
+                         expected.leaf_at((400, 999)).get_separator())
+
+    def test_leaf_at_without_numpy(self):
+        tree = _make_tree([[15, 5, 10], [], [0, 7]])
+        layout = array_tree_from_tree(tree).root().layout((0, 0, 800, 1000))
+        with mock.patch.dict('sys.modules', {'numpy': None}):
+            leaf = layout.leaf_at((400, 999))
+        self.assertIsNone(layout._labels)
+        self.assertEqual(leaf.get_separator(),
+                         tree.layout((0, 0, 800, 1000)).leaf_at(
+                             (400, 999)).get_separator())
+
+    def test_colours_not_laid_out(self):
+        tree = _make_tree([[15, 5, 10]])
+        layout = tree.layout((0, 0, 800, 1000))
+        old_policy = AbstractTree.colour_policy
+        AbstractTree.colour_policy = DepthColours()
+        try:
+            self.assertEqual(layout.treemap(),
+                             tree.generate_treemap((0, 0, 800, 1000)))
+        finally:
+            AbstractTree.colour_policy = old_policy
+
+    @given(lists(lists(integers(0, 1000), max_size=6), max_size=6),
+           lists(lists(integers(0, 1000), max_size=6), max_size=6),
+           lists(tuples(integers(0, 80),
+                        sampled_from(['up', 'down', 'delete', 'undo'])),
+                 max_size=20),
+           integers(0, 1200), integers(0, 900),
+           sampled_from([0, 1, 100, 10000]))
+    def test_relayout(self, first, second, changes, width, height,
+                      min_area):
+        tree = FileSystemTree('top', [
+            _make_tree(first), FileSystemTree('mid', [_make_tree(second)]),
+            FileSystemTree('h', [], 1)])
+        rect = (0, 0, width, height)
+        layout = tree.layout(rect, min_area)
+        journal = TreeJournal()
+        leaves = _leaves(tree)
+        for index, change in changes:
+            leaf = leaves[index % len(leaves)]
+            if change == 'undo':
+                node = journal.undo()
+            elif leaf.is_empty():
+                continue
+            elif change == 'delete':
+                node = leaf._parent_tree
+                journal.del_leaf(leaf)
+            else:
+                node = leaf
+                journal.alt_size(leaf, change == 'up')
+            tree.relayout(layout, node)
+            self.assertEqual(list(layout), list(tree.layout(rect, min_area)))
+            for pos in ((width // 3, height // 2), (width - 1, height - 1)):
+                self.assertIs(layout.leaf_at(pos),
+                              layout._scan_for_leaf(pos))
+
+    @given(lists(lists(integers(0, 1000), max_size=8), max_size=8),
+           integers(0, 1200), integers(0, 900), integers(0, 10000))
+    def test_level_of_detail(self, folder_sizes, width, height, min_area):
+        tree = _make_tree(folder_sizes)
+        rect = (0, 0, width, height)
+        layout = tree.layout(rect, min_area)
+        self.assertEqual(layout.min_area, min_area)
+        # Every leaf is still shown, either itself or in the block of a
+        # folder it is in.
+        shown = set(layout._leaves)
+        for leaf, _ in tree.layout(rect):
+            node = leaf
+            while node is not None and node not in shown:
+                node = node._parent_tree
+            self.assertIsNotNone(node)
+        for node, node_rect in layout:
+            if node._subtrees:
+                self.assertLess(node_rect[2] * node_rect[3], min_area)
+        # The same blocks as for the same ArrayTree.
+        array_tree = array_tree_from_tree(tree)
+        self.assertEqual(
+            [(node.get_separator(), node_rect) for node, node_rect in layout],
+            [(node.get_separator(), node_rect) for node, node_rect in
+             array_tree.root().layout(rect, min_area)])
+
+    def test_relayout_other_tree(self):
+        tree = _make_tree([[15, 5, 10]])
+        layout = tree.layout((0, 0, 800, 1000))
+        leaf = tree._subtrees[0]._subtrees[0]
+        leaf.del_leaf()
+        tree.relayout(layout, leaf)
+        self.assertEqual(list(layout), list(tree.layout((0, 0, 800, 1000))))
+
+    def test_relayout_array_tree(self):
+        root = array_tree_from_tree(_make_tree([[15, 5, 10]])).root()
+        layout = root.layout((0, 0, 800, 1000))
+        leaf = root._subtrees[0]._subtrees[0]
+        leaf.alt_size(positive=False)
+        root.relayout(layout, leaf)
+        self.assertEqual(layout.treemap(),
+                         root.generate_treemap((0, 0, 800, 1000)))
+
+
+class LayoutCacheTest(unittest.TestCase):
+    @given(lists(lists(integers(0, 1000), max_size=6), max_size=6),
+           lists(tuples(integers(0, 80), integers(0, 3),
+                        sampled_from(['up', 'down', 'delete', 'undo',
+                                      'redo'])),
+                 max_size=20),
+           sampled_from([0, 100]))
+    def test_up_to_date(self, folder_sizes, changes, min_area):
+        tree = FileSystemTree('top', [
+            _make_tree(folder_sizes), FileSystemTree('h', [], 1)])
+        rect = (0, 0, 1024, 738)
+        # The folders which can be zoomed into.
+        folders = [tree, tree._subtrees[0]] + [
+            folder for folder in tree._subtrees[0]._subtrees
+            if folder._subtrees]
+        cache = LayoutCache()
+        journal = TreeJournal()
+        leaves = _leaves(tree)
+        for index, shown, change in changes:
+            # Change a leaf while some folder is shown, which may or may not
+            # be one of its ancestors.
+            root = folders[shown % len(folders)]
+            layout = cache.layout(root, rect, min_area)
+            leaf = leaves[index % len(leaves)]
+            if change == 'undo':
+                node = journal.undo()
+            elif change == 'redo':
+                node = journal.redo()
+            elif leaf.is_empty():
+                continue
+            elif change == 'delete':
+                node = leaf._parent_tree
+                journal.del_leaf(leaf)
+            else:
+                node = leaf
+                journal.alt_size(leaf, change == 'up')
+            cache.relayout(layout, root, node)
+            # Every layout still kept is up to date.
+            for folder in folders:
+                self.assertEqual(list(cache.layout(folder, rect, min_area)),
+                                 list(folder.layout(rect, min_area)))
+
+    def test_kept_until_changed(self):
+        tree = _make_tree([[15, 5, 10], [7]])
+        first, second = tree._subtrees[:2]
+        cache = LayoutCache()
+        rect = (0, 0, 800, 1000)
+        layouts = [cache.layout(node, rect) for node in (tree, first, second)]
+        self.assertEqual(len(cache), 3)
+        # Zooming back into a folder does not lay it out again.
+        with mock.patch.object(FileSystemTree, 'layout') as layout:
+            self.assertIs(cache.layout(first, rect), layouts[1])
+            self.assertIs(cache.layout(tree, rect), layouts[0])
+            self.assertFalse(layout.called)
+        # A change to <first> leaves the layout of <second> alone.
+        journal = TreeJournal()
+        journal.alt_size(first._subtrees[0])
+        cache.relayout(layouts[1], first, first._subtrees[0])
+        self.assertIs(cache.layout(first, rect), layouts[1])
+        self.assertIs(cache.layout(second, rect), layouts[2])
+        self.assertIsNot(cache.layout(tree, rect), layouts[0])
+
+    def test_budget(self):
+        tree = _make_tree([[15, 5, 10], [7, 1], [1]])
+        rect = (0, 0, 800, 1000)
+        cache = LayoutCache(budget=6)
+        layout = cache.layout(tree, rect)
+        self.assertEqual(len(layout), 7)
+        self.assertEqual(len(cache), 0)
+        folders = tree._subtrees[:3]
+        layouts = [cache.layout(folder, rect) for folder in folders]
+        self.assertEqual(len(cache), 3)
+        # Using the first folder again makes the second the least recently
+        # used, so it is dropped to make room.
+        cache.layout(folders[0], rect)
+        cache.layout(tree._subtrees[3], rect)
+        self.assertEqual(len(cache), 3)
+        self.assertIs(cache.layout(folders[0], rect), layouts[0])
+        self.assertIs(cache.layout(folders[2], rect), layouts[2])
+        self.assertIsNot(cache.layout(folders[1], rect), layouts[1])
+
+    def test_lazy_folder_expanded(self):
+        tmp = tempfile.mkdtemp()
+        try:
+            with open(os.path.join(tmp, 'big.txt'), 'w') as f:
+                f.truncate(1000000)
+            os.makedirs(os.path.join(tmp, 'small', 'sub'))
+            with open(os.path.join(tmp, 'small', 'sub', 'f.txt'), 'w') as f:
+                f.write('x' * 10)
+            tree = lazy_scan(tmp)
+            rect = (0, 0, 800, 1000)
+            cache = LayoutCache()
+            layout = cache.layout(tree, rect)
+            folder = [subtree for subtree in tree._subtrees
+                      if isinstance(subtree, LazyFileSystemTree)][0]
+            self.assertIn(folder, layout._leaves)
+            # Zooming into the folder expands it, so the layout of the whole
+            # tree has to be made again.
+            cache.layout(folder, rect)
+            self.assertNotIn(folder, tree.layout(rect)._leaves)
+            self.assertEqual(list(cache.layout(tree, rect)),
+                             list(tree.layout(rect)))
+        finally:
+            shutil.rmtree(tmp)
+
+    def test_labels_counted(self):
+        root = array_tree_from_tree(_make_tree([[15, 5, 10]])).root()
+        rect = (0, 0, 80, 30)
+        cache = LayoutCache(budget=100)
+        layout = cache.layout(root, rect)
+        self.assertEqual(layout.cost(), len(layout) + 80)
+        self.assertEqual(len(cache), 1)
+        cache.layout(root._subtrees[0], rect)
+        self.assertEqual(len(cache), 1)
+        self.assertIsNot(cache.layout(root, rect), layout)
+
+    def test_array_tree(self):
+        root = array_tree_from_tree(_make_tree([[15, 5, 10], [7]])).root()
+        rect = (0, 0, 800, 1000)
+        cache = LayoutCache()
+        folder = root._subtrees[1]
+        layout = cache.layout(folder, rect)
+        leaf = root._subtrees[0]._subtrees[0]
+        leaf.alt_size(positive=False)
+        cache.relayout(layout, folder, leaf)
+        self.assertIs(cache.layout(folder, rect), layout)
+        self.assertEqual(cache.layout(root, rect).treemap(),
+                         root.generate_treemap(rect))
+
+
+class SquarifiedLayoutTest(unittest.TestCase):
+    @given(lists(lists(integers(0, 1000), max_size=8), max_size=8),
+           integers(0, 1200), integers(0, 900))
+    def test_fills_rect(self, folder_sizes, width, height):
+        tree = _make_tree(folder_sizes)
+        rect = (0, 0, width, height)
+        layout = tree.layout(rect, squarified=True)
+        self.assertTrue(layout.squarified)
+        # The same leaves, in the same order, as when slicing.
+        self.assertEqual([leaf for leaf, _ in layout],
+                         [leaf for leaf, _ in tree.layout(rect)])
+        # The rectangles fill <rect> exactly, without overlapping.
+        rects = [leaf_rect for _, leaf_rect in layout]
+        if rects:
+            self.assertEqual(sum(w * h for _, _, w, h in rects),
+                             width * height)
+        for i, (x, y, w, h) in enumerate(rects):
+            self.assertTrue(0 <= x and x + w <= width and
+                            0 <= y and y + h <= height)
+            for other_x, other_y, other_w, other_h in rects[:i]:
+                self.assertFalse(x < other_x + other_w and
+                                 other_x < x + w and
+                                 y < other_y + other_h and
+                                 other_y < y + h)
+
+    def test_squarer_than_slices(self):
+        tree = _make_tree([[100] * 50])
+        rect = (0, 0, 1000, 1000)
+        # The narrowest side of the files' rectangles.
+        narrowest = [min(min(w, h) for (_, _, w, h), _ in
+                         tree.generate_treemap(rect, squarified)[:-1])
+                     for squarified in (False, True)]
+        self.assertEqual(narrowest[0], 20)
+        self.assertGreater(narrowest[1], 5 * narrowest[0])
+        self.assertEqual(sorted(tree.rect_dict(rect, True).values(),
+                                key=id), sorted(_leaves(tree), key=id))
+
+    @given(lists(lists(integers(0, 1000), max_size=6), max_size=6),
+           lists(tuples(integers(0, 80),
+                        sampled_from(['up', 'down', 'delete', 'undo'])),
+                 max_size=20),
+           integers(0, 1200), integers(0, 900),
+           sampled_from([0, 100]))
+    def test_relayout(self, folder_sizes, changes, width, height,
+                      min_area):
+        tree = FileSystemTree('top', [
+            _make_tree(folder_sizes), FileSystemTree('h', [], 1)])
+        rect = (0, 0, width, height)
+        layout = tree.layout(rect, min_area, True)
+        journal = TreeJournal()
+        leaves = _leaves(tree)
+        for index, change in changes:
+            leaf = leaves[index % len(leaves)]
+            if change == 'undo':
+                node = journal.undo()
+            elif leaf.is_empty():
+                continue
+            elif change == 'delete':
+                node = leaf._parent_tree
+                journal.del_leaf(leaf)
+            else:
+                node = leaf
+                journal.alt_size(leaf, change == 'up')
+            tree.relayout(layout, node)
+            self.assertTrue(layout.squarified)
+            self.assertEqual(list(layout),
+                             list(tree.layout(rect, min_area, True)))
+
+    def test_order_kept_until_changed(self):
+        tree = _make_tree([[15, 5, 10]])
+        folder = tree._subtrees[0]
+        order = tree_squarify.sorted_subtrees(folder)
+        self.assertEqual([leaf._root for leaf in order], ['f0', 'f2', 'f1'])
+        # The order is kept by the folder itself, not by the module.
+        self.assertIs(folder._order, order)
+        self.assertIsNone(folder._subtrees[0]._order)
+        tree.generate_treemap((0, 0, 800, 1000), squarified=True)
+        self.assertIs(tree_squarify.sorted_subtrees(folder), order)
+        # A change to one of its subtrees sorts them again.
+        with tree.batch() as batch:
+            batch.resize(folder._subtrees[1], 20)
+        self.assertEqual([leaf._root for leaf in
+                          tree_squarify.sorted_subtrees(folder)],
+                         ['f1', 'f0', 'f2'])
+        # And so does a change to a node of an ArrayTree.
+        folder = array_tree_from_tree(tree).root()._subtrees[0]
+        self.assertEqual(tree_squarify.sorted_subtrees(folder),
+                         folder._subtrees[1::-1] + folder._subtrees[2:])
+        folder._subtrees[0].del_leaf()
+        self.assertEqual(tree_squarify.sorted_subtrees(folder),
+                         folder._subtrees[1:])
+
+    @given(lists(lists(integers(0, 1000), max_size=8), max_size=8),
+           integers(0, 1200), integers(0, 900), integers(0, 1000))
+    def test_array_tree(self, folder_sizes, width, height, min_area):
+        tree = _make_tree(folder_sizes)
+        rect = (0, 0, width, height)
+        root = array_layout.VectorisedNode(array_tree_from_tree(tree), 0)
+        self.assertEqual(
+            [(node.get_separator(), node_rect) for node, node_rect in
+             tree.layout(rect, min_area, True)],
+            [(node.get_separator(), node_rect) for node, node_rect in
+             root.layout(rect, min_area, True)])
+
+
+class ColourPolicyTest(unittest.TestCase):
+    def test_nothing_kept_per_leaf(self):
+        policy = PathColours()
+        with mock.patch.object(AbstractTree, 'colour_policy', policy):
+            tree = _make_tree([[15, 5, 10], [], [0, 7]])
+            leaves = tree.generate_treemap((0, 0, 800, 1000))
+            self.assertEqual(len(leaves), 5)
+            # Only the folders the last leaf was in are remembered.
+            self.assertEqual([node for node, _ in policy._chain],
+                             [tree])
+            self.assertEqual(policy._cache, {})
+
+    def test_same_colours_every_time(self):
+        first = _make_tree([[15, 5, 10], [7]])
+        second = _make_tree([[15, 5, 10], [7]])
+        self.assertEqual(first.generate_treemap((0, 0, 800, 1000)),
+                         second.generate_treemap((0, 0, 800, 1000)))
+        # Each leaf's colour comes from its own path.
+        colours = [colour for _, colour in
+                   first.generate_treemap((0, 0, 800, 1000))]
+        self.assertEqual(len(set(colours)), len(colours))
+
+    def test_same_colour_in_any_order(self):
+        tree = _make_tree([[1] * 20, [2] * 20])
+        expected = dict()
+        stack = [tree]
+        while stack:
+            node = stack.pop()
+            expected[node] = PathColours().colour(node)
+            stack.extend(node._subtrees)
+        policy = PathColours()
+        for node in reversed(list(expected)):
+            self.assertEqual(policy.colour(node), expected[node])
+        for node in expected:
+            self.assertEqual(policy.colour(node), expected[node])
+
+    def test_cache_bounded(self):
+        names = ['f{}.x{}'.format(i, i % 10) for i in range(40)]
+        tree = FileSystemTree('root', [FileSystemTree(name, [], 1)
+                                       for name in names])
+        expected = ExtensionColours()
+        policy = ExtensionColours(cache_size=4)
+        for node in tree._subtrees:
+            self.assertEqual(policy.colour(node), expected.colour(node))
+            self.assertLessEqual(len(policy._cache), 4)
+
+    def test_extension(self):
+        policy = ExtensionColours()
+        tree = FileSystemTree('root', [FileSystemTree('a.py', [], 1),
+                                       FileSystemTree('b.PY', [], 2),
+                                       FileSystemTree('c.foo', [], 3),
+                                       FileSystemTree('d.bar', [], 3)])
+        a, b, c, d = [policy.colour(subtree) for subtree in tree._subtrees]
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, c)
+        self.assertNotEqual(c, d)
+        self.assertEqual(policy.colour(FileSystemTree('e.foo', [], 1)), c)
+
+    def test_depth_and_size(self):
+        policy = DepthColours()
+        tree = _make_tree([[10, 90]])
+        small, big = tree._subtrees[0]._subtrees
+        level_1 = policy.colour(tree._subtrees[1])
+        self.assertNotEqual(policy.colour(big), level_1)
+        # The smaller part of the folder is lighter.
+        self.assertGreater(sum(policy.colour(small)), sum(policy.colour(big)))
+
+
+class PathTableTest(unittest.TestCase):
+    def setUp(self):
+        self.paths = PathTable('/')
+        patcher = mock.patch.object(FileSystemTree, '_paths', self.paths)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_folder_remembered(self):
+        tree = _make_tree([[15, 5, 10], [7]])
+        first, second, third = tree._subtrees[0]._subtrees
+        self.assertEqual(first.get_separator(), 'root/d0/f0')
+        self.assertEqual(list(self.paths._prefixes.items()),
+                         [(tree._subtrees[0], 'root/d0')])
+        # The folder's path is reused for its other files.
+        tree._subtrees[0]._root = 'renamed'
+        self.assertEqual(third.get_separator(), 'root/d0/f2')
+
+    def test_moved_folder(self):
+        tree = _make_tree([[15, 5], [7]])
+        folder = tree._subtrees[0]
+        leaf = folder._subtrees[1]
+        self.assertEqual(leaf.get_separator(), 'root/d0/f1')
+        tree._remove_subtree(folder)
+        tree._subtrees[0]._add_subtree(folder)
+        self.assertEqual(leaf.get_separator(), 'root/d1/d0/f1')
+
+    def test_paths(self):
+        tree = _make_tree([[15, 5], [], [7]])
+        tree._subtrees[0]._subtrees[0].del_leaf()
+        nodes = [tree, tree._subtrees[0], tree._subtrees[0]._subtrees[1],
+                 tree._subtrees[1], tree._subtrees[2],
+                 tree._subtrees[2]._subtrees[0], tree._subtrees[3]]
+        self.assertEqual(list(self.paths.paths(tree)),
+                         [(node, node.get_separator()) for node in nodes])
+
+    def test_deep_tree(self):
+        depth = 20000
+        tree = FileSystemTree('f', [], 5)
+        for _ in range(depth):
+            tree = FileSystemTree('d', [tree])
+        leaf = tree
+        while leaf._subtrees:
+            leaf = leaf._subtrees[0]
+        self.assertEqual(leaf.get_separator(), 'd/' * depth + 'f')
+        # Only the leaf's folder has its path remembered.
+        self.assertEqual(len(self.paths._prefixes), 1)
+        self.assertEqual(len(list(self.paths.paths(tree))), depth + 1)
+
+
+def _leaves(tree):
+    """Return the leaves of <tree>, in order.
+
+    @type tree: AbstractTree
+    @rtype: list[AbstractTree]
+    """
+    leaves = list()
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if node._subtrees:
+            stack.extend(reversed(node._subtrees))
+        else:
+            leaves.append(node)
+    return leaves
+
+
+def _sizes(tree):
+    """Return the data_size of every node in <tree>, in preorder.
+
+    @type tree: AbstractTree
+    @rtype: list[int]
+    """
+    sizes = list()
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        sizes.append(node.data_size)
+        stack.extend(reversed(node._subtrees))
+    return sizes
+
+
+class TreeBatchTest(unittest.TestCase):
+    @given(lists(lists(integers(1, 1000), max_size=6), min_size=1,
+                 max_size=6),
+           lists(tuples(sampled_from(['delete', 'resize', 'up', 'down']),
+                        integers(0, 40), integers(0, 1000)), max_size=30))
+    def test_same_as_one_at_a_time(self, folder_sizes, changes):
+        batched = _make_tree(folder_sizes)
+        expected = _make_tree(folder_sizes)
+        batch = batched.batch()
+        for tree, apply in [(batched, False), (expected, True)]:
+            leaves = _leaves(tree)
+            for kind, index, size in changes:
+                leaf = leaves[index % len(leaves)]
+                if kind == 'delete':
+                    if apply and not leaf.is_empty():
+                        leaf.del_leaf()
+                    elif not apply:
+                        batch.delete(leaf)
+                elif kind == 'resize':
+                    if apply and not leaf.is_empty():
+                        leaf._adjust_size(size - leaf.data_size)
+                    elif not apply:
+                        batch.resize(leaf, size)
+                elif apply and not leaf.is_empty():
+                    leaf.alt_size(positive=kind == 'up')
+                elif not apply:
+                    batch.alt_size(leaf, positive=kind == 'up')
+        batch.commit()
+        self.assertEqual(_sizes(batched), _sizes(expected))
+        self.assertEqual([leaf.is_empty() for leaf in _leaves(batched)],
+                         [leaf.is_empty() for leaf in _leaves(expected)])
+
+    def test_not_committed_on_error(self):
+        tree = _make_tree([[15, 5, 10]])
+        leaf = tree._subtrees[0]._subtrees[0]
+        with self.assertRaises(KeyError):
+            with tree.batch() as batch:
+                batch.delete(leaf)
+                raise KeyError
+        self.assertFalse(leaf.is_empty())
+        self.assertEqual(tree.data_size, 33)
+        self.assertEqual(len(batch), 0)
+
+    def test_leaf_of_other_tree(self):
+        tree = _make_tree([[15, 5, 10]])
+        other = _make_tree([[4]])
+        with self.assertRaises(ValueError):
+            with tree.batch() as batch:
+                batch.resize(tree._subtrees[0]._subtrees[0], 1)
+                batch.delete(other._subtrees[0]._subtrees[0])
+        self.assertEqual(tree.data_size, 33)
+        self.assertEqual(other.data_size, 7)
+        self.assertEqual(len(batch), 0)
+
+    def test_ancestors_updated_once(self):
+        tree = _make_tree([[15, 5, 10], [7, 7]])
+        batch = tree.batch()
+        for leaf in _leaves(tree):
+            batch.resize(leaf, 1)
+        with mock.patch.object(AbstractTree, '_adjust_size') as adjust:
+            self.assertEqual(batch.commit(), 6)
+        adjust.assert_not_called()
+        self.assertEqual(_sizes(tree), [6, 3, 1, 1, 1, 2, 1, 1, 1])
+
+
+class TreeJournalTest(unittest.TestCase):
+    def _check_undo_redo(self, root):
+        sizes = _sizes(root)
+        journal = TreeJournal()
+        first, second, third = root._subtrees[0]._subtrees
+        journal.del_leaf(second)
+        journal.alt_size(first)
+        journal.alt_size(third, positive=False)
+        journal.del_leaf(first)
+        changed = _sizes(root)
+        for leaf in [first, third, first, second]:
+            self.assertEqual(journal.undo(), leaf)
+        self.assertIsNone(journal.undo())
+        self.assertEqual(_sizes(root), sizes)
+        self.assertEqual(second._root, 'f1')
+        self.assertEqual(second._parent_tree, root._subtrees[0])
+        self.assertEqual(root._subtrees[0]._subtrees[1], second)
+        for leaf in [second, first, third, first]:
+            self.assertEqual(journal.redo(), leaf)
+        self.assertIsNone(journal.redo())
+        self.assertEqual(_sizes(root), changed)
+        self.assertTrue(first.is_empty())
+
+    def test_undo_redo(self):
+        self._check_undo_redo(_make_tree([[150, 5, 10], [7]]))
+
+    def test_undo_redo_array_tree(self):
+        tree = array_tree_from_tree(_make_tree([[150, 5, 10], [7]]))
+        self._check_undo_redo(tree.root())
+
+    def test_new_change_clears_redo(self):
+        tree = _make_tree([[15, 5, 10]])
+        first, second, _ = tree._subtrees[0]._subtrees
+        journal = TreeJournal()
+        journal.del_leaf(first)
+        journal.undo()
+        self.assertTrue(journal.can_redo())
+        journal.del_leaf(second)
+        self.assertFalse(journal.can_redo())
+        self.assertIsNone(journal.redo())
+        self.assertEqual(tree.data_size, 28)
+
+    def test_limit(self):
+        tree = _make_tree([[15, 5, 10]])
+        journal = TreeJournal(limit=2)
+        for leaf in tree._subtrees[0]._subtrees:
+            journal.del_leaf(leaf)
+        self.assertIsNotNone(journal.undo())
+        self.assertIsNotNone(journal.undo())
+        self.assertFalse(journal.can_undo())
+        self.assertEqual(tree.data_size, 18)
+
+
+class CompactionTest(unittest.TestCase):
+    @given(lists(lists(integers(0, 1000), max_size=8), max_size=8),
+           lists(integers(0, 80), max_size=40), integers(0, 1200),
+           integers(0, 900))
+    def test_same_treemap(self, folder_sizes, deletions, width, height):
+        tree = _make_tree(folder_sizes)
+        leaves = _leaves(tree)
+        for index in deletions:
+            leaf = leaves[index % len(leaves)]
+            if not leaf.is_empty():
+                leaf.del_leaf()
+        rect = (0, 0, width, height)
+        expected = tree.generate_treemap(rect)
+        tree.compact()
+        self.assertEqual(tree.generate_treemap(rect), expected)
+        tree.compact(zero_size=True)
+        self.assertEqual(tree.generate_treemap(rect), expected)
+        for node in _leaves(tree)[:-1]:
+            self.assertFalse(node.is_empty() and node._parent_tree)
+
+    def test_compacted_when_deleted(self):
+        tree = _make_tree([[1] * 40])
+        folder = tree._subtrees[0]
+        for leaf in list(folder._subtrees[:20]):
+            leaf.del_leaf()
+        self.assertEqual(len(folder._subtrees), 40)
+        self.assertEqual(folder._deleted, 20)
+        folder._subtrees[20].del_leaf()
+        self.assertEqual(len(folder._subtrees), 19)
+        self.assertEqual(folder.data_size, 19)
+        self.assertEqual(folder._deleted, 0)
+
+    def test_batch_compacts(self):
+        tree = _make_tree([[1] * 40])
+        folder = tree._subtrees[0]
+        with tree.batch() as batch:
+            for leaf in folder._subtrees[:-1]:
+                batch.delete(leaf)
+        self.assertEqual(len(folder._subtrees), 1)
+        self.assertEqual(tree.data_size, 4)
+
+    def test_undo_after_compaction(self):
+        tree = _make_tree([[i + 1 for i in range(40)]])
+        rect = (0, 0, 800, 1000)
+        journal = TreeJournal()
+        leaves = list(tree._subtrees[0]._subtrees)
+        treemaps = [tree.generate_treemap(rect)]
+        for leaf in leaves[5:35]:
+            journal.del_leaf(leaf)
+            treemaps.append(tree.generate_treemap(rect))
+        self.assertLess(len(tree._subtrees[0]._subtrees), 40)
+        treemaps.pop()
+        while journal.can_undo():
+            journal.undo()
+            self.assertEqual(tree.generate_treemap(rect), treemaps.pop())
+
+
+class ArrayTreeTest(unittest.TestCase):
+    @given(lists(lists(integers(0, 1000), max_size=8), max_size=8),
+           integers(0, 1200), integers(0, 900))
+    def test_same_treemap(self, folder_sizes, width, height):
+        tree = _make_tree(folder_sizes)
+        array_tree = array_tree_from_tree(tree)
+        # The colours are the same too, since they come from the paths.
+        self.assertEqual(array_tree.root().generate_treemap((0, 0, width,
+                                                             height)),
+                         tree.generate_treemap((0, 0, width, height)))
+        self.assertEqual(array_tree.root().data_size, tree.data_size)
+
+    def test_rect_dict(self):
+        tree = _make_tree([[15, 5, 10], [], [0, 7]])
+        root = array_tree_from_tree(tree).root()
+        expected = tree.rect_dict((0, 0, 800, 1000))
+        leaves = root.rect_dict((0, 0, 800, 1000))
+        self.assertEqual(sorted(leaves), sorted(expected))
+        for rect, leaf in leaves.items():
+            self.assertEqual(leaf._root, expected[rect]._root)
+            self.assertEqual(leaf.data_size, expected[rect].data_size)
+            self.assertEqual(leaf.get_separator(),
+                             expected[rect].get_separator())
+        # A handle made again for the same node is equal to the first one.
+        self.assertEqual(root.rect_dict((0, 0, 800, 1000)), leaves)
+
+    def test_del_leaf(self):
+        tree = _make_tree([[15, 5, 10], [7]])
+        root = array_tree_from_tree(tree).root()
+        leaf = root._subtrees[0]._subtrees[1]
+        leaf.del_leaf()
+        self.assertTrue(leaf.is_empty())
+        self.assertIs(leaf._parent_tree, None)
+        self.assertEqual(root._subtrees[0].data_size, 25)
+        self.assertEqual(root.data_size, 35)
+        tree._subtrees[0]._subtrees[1].del_leaf()
+        self.assertEqual(_rects(root, (0, 0, 800, 1000)),
+                         _rects(tree, (0, 0, 800, 1000)))
+
+    def test_alt_size(self):
+        root = array_tree_from_tree(_make_tree([[150, 2]])).root()
+        big, small = root._subtrees[0]._subtrees
+        big.alt_size()
+        self.assertEqual((big.data_size, root.data_size), (152, 157))
+        small.alt_size(positive=False)
+        small.alt_size(positive=False)
+        self.assertEqual((small.data_size, root.data_size), (1, 156))
+
+    def test_separator(self):
+        tree = ArrayTree(['World', 'Asia', 'Japan'], [-1, 0, 1], [0, 0, 12],
+                         separator=' -> ')
+        leaf = tree.root()._subtrees[0]._subtrees[0]
+        self.assertEqual(leaf.get_separator(), 'World -> Asia -> Japan')
+        self.assertEqual(leaf._parent_tree._root, 'Asia')
+
+    def test_names_interned(self):
+        tree = array_tree_from_tree(_make_tree([[1, 2], [3, 4], [5, 6]]))
+        self.assertEqual(len(tree), 11)
+        # root, d0, d1, d2, f0, f1 and g.
+        self.assertEqual(len(tree._names), 7)
+
+    def test_deep_tree(self):
+        depth = 20000
+        tree = ArrayTree(['d'] * depth + ['f'], range(-1, depth),
+                         [0] * depth + [5])
+        self.assertEqual(tree.root().data_size, 5)
+        leaves = tree.root().rect_dict((0, 0, 10, 10))
+        self.assertEqual(list(leaves), [(0, 0, 10, 10)])
+        leaf = leaves[(0, 0, 10, 10)]
+        self.assertEqual(leaf.get_separator().count('\\'), depth)
+        leaf.del_leaf()
+        self.assertEqual(tree.root().data_size, 0)
+
+
+class VectorisedLayoutTest(unittest.TestCase):
+    @given(lists(lists(integers(0, 10 ** 12), max_size=8), max_size=40),
+           integers(0, 1200), integers(0, 900), integers(1, 40),
+           sampled_from([0, 1, 100, 10000]))
+    def test_same_rects(self, folder_sizes, width, height, min_folders,
+                        min_area):
+        array_tree = array_tree_from_tree(FileSystemTree('top', [
+            _make_tree(folder_sizes), _make_tree(folder_sizes[::-1])]))
+        rect = (0, 0, width, height)
+        # Slice with NumPy for fewer folders too, so that small trees are
+        # sliced both ways.
+        with mock.patch.object(array_layout, 'VECTOR_MIN_FOLDERS',
+                               min_folders):
+            arrays = leaf_rect_arrays(array_tree, 0, rect, min_area)
+        self.assertEqual(
+            list(zip(arrays[0].tolist(),
+                     zip(*[array.tolist() for array in arrays[1:]]))),
+            list(array_tree._leaf_rects(0, rect, min_area)))
+
+    def test_layout(self):
+        array_tree = array_tree_from_tree(_make_tree([[15, 5, 10], [],
+                                                      [0, 7]]))
+        array_tree.root()._subtrees[0]._subtrees[1].del_leaf()
+        layout = VectorisedNode(array_tree, 0).layout((0, 0, 800, 1000))
+        self.assertEqual(list(layout),
+                         list(array_tree.root().layout((0, 0, 800, 1000))))
+
+    def test_empty(self):
+        array_tree = ArrayTree(['A', 'f1'], [-1, 0], [0, 0])
+        layout = VectorisedNode(array_tree, 0).layout((0, 0, 800, 1000))
+        self.assertEqual(layout.treemap(), [])
+
+
+class ArrayTreeFileSystemTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, 'B')
+        os.mkdir(self.path)
+        _make_layout(self.path, EXAMPLE_LAYOUT)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_scan(self):
+        expected = FileSystemTree(self.path)
+        root = scan_array_tree(self.path).root()
+        self.assertEqual(flatten_tree(root), flatten_tree(expected))
+        self.assertEqual(_rects(root, (0, 0, 800, 1000)),
+                         _rects(expected, (0, 0, 800, 1000)))
+
+    def test_snapshot(self):
+        expected = FileSystemTree(self.path)
+        filename = os.path.join(self.tmp, 'B.tmap')
+        save_snapshot(expected, filename)
+        root = load_array_snapshot(filename).root()
+        self.assertEqual(flatten_tree(root), flatten_tree(expected))
+
+
+class LatencyHistogramTest(unittest.TestCase):
+    def test_empty(self):
+        histogram = LatencyHistogram()
+        self.assertEqual(len(histogram), 0)
+        self.assertEqual(histogram.percentile(0.5), 0)
+        self.assertEqual(str(histogram), '')
+
+    def test_buckets(self):
+        histogram = LatencyHistogram()
+        for seconds in [0, 0.0000005, 0.000001, 0.0000015, 0.000002]:
+            histogram.add(seconds)
+        self.assertEqual(histogram._counts[:4], [2, 2, 1, 0])
+        # Times too long for the last bucket go in it too.
+        histogram.add(3600)
+        self.assertEqual(histogram._counts[BUCKETS - 1], 1)
+        self.assertEqual(len(histogram), 6)
+
+    @given(lists(integers(0, 8 * 10 ** 6), min_size=1),
+           sampled_from([0.01, 0.5, 0.99, 1]))
+    def test_percentile(self, microseconds, fraction):
+        histogram = LatencyHistogram()
+        for micros in microseconds:
+            histogram.add(micros / 10 ** 6)
+        bound = histogram.percentile(fraction)
+        # At least <fraction> of the times are no longer than the bound,
+        # which is at most twice the time it stands for.
+        times = sorted(microseconds)
+        at = times[max(0, -int(-len(times) * fraction // 1) - 1)]
+        self.assertLessEqual(at / 10 ** 6, bound)
+        self.assertLessEqual(bound, max(2 * at, 1) / 10 ** 6)
+
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
@@ -0,0 +1,659 @@
+"""Assignment 2 - Scanner Tests
+
+=== Module Description ===
+This module contains tests for the alternative ways of building a
+FileSystemTree. Every test builds its own small folder in a temporary
+directory, so these tests can be run on any machine.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from tree_data import FileSystemTree, _NO_SUBTREES
+from file_scanner import scan_file_system, scan_file_system_threaded, \
+    scan_file_system_sharded, flatten_tree, build_flat_tree, \
+    rescan_file_system, ProgressiveScan, scan_file_system_progressive
+import file_scanner
+from tree_snapshot import Snapshot, save_snapshot, load_snapshot
+from tree_watcher import TreeWatcher
+from lazy_tree import lazy_scan, lazy_load_snapshot, folder_sizes
+from scan_filter import ScanFilter
+
+
+# The folder built for each test, as {name: size or sub-folder}.
+# An empty dict is an empty folder.
+EXAMPLE_LAYOUT = {
+    'A': {'f1.txt': 15, 'f2.txt': 5, 'f3.txt': 10},
+    'f4.txt': 10,
+    'empty': {},
+    'zero.txt': 0,
+    'deep': {'a': {'b': {'c': {'f5.txt': 7}}}},
+}
+
+
+def _make_layout(path, layout):
+    """Create the files and folders described by <layout> inside <path>.
+
+    @type path: str
+    @type layout: dict[str, int | dict]
+    @rtype: None
+    """
+    for name, content in layout.items():
+        child = os.path.join(path, name)
+        if isinstance(content, dict):
+            os.mkdir(child)
+            _make_layout(child, content)
+        else:
+            with open(child, 'w') as f:
+                f.write('x' * content)
+
+
+def _shape(tree):
+    """Return a nested tuple describing the names, sizes and parents of
+    <tree>, with each node's subtrees in order.
+
+    @type tree: AbstractTree
+    @rtype: tuple
+    """
+    for subtree in tree._subtrees:
+        assert subtree._parent_tree is tree
+    return (tree._root, tree.data_size,
+            tuple(_shape(subtree) for subtree in tree._subtrees))
+
+
+class ScannerTestCase(unittest.TestCase):
+    """A test case that builds EXAMPLE_LAYOUT in a temporary directory."""
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, 'B')
+        os.mkdir(self.path)
+        _make_layout(self.path, EXAMPLE_LAYOUT)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def assertSameTree(self, tree1, tree2):
+        self.assertEqual(_shape(tree1), _shape(tree2))
+
+
+class ScanFileSystemTest(ScannerTestCase):
+    def test_same_as_constructor(self):
+        tree = scan_file_system(self.path)
+        self.assertSameTree(tree, FileSystemTree(self.path))
+        self.assertIs(tree._parent_tree, None)
+        self.assertEqual(tree.data_size, 47)
+
+    def test_single_file(self):
+        path = os.path.join(self.path, 'f4.txt')
+        tree = scan_file_system(path)
+        self.assertEqual(tree._root, 'f4.txt')
+        self.assertEqual(tree._subtrees, [])
+        self.assertEqual(tree.data_size, 10)
+
+
+class ScanFileSystemThreadedTest(ScannerTestCase):
+    def test_same_as_constructor(self):
+        expected = FileSystemTree(self.path)
+        for workers in [1, 2, 8]:
+            tree = scan_file_system_threaded(self.path, workers)
+            self.assertSameTree(tree, expected)
+            self.assertIs(tree._parent_tree, None)
+
+    def test_single_file(self):
+        path = os.path.join(self.path, 'f4.txt')
+        self.assertSameTree(scan_file_system_threaded(path),
+                            FileSystemTree(path))
+
+    def test_missing_folder(self):
+        with self.assertRaises(OSError):
+            scan_file_system_threaded(os.path.join(self.path, 'missing'))
+
+    def test_other_error(self):
+        rules = ScanFilter()
+        with mock.patch.object(rules, 'excludes', side_effect=ValueError):
+            with self.assertRaises(ValueError):
+                scan_file_system_threaded(self.path, 2, rules)
+
+
+class ScanFileSystemShardedTest(ScannerTestCase):
+    def test_same_as_constructor(self):
+        tree = scan_file_system_sharded(self.path, 2)
+        self.assertSameTree(tree, FileSystemTree(self.path))
+        self.assertIs(tree._parent_tree, None)
+
+    def test_mount_points(self):
+        points = [os.path.join(self.path, 'deep'),
+                  os.path.join(self.path, 'A')]
+        tree = scan_file_system_sharded('mounts', 2, points)
+        self.assertEqual(tree._root, 'mounts')
+        self.assertEqual([subtree._root for subtree in tree._subtrees],
+                         ['deep', 'A'])
+        self.assertSameTree(tree._subtrees[1], FileSystemTree(points[1]))
+        self.assertEqual(tree.data_size, 37)
+
+    def test_flatten_round_trip(self):
+        tree = FileSystemTree(self.path)
+        self.assertSameTree(build_flat_tree(*flatten_tree(tree)), tree)
+
+
+class SnapshotTest(ScannerTestCase):
+    def test_round_trip(self):
+        tree = FileSystemTree(self.path)
+        filename = os.path.join(self.tmp, 'B.tmap')
+        save_snapshot(tree, filename)
+        loaded = load_snapshot(filename)
+        self.assertSameTree(loaded, tree)
+        self.assertIs(loaded._parent_tree, None)
+
+    def test_deleted_leaves_not_saved(self):
+        tree = FileSystemTree(self.path)
+        _sort_subtrees(tree)
+        tree._subtrees[0]._subtrees[0].del_leaf()
+        filename = os.path.join(self.tmp, 'B.tmap')
+        save_snapshot(tree, filename)
+        with Snapshot(filename) as snapshot:
+            self.assertEqual(len(snapshot), 12)
+            self.assertEqual(snapshot.name(0), 'B')
+            self.assertEqual(snapshot.parents[0], -1)
+        self.assertEqual(load_snapshot(filename).data_size, 32)
+
+    def test_not_a_snapshot(self):
+        filename = os.path.join(self.path, 'f4.txt')
+        with self.assertRaises(ValueError):
+            load_snapshot(filename)
+
+    def test_truncated(self):
+        filename = os.path.join(self.tmp, 'B.tmap')
+        save_snapshot(FileSystemTree(self.path), filename)
+        with open(filename, 'rb') as f:
+            data = f.read()
+        with open(filename, 'wb') as f:
+            f.write(data[:-1])
+        with self.assertRaises(ValueError):
+            load_snapshot(filename)
+
+
+class RescanFileSystemTest(ScannerTestCase):
+    def setUp(self):
+        ScannerTestCase.setUp(self)
+        # Folders in these tests change right after they are scanned, so the
+        # racy window is turned off to test that unchanged folders are
+        # reused. The file systems used for temporary folders have
+        # nanosecond stamps.
+        patcher = mock.patch.object(file_scanner, '_RACY_WINDOW', 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def assertUpToDate(self, tree, stamps):
+        expected = FileSystemTree(self.path)
+        _sort_subtrees(tree)
+        _sort_subtrees(expected)
+        self.assertSameTree(tree, expected)
+        # Only the folders in the tree have stamps.
+        folders = [node for node, _ in file_scanner.iter_preorder(tree)
+                   if node in stamps]
+        self.assertEqual(len(folders), len(stamps))
+
+    def test_unchanged(self):
+        stamps = dict()
+        tree = scan_file_system(self.path, stamps)
+        self.assertEqual(len(stamps), 7)
+        self.assertEqual(rescan_file_system(tree, self.path, stamps), (0, 7))
+        self.assertUpToDate(tree, stamps)
+
+    def test_changes(self):
+        stamps = dict()
+        tree = scan_file_system(self.path, stamps)
+        _sort_subtrees(tree)
+        folder_a = tree._subtrees[0]
+        deep = tree._subtrees[1]
+        folder_a._subtrees[0].del_leaf()
+        self.assertEqual(folder_a._deleted, 1)
+        os.remove(os.path.join(self.path, 'f4.txt'))
+        os.remove(os.path.join(self.path, 'A', 'f2.txt'))
+        _make_layout(os.path.join(self.path, 'A'),
+                     {'f5.txt': 20, 'new': {'f6.txt': 3}})
+        _make_layout(os.path.join(self.path, 'empty'), {'f7.txt': 4})
+
+        relisted, folders = rescan_file_system(tree, self.path, stamps)
+        self.assertEqual((relisted, folders), (4, 8))
+        self.assertUpToDate(tree, stamps)
+        self.assertEqual(tree.data_size, 59)
+        # The deleted leaf was dropped when its folder was listed again.
+        self.assertEqual(folder_a._deleted, 0)
+        # Unchanged folders and files are reused as they are.
+        self.assertIs(tree._subtrees[0], folder_a)
+        self.assertIs(tree._subtrees[1], deep)
+
+    def test_folder_replaced_by_file(self):
+        stamps = dict()
+        tree = scan_file_system(self.path, stamps)
+        shutil.rmtree(os.path.join(self.path, 'deep'))
+        _make_layout(self.path, {'deep': 5})
+        # The paths of the folders removed are forgotten with them.
+        _sort_subtrees(tree)
+        tree._subtrees[1]._subtrees[0]._subtrees[0].get_separator()
+        self.assertTrue(FileSystemTree._paths._prefixes)
+        self.assertEqual(rescan_file_system(tree, self.path, stamps), (1, 3))
+        self.assertUpToDate(tree, stamps)
+        self.assertFalse(FileSystemTree._paths._prefixes)
+
+    def test_snapshot_round_trip(self):
+        stamps = dict()
+        filename = os.path.join(self.tmp, 'B.tmap')
+        save_snapshot(scan_file_system(self.path, stamps), filename, stamps)
+        _make_layout(os.path.join(self.path, 'deep', 'a'), {'f8.txt': 8})
+
+        stamps = dict()
+        tree = load_snapshot(filename, stamps)
+        self.assertEqual(len(stamps), 7)
+        self.assertEqual(rescan_file_system(tree, self.path, stamps), (1, 7))
+        self.assertUpToDate(tree, stamps)
+
+    def test_file(self):
+        path = os.path.join(self.path, 'f4.txt')
+        filename = os.path.join(self.tmp, 'f4.tmap')
+        save_snapshot(scan_file_system(path), filename, dict())
+        _make_layout(self.path, {'f4.txt': 12})
+
+        stamps = dict()
+        tree = load_snapshot(filename, stamps)
+        self.assertEqual(stamps, {})
+        self.assertEqual(rescan_file_system(tree, path, stamps), (0, 0))
+        self.assertEqual(tree.data_size, 12)
+
+    def test_racy_folders_relisted(self):
+        with mock.patch.object(file_scanner, '_RACY_WINDOW', 10 ** 18):
+            stamps = dict()
+            tree = scan_file_system(self.path, stamps)
+        self.assertEqual(rescan_file_system(tree, self.path, stamps), (7, 7))
+
+
+class ProgressiveScanTest(ScannerTestCase):
+    def test_same_as_constructor(self):
+        scan = ProgressiveScan(self.path)
+        self.assertEqual(scan.poll(block=True), 7)
+        self.assertTrue(scan.done)
+        self.assertSameTree(scan.tree, FileSystemTree(self.path))
+        self.assertEqual((scan.folders, scan.files), (7, 6))
+        # Subtrees are added as AbstractTree adds them, so the empty folder
+        # shares the subtrees of a leaf.
+        empty = [subtree for subtree in scan.tree._subtrees
+                 if subtree._root == 'empty'][0]
+        self.assertIs(empty._subtrees, _NO_SUBTREES)
+
+    def test_single_file(self):
+        path = os.path.join(self.path, 'f4.txt')
+        scan = ProgressiveScan(path)
+        self.assertTrue(scan.done)
+        self.assertSameTree(scan.tree, FileSystemTree(path))
+        self.assertSameTree(scan_file_system_progressive(path), scan.tree)
+
+    def test_partial_trees_consistent(self):
+        scan = ProgressiveScan(self.path)
+        while not scan.done:
+            scan.poll()
+            # Every folder's data_size is the total of what is known so far.
+            for node, _ in file_scanner.iter_preorder(scan.tree):
+                if node._subtrees:
+                    self.assertEqual(node.data_size,
+                                     sum(subtree.data_size
+                                         for subtree in node._subtrees))
+        self.assertEqual(scan.tree.data_size, 47)
+
+    def test_other_error(self):
+        rules = ScanFilter()
+        with mock.patch.object(rules, 'excludes', side_effect=ValueError):
+            scan = ProgressiveScan(self.path, rules)
+            with self.assertRaises(ValueError):
+                scan.poll(block=True)
+        self.assertTrue(scan.done)
+
+    def test_stop(self):
+        scan = ProgressiveScan(self.path)
+        scan.stop()
+        self.assertTrue(scan.done)
+        self.assertEqual(scan.poll(), 0)
+
+
+class LazyTreeTest(ScannerTestCase):
+    def test_folder_sizes(self):
+        sizes = folder_sizes(self.path)
+        self.assertEqual(len(sizes), 7)
+        self.assertEqual(sizes[self.path], 47)
+        self.assertEqual(sizes[os.path.join(self.path, 'deep', 'a')], 7)
+
+    def test_nothing_listed_until_needed(self):
+        tree = lazy_scan(self.path)
+        self.assertEqual(tree._subtrees, [])
+        self.assertEqual(tree.data_size, 47)
+        # A rectangle with no area cannot show any subtrees.
+        self.assertEqual(len(tree.generate_treemap((0, 0, 0, 100))), 1)
+        self.assertEqual(tree._subtrees, [])
+
+    def test_same_treemap(self):
+        expected = FileSystemTree(self.path)
+        for tree in [lazy_scan(self.path), self._lazy_snapshot(expected)]:
+            self.assertEqual(
+                [rect for rect, _ in tree.generate_treemap((0, 0, 800, 1000))],
+                [rect for rect, _ in
+                 expected.generate_treemap((0, 0, 800, 1000))])
+
+    def test_same_when_expanded(self):
+        expected = FileSystemTree(self.path)
+        for tree in [lazy_scan(self.path), self._lazy_snapshot(expected)]:
+            _expand_all(tree)
+            self.assertSameTree(tree, expected)
+
+    def test_folder_added_after_size_pass(self):
+        tree = lazy_scan(self.path)
+        _make_layout(self.path, {'new': {'f6.txt': 3}})
+        _expand_all(tree)
+        self.assertSameTree(tree, FileSystemTree(self.path))
+        self.assertEqual(tree.data_size, 50)
+
+    def test_folder_emptied_after_size_pass(self):
+        tree = lazy_scan(self.path)
+        os.remove(os.path.join(self.path, 'A', 'f1.txt'))
+        os.remove(os.path.join(self.path, 'A', 'f2.txt'))
+        os.remove(os.path.join(self.path, 'A', 'f3.txt'))
+        tree.expand()
+        folder = [subtree for subtree in tree._subtrees
+                  if subtree._root == 'A'][0]
+        self.assertEqual(folder.data_size, 30)
+        self.assertTrue(folder.expand())
+        self.assertEqual((folder.data_size, tree.data_size), (0, 17))
+        self.assertFalse(folder.expand())
+        self.assertEqual(len(tree.generate_treemap((0, 0, 800, 1000))), 2)
+
+    def _lazy_snapshot(self, tree):
+        filename = os.path.join(self.tmp, 'B.tmap')
+        save_snapshot(tree, filename)
+        return lazy_load_snapshot(filename)
+
+
+class ScanFilterTest(ScannerTestCase):
+    def scan(self, rules):
+        """Return the tree of the example folder scanned with <rules>, after
+        checking that every scanner gives the same tree.
+        """
+        tree = scan_file_system(self.path, rules=rules)
+        self.assertSameTree(scan_file_system_threaded(self.path, 2, rules),
+                            tree)
+        self.assertSameTree(scan_file_system_progressive(self.path, rules),
+                            tree)
+        _sort_subtrees(tree)
+        return tree
+
+    def test_no_rules(self):
+        self.assertSameTree(self.scan(ScanFilter()),
+                            self.scan(None))
+
+    def test_exclude_names(self):
+        tree = self.scan(ScanFilter(exclude=['deep', 'f[12].txt']))
+        self.assertEqual([subtree._root for subtree in tree._subtrees],
+                         ['A', 'empty', 'f4.txt', 'zero.txt'])
+        self.assertEqual(tree.data_size, 20)
+
+    def test_excluded_folders_not_read(self):
+        listed = list()
+        real_scandir = os.scandir
+
+        def scandir(path):
+            listed.append(path)
+            return real_scandir(path)
+
+        with mock.patch.object(os, 'scandir', scandir):
+            scan_file_system(self.path, rules=ScanFilter(exclude=['deep']))
+        self.assertEqual(len(listed), 3)
+        self.assertFalse(any('deep' in path for path in listed))
+
+    def test_exclude_path(self):
+        pattern = os.path.join(self.path, 'deep', '*').replace(os.sep, '/')
+        tree = self.scan(ScanFilter(exclude=[pattern]))
+        self.assertEqual(tree._subtrees[1]._root, 'deep')
+        self.assertEqual(tree._subtrees[1]._subtrees, [])
+
+    def test_include(self):
+        tree = self.scan(ScanFilter(include=['f1.txt', 'f5.txt']))
+        self.assertEqual(tree.data_size, 22)
+        self.assertEqual(len(tree._subtrees[0]._subtrees), 1)
+
+    def test_max_depth(self):
+        self.assertEqual(self.scan(ScanFilter(max_depth=0)).data_size, 10)
+        tree = self.scan(ScanFilter(max_depth=2))
+        self.assertEqual(tree.data_size, 40)
+        # deep/a is listed, but not deep/a/b.
+        self.assertEqual(_count_depth(tree._subtrees[1]), 2)
+
+    def test_min_size(self):
+        tree = self.scan(ScanFilter(min_size=10))
+        self.assertEqual(tree.data_size, 35)
+        self.assertEqual(len(tree._subtrees[0]._subtrees), 2)
+
+    def test_one_file_system(self):
+        tree = self.scan(ScanFilter(one_file_system=True))
+        self.assertSameTree(tree, self.scan(None))
+        # Folders on another device from the folder being scanned are left
+        # out, but files are not.
+        device = os.stat(self.path).st_dev + 1
+        listing = file_scanner.list_folder(
+            self.path, ScanFilter(one_file_system=True), 0, device)
+        self.assertEqual(sorted(listing), [('f4.txt', 10), ('zero.txt', 0)])
+
+    def test_rescan_keeps_rules(self):
+        with mock.patch.object(file_scanner, '_RACY_WINDOW', 0):
+            rules = ScanFilter(exclude=['*.tmp'])
+            stamps = dict()
+            tree = scan_file_system(self.path, stamps, rules)
+            _make_layout(os.path.join(self.path, 'A'),
+                         {'f5.tmp': 20, 'f6.txt': 1})
+            rescan_file_system(tree, self.path, stamps, rules)
+        self.assertEqual(tree.data_size, 48)
+
+
+@unittest.skipUnless(sys.platform.startswith('linux'),
+                     'inotify is only available on Linux')
+class TreeWatcherTest(ScannerTestCase):
+    def setUp(self):
+        ScannerTestCase.setUp(self)
+        self.tree = scan_file_system(self.path)
+        self.watcher = TreeWatcher(self.tree, self.path)
+        self.addCleanup(self.watcher.close)
+
+    def assertUpToDate(self):
+        expected = FileSystemTree(self.path)
+        _sort_subtrees(self.tree)
+        _sort_subtrees(expected)
+        self.assertSameTree(self.tree, expected)
+
+    def test_no_changes(self):
+        self.assertEqual(self.watcher.poll(), 0)
+        self.assertUpToDate()
+
+    def test_create_and_delete(self):
+        _make_layout(os.path.join(self.path, 'A'), {'f5.txt': 20})
+        os.remove(os.path.join(self.path, 'f4.txt'))
+        self.assertEqual(self.watcher.poll(), 2)
+        self.assertUpToDate()
+        self.assertEqual(self.tree.data_size, 57)
+
+    def test_burst_of_writes(self):
+        path = os.path.join(self.path, 'A', 'f1.txt')
+        for _ in range(20):
+            with open(path, 'a') as f:
+                f.write('x')
+        # All the writes are one change to the tree.
+        self.assertEqual(self.watcher.poll(), 1)
+        self.assertUpToDate()
+        self.assertEqual(self.tree.data_size, 67)
+
+    def test_new_folder(self):
+        _make_layout(self.path, {'new': {'f6.txt': 3}})
+        self.watcher.poll()
+        self.assertUpToDate()
+        # The new folder is watched too.
+        _make_layout(os.path.join(self.path, 'new'), {'f7.txt': 4})
+        self.assertEqual(self.watcher.poll(), 1)
+        self.assertUpToDate()
+
+    def test_rename_folder(self):
+        _sort_subtrees(self.tree)
+        deep = self.tree._subtrees[1]
+        os.rename(os.path.join(self.path, 'deep'),
+                  os.path.join(self.path, 'A', 'moved'))
+        self.assertEqual(self.watcher.poll(), 1)
+        self.assertUpToDate()
+        # The folder is moved rather than scanned again, and is still
+        # watched at its new path.
+        _sort_subtrees(self.tree)
+        self.assertIs(self.tree._subtrees[0]._subtrees[3], deep)
+        _make_layout(os.path.join(self.path, 'A', 'moved', 'a'),
+                     {'f8.txt': 8})
+        self.watcher.poll()
+        self.assertUpToDate()
+
+    def test_rename_file_over_another(self):
+        os.rename(os.path.join(self.path, 'f4.txt'),
+                  os.path.join(self.path, 'A', 'f1.txt'))
+        self.watcher.poll()
+        self.assertUpToDate()
+        self.assertEqual(self.tree.data_size, 32)
+
+    def test_remove_folder(self):
+        shutil.rmtree(os.path.join(self.path, 'deep'))
+        self.watcher.poll()
+        self.assertUpToDate()
+        self.assertEqual(self.tree.data_size, 40)
+        # Only the folders left are watched.
+        self.assertEqual(len(self.watcher._watches), 3)
+
+    def test_sizes_only_change_on_path_to_root(self):
+        _sort_subtrees(self.tree)
+        folder_a = self.tree._subtrees[0]
+        deep = self.tree._subtrees[1]
+        with open(os.path.join(self.path, 'A', 'f2.txt'), 'a') as f:
+            f.write('x' * 5)
+        self.watcher.poll()
+        self.assertEqual((self.tree.data_size, folder_a.data_size,
+                          deep.data_size), (52, 35, 7))
+
+    def test_same_name_again(self):
+        path = os.path.join(self.path, 'A', 'f5.txt')
+        for size in (4, 0, 9):
+            if size:
+                _make_layout(os.path.join(self.path, 'A'), {'f5.txt': size})
+            else:
+                os.remove(path)
+            self.assertEqual(self.watcher.poll(), 1)
+            self.assertUpToDate()
+        # A file deleted from the tree, but not the disk, is added again.
+        _sort_subtrees(self.tree)
+        self.tree._subtrees[0]._subtrees[0].del_leaf()
+        with open(os.path.join(self.path, 'A', 'f1.txt'), 'a') as f:
+            f.write('x')
+        self.watcher.poll()
+        self.assertEqual(self.tree._subtrees[0].data_size, 40)
+
+    def test_close_twice(self):
+        self.watcher.close()
+        self.watcher.close()
+        self.assertEqual(self.watcher.fileno(), -1)
+
+
+class DeepTreeTest(unittest.TestCase):
+    """Trees deeper than the recursion limit can be scanned and used."""
+    def test_deep_folder(self):
+        depth = sys.getrecursionlimit() + 100
+        tmp = tempfile.mkdtemp()
+        path = tmp
+        leaf = os.path.join(tmp, 'f.txt')
+        try:
+            # os.makedirs is recursive, so make one level at a time.
+            for _ in range(depth):
+                path = os.path.join(path, 'd')
+                os.mkdir(path)
+            leaf = os.path.join(path, 'f.txt')
+            with open(leaf, 'w') as f:
+                f.write('x' * 7)
+            root = os.path.join(tmp, 'd')
+            expected = FileSystemTree(root)
+            self.assertEqual(expected.data_size, 7)
+            for tree in [scan_file_system(root),
+                         scan_file_system_threaded(root, 4),
+                         scan_file_system_progressive(root),
+                         build_flat_tree(*flatten_tree(expected))]:
+                self.assertEqual(tree.data_size, 7)
+                self.assertEqual(_count_depth(tree), depth + 1)
+        finally:
+            # shutil.rmtree is recursive too, so remove one level at a time.
+            if os.path.exists(leaf):
+                os.remove(leaf)
+            while path != tmp:
+                os.rmdir(path)
+                path = os.path.dirname(path)
+            os.rmdir(tmp)
+
+    def test_deep_tree_operations(self):
+        depth = sys.getrecursionlimit() * 5
+        leaf = FileSystemTree('f.txt', [], 200)
+        tree = leaf
+        for _ in range(depth):
+            tree = FileSystemTree('d', [FileSystemTree('g.txt', [], 100),
+                                        tree])
+        self.assertEqual(tree.data_size, 100 * depth + 200)
+        rects = tree.generate_treemap((0, 0, 800, 1000))
+        self.assertEqual(len(rects), depth + 1)
+        self.assertIs(tree.rect_dict((0, 0, 800, 1000))[rects[-1][0]], leaf)
+        self.assertEqual(leaf.get_separator(),
+                         '\\'.join(['d'] * depth + ['f.txt']))
+        leaf.alt_size()
+        self.assertEqual(tree.data_size, 100 * depth + 202)
+        leaf.del_leaf()
+        self.assertEqual(tree.data_size, 100 * depth)
+
+
+def _sort_subtrees(tree):
+    """Sort the subtrees of <tree> in alphabetical order, at every level.
+
+    @type tree: AbstractTree
+    @rtype: None
+    """
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        node._subtrees.sort(key=lambda t: t._root)
+        stack.extend(node._subtrees)
+
+
+def _expand_all(tree):
+    """Expand every folder in <tree>.
+
+    @type tree: AbstractTree
+    @rtype: None
+    """
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        node.expand()
+        stack.extend(node._subtrees)
+
+
+def _count_depth(tree):
+    """Return the number of levels on the leftmost path of <tree>.
+
+    @type tree: AbstractTree
+    @rtype: int
+    """
+    depth = 1
+    while tree._subtrees:
+        tree = tree._subtrees[0]
+        depth += 1
+    return depth
+
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
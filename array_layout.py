@@ -0,0 +1,257 @@
+"""Assignment 2: Vectorised Layout
+
+=== Module Description ===
+This module runs the treemap algorithm on an ArrayTree with NumPy, one
+level of the tree at a time, instead of one node at a time.
+
+Every folder on a level is sliced at once. The slices of a folder cannot be
+worked out independently of each other: each one is rounded down from
+what the slices before it left over, and this rounding is what decides
+where the edges of the rectangles fall. So the first subtree of every
+folder on the level is sliced at once, then the second subtree of every
+folder which has one, and so on, with the last subtree of each folder
+taking whatever is left over, as _slice_rect does. The sizes and lengths
+are worked out in the same floating point arithmetic as _slice_rect, so
+the rectangles are exactly the same, as long as the sizes are less than
+2 ** 53.
+
+Slicing the n-th subtrees of all the folders at once only pays off while
+there are many of them. Once fewer than VECTOR_MIN_FOLDERS folders on a
+level still have subtrees left to slice, e.g. the few folders with
+thousands of files, the rest of their subtrees are sliced one at a time.
+
+VectorisedNode is an ArrayNode whose layout is made this way, for the
+visualiser.
+"""
+import math
+
+import numpy
+
+from array_tree import ArrayNode
+from tree_layout import TreeLayout
+
+
+# The least number of folders whose n-th subtrees are sliced at once.
+VECTOR_MIN_FOLDERS = 32
+
+
+class VectorisedNode(ArrayNode):
+    """A handle on one node of an ArrayTree, which is laid out with NumPy.
+
+    Only the node the layout is made from needs to be a VectorisedNode.
+    The handles in its layout are ordinary ArrayNodes.
+    """
+    __slots__ = ()
+
+    def layout(self, rect, min_area=0, squarified=False):
+        """Run the treemap algorithm on this node once with NumPy, and
+        return the result, which is the same as ArrayNode.layout gives.
+
+        Only slicing is done with NumPy. A squarified layout is made as
+        ArrayNode.layout makes it.
+
+        @type self: VectorisedNode
+        @type rect: (int, int, int, int)
+        @type min_area: int
+        @type squarified: bool
+        @rtype: TreeLayout
+
+        >>> from array_tree import ArrayTree
+        >>> tree = ArrayTree(['A', 'f1', 'f2', 'f3'], [-1, 0, 0, 0],
+        ...                  [0, 15, 5, 10])
+        >>> VectorisedNode(tree, 0).layout((0, 0, 800, 1000)).treemap() == \\
+        ...     tree.root().generate_treemap((0, 0, 800, 1000))
+        True
+        """
+        if squarified:
+            return ArrayNode.layout(self, rect, min_area, squarified)
+        tree = self._tree
+        leaves, xs, ys, widths, heights = leaf_rect_arrays(tree, self._index,
+                                                           rect, min_area)
+        return TreeLayout(rect, [ArrayNode(tree, leaf)
+                                 for leaf in leaves.tolist()],
+                          list(zip(xs.tolist(), ys.tolist(), widths.tolist(),
+                                   heights.tolist())), None, min_area)
+
+
+def leaf_rect_arrays(tree, index, rect, min_area=0):
+    """Run the treemap algorithm on the subtree of node <index> of <tree>,
+    and return the index of each non-empty leaf, in the order they are
+    drawn, and the x, y, width and height of each leaf's pygame rectangle.
+
+    These are the leaves and rectangles ArrayTree._leaf_rects gives,
+    including the blocks for folders with less than <min_area> pixels.
+
+    @type tree: ArrayTree
+    @type index: int
+    @type rect: (int, int, int, int)
+    @type min_area: int
+    @rtype: (numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray,
+             numpy.ndarray)
+
+    >>> from array_tree import ArrayTree
+    >>> tree = ArrayTree(['A', 'B', 'f1', 'f2', 'f3'], [-1, 0, 1, 1, 0],
+    ...                  [0, 0, 15, 5, 10])
+    >>> [array.tolist() for array in
+    ...  leaf_rect_arrays(tree, 0, (0, 0, 800, 1000))]
+    [[2, 3, 4], [0, 600, 0], [0, 0, 666], [600, 200, 800], [666, 666, 334]]
+    """
+    # The arrays of the tree, without copying them.
+    offsets = numpy.frombuffer(tree._offsets, dtype=numpy.int64)
+    children = numpy.frombuffer(tree._children, dtype=numpy.int32)
+    sizes = numpy.frombuffer(tree._sizes, dtype=numpy.int64)
+
+    # The nodes on the current level, and their rectangles.
+    nodes = numpy.array([index], dtype=numpy.int64)
+    level_rect = [numpy.array([part], dtype=numpy.int64) for part in rect]
+    found = list()
+    while len(nodes):
+        # Empty folders and files, and deleted leaves, are not shown.
+        shown = sizes[nodes] > 0
+        nodes = nodes[shown]
+        level_rect = [part[shown] for part in level_rect]
+        first = offsets[nodes]
+        counts = offsets[nodes + 1] - first
+        leaf = (counts == 0) | (level_rect[2] * level_rect[3] < min_area)
+        found.append([nodes[leaf]] + [part[leaf] for part in level_rect])
+        folder = ~leaf
+        nodes, level_rect = _slice_level(
+            children, sizes, nodes[folder], first[folder], counts[folder],
+            [part[folder] for part in level_rect])
+
+    # Each level's leaves are in order, but the levels are mixed together
+    # in the drawing order, which is the order of the nodes' indices, since
+    # they are in preorder.
+    found = [numpy.concatenate(arrays) for arrays in zip(*found)]
+    order = numpy.argsort(found[0], kind='stable')
+    return tuple(array[order] for array in found)
+
+
+def _slice_level(children, sizes, folders, first, counts, folder_rect):
+    """Helper function for leaf_rect_arrays. Slice the rectangles of
+    <folders> among their subtrees, and return the subtrees, each folder's
+    in order, and their rectangles.
+
+    @type children: numpy.ndarray
+        The children of every node of the tree, as in ArrayTree.
+    @type sizes: numpy.ndarray
+        The data_size of every node of the tree.
+    @type folders: numpy.ndarray
+        The folders on one level which are shown.
+    @type first: numpy.ndarray
+        The position in <children> of each folder's first subtree.
+    @type counts: numpy.ndarray
+        The number of subtrees of each folder, which is at least one.
+    @type folder_rect: list[numpy.ndarray]
+        The x, y, width and height of each folder's rectangle.
+    @rtype: (numpy.ndarray, list[numpy.ndarray])
+    """
+    x, y, width, height = folder_rect
+    # Slice vertically if wider than tall, and horizontally otherwise. Only
+    # the position and length along that axis change from slice to slice.
+    vertical = width > height
+    position = numpy.where(vertical, x, y)
+    length = numpy.where(vertical, width, height)
+    total = sizes[folders]
+    # Where each folder's subtrees go in the next level.
+    start = numpy.cumsum(counts) - counts
+    positions = numpy.empty(int(counts.sum()), dtype=numpy.int64)
+    lengths = numpy.empty_like(positions)
+
+    # Slice the n-th subtree of every folder with more than n + 1 subtrees
+    # at once. Sorting the folders by how many subtrees they have, most
+    # first, makes these folders the first ones.
+    by_count = numpy.argsort(-counts, kind='stable')
+    sorted_counts = counts[by_count]
+    rank = 0
+    active = int(numpy.count_nonzero(sorted_counts > 1))
+    while active >= VECTOR_MIN_FOLDERS:
+        sliced = by_count[:active]
+        sub_sizes = sizes[children[first[sliced] + rank]]
+        remaining = total[sliced]
+        # Where nothing is left to slice, _slice_rect skips the subtree,
+        # which must be empty too, so it gets nothing.
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            new_length = numpy.where(
+                remaining > 0,
+                numpy.floor(length[sliced] * (sub_sizes / remaining)),
+                0).astype(numpy.int64)
+        positions[start[sliced] + rank] = position[sliced]
+        lengths[start[sliced] + rank] = new_length
+        position[sliced] += new_length
+        length[sliced] -= new_length
+        total[sliced] -= sub_sizes
+        rank += 1
+        active = int(numpy.count_nonzero(sorted_counts > rank + 1))
+
+    # Slice the rest of the subtrees of the few folders left one at a time,
+    # as _slice_rect does.
+    if active:
+        _slice_rest(children, sizes, by_count[:active], rank,
+                    [first, counts, start, position, length, total],
+                    positions, lengths)
+
+    # The last subtree of each folder takes whatever is left over.
+    positions[start + counts - 1] = position
+    lengths[start + counts - 1] = length
+
+    subtrees = children[numpy.repeat(first, counts) +
+                        numpy.arange(len(positions)) -
+                        numpy.repeat(start, counts)].astype(numpy.int64)
+    vertical = numpy.repeat(vertical, counts)
+    x, y, width, height = [numpy.repeat(part, counts)
+                           for part in folder_rect]
+    return subtrees, [numpy.where(vertical, positions, x),
+                      numpy.where(vertical, y, positions),
+                      numpy.where(vertical, lengths, width),
+                      numpy.where(vertical, height, lengths)]
+
+
+def _slice_rest(children, sizes, folders, rank, columns, positions,
+                lengths):
+    """Helper function for _slice_level. Slice the subtrees of each folder
+    in <folders> from the <rank>-th up to the last one, which is not
+    sliced, one at a time, in the same way as _slice_level.
+
+    @type children: numpy.ndarray
+    @type sizes: numpy.ndarray
+    @type folders: numpy.ndarray
+        The positions in the arrays of <columns> of the folders to slice.
+    @type rank: int
+    @type columns: list[numpy.ndarray]
+        The position in <children> of each folder's first subtree, the
+        number of its subtrees, where they go in <positions> and
+        <lengths>, and the position, length and data_size left to slice.
+        The last three are updated.
+    @type positions: numpy.ndarray
+    @type lengths: numpy.ndarray
+    @rtype: None
+    """
+    first, counts, start, position, length, total = columns
+    for folder in folders.tolist():
+        # Work with Python ints, so that the arithmetic is exactly that of
+        # _slice_rect.
+        at = int(position[folder])
+        left = int(length[folder])
+        remaining = int(total[folder])
+        offset = int(first[folder]) + rank
+        last = int(first[folder] + counts[folder]) - 1
+        out = int(start[folder]) + rank
+        sub_sizes = sizes[children[offset:last]].tolist()
+        new_lengths = list()
+        new_positions = list()
+        for sub_size in sub_sizes:
+            # Where nothing is left to slice, the subtree gets nothing.
+            new_length = 0
+            if remaining:
+                new_length = math.floor(left * (sub_size / remaining))
+            new_positions.append(at)
+            new_lengths.append(new_length)
+            at += new_length
+            left -= new_length
+            remaining -= sub_size
+        positions[out:out + len(sub_sizes)] = new_positions
+        lengths[out:out + len(sub_sizes)] = new_lengths
+        position[folder] = at
+        length[folder] = left
+        total[folder] = remaining
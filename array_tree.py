@@ -0,0 +1,556 @@
+"""Assignment 2: Array Trees
+
+=== Module Description ===
+This module contains ArrayTree, a way of storing a whole tree for the
+treemap visualiser in a handful of typed arrays instead of one Python object
+per node.
+
+Every AbstractTree node is an object of its own, with a list of subtrees
+if it is a folder, and a name, which adds up to well over a hundred bytes
+per node. An ArrayTree stores, for each node:
+  - the index of its parent (4 bytes),
+  - its position in a table of children (8 bytes, plus 4 bytes for its own
+    entry in its parent's children),
+  - its data_size (8 bytes), and
+  - the index of its name in a table of names (4 bytes), where every
+    distinct name is only stored once.
+
+The nodes are numbered in preorder, as in the compact form returned by
+file_scanner.flatten_tree. The children of node i are listed in the table of
+children, between positions _offsets[i] and _offsets[i + 1] (the compressed
+sparse row layout).
+
+The nodes of an ArrayTree are used through ArrayNode handles, which behave
+like AbstractTrees: they have layout, generate_treemap, rect_dict,
+del_leaf, alt_size and get_separator, and give the same results as the
+equivalent FileSystemTree. Handles are made when they are asked for, and
+cost nothing once they are dropped. Their colours are chosen by a colour
+policy, as an AbstractTree's are.
+"""
+import math
+import sys
+from array import array
+
+from file_scanner import flatten_tree, scan_flat
+from tree_snapshot import Snapshot
+from tree_colour import PathColours
+from tree_paths import PathTable
+from tree_layout import TreeLayout
+from tree_squarify import squarify_rect, forget_order
+from tree_data import alt_change
+
+
+class ArrayTree:
+    """A tree stored in typed arrays.
+
+    === Private Attributes ===
+    @type _parents: array
+        The index of each node's parent, or -1 for the root and for deleted
+        leaves.
+    @type _offsets: array
+        The position in _children of each node's first child. The children
+        of node i are at positions _offsets[i] to _offsets[i + 1].
+    @type _children: array
+        The indices of the children of every node, in order.
+    @type _sizes: array
+        The data_size of each node.
+    @type _name_ids: array
+        The index in _names of each node's name. A deleted leaf has the
+        bitwise inverse of its name's index, which is negative, so that it
+        can be undeleted.
+    @type _names: list[str]
+        Every distinct name in the tree.
+    @type _paths: PathTable
+        The paths of the folders of this tree, used by get_separator.
+    @type _orders: dict[int, list[ArrayNode]]
+        The non-empty children of each node, largest first, once
+        tree_squarify.sorted_subtrees has sorted them.
+
+    === Representation Invariants ===
+    - Every array has one entry per node, apart from _offsets, which has one
+      more, and _children, which has one fewer.
+    - _parents[i] < i for every node but the root, which is node 0, and
+      which has _parents[0] == -1.
+    - The data_size of a node with children is the sum of its children's.
+    """
+    def __init__(self, names, parents, sizes, separator='\\'):
+        """Initialize an ArrayTree from the compact form of a tree, as
+        returned by file_scanner.flatten_tree.
+
+        Precondition: the nodes are in preorder, so that parents[i] < i for
+                      every node but the root, which is node 0. sizes[i] is
+                      0 for every node with children.
+
+        @type self: ArrayTree
+        @type names: list[str]
+        @type parents: list[int] | array
+        @type sizes: list[int] | array
+        @type separator: str
+        @rtype: None
+        """
+        count = len(names)
+        self._paths = PathTable(separator)
+        self._orders = dict()
+        self._parents = array('i', parents)
+        self._sizes = array('q', sizes)
+
+        # Intern the names, so that a name shared by many nodes (such as
+        # __init__.py) is only stored once.
+        self._names = list()
+        self._name_ids = array('i')
+        name_ids = dict()
+        for name in names:
+            name_id = name_ids.get(name)
+            if name_id is None:
+                name_id = name_ids[name] = len(self._names)
+                self._names.append(sys.intern(name))
+            self._name_ids.append(name_id)
+
+        # Count the children of each node, and turn the counts into the
+        # position of each node's first child.
+        self._offsets = array('q', bytes(8 * (count + 1)))
+        for index in range(1, count):
+            self._offsets[self._parents[index] + 1] += 1
+        for index in range(count):
+            self._offsets[index + 1] += self._offsets[index]
+        # Fill in the children. Each node's children are visited in order,
+        # since they are in preorder.
+        self._children = array('i', bytes(4 * max(count - 1, 0)))
+        next_child = self._offsets[:-1]
+        for index in range(1, count):
+            parent = self._parents[index]
+            self._children[next_child[parent]] = index
+            next_child[parent] += 1
+
+        # Children come after their parents, so going backwards adds up
+        # every node before its parent is reached.
+        for index in range(count - 1, 0, -1):
+            self._sizes[self._parents[index]] += self._sizes[index]
+
+    def __len__(self):
+        """Return the number of nodes in this tree, including deleted
+        leaves.
+
+        @type self: ArrayTree
+        @rtype: int
+        """
+        return len(self._sizes)
+
+    def root(self):
+        """Return the root node of this tree.
+
+        @type self: ArrayTree
+        @rtype: ArrayNode
+        """
+        return ArrayNode(self, 0)
+
+    def _leaf_rects(self, index, rect, min_area=0, squarified=False):
+        """Run the treemap algorithm on the subtree of node <index>,
+        yielding each non-empty leaf's index together with its pygame
+        rectangle.
+
+        The rectangles are exactly those AbstractTree._leaf_rects gives for
+        the same tree, in the same order. Folders whose rectangles have
+        less than <min_area> pixels are yielded as blocks, like leaves, and
+        folders are squarified if <squarified> is True, as
+        AbstractTree.layout does.
+
+        @type self: ArrayTree
+        @type index: int
+        @type rect: (int, int, int, int)
+        @type min_area: int
+        @type squarified: bool
+        @rtype: iterator[(int, (int, int, int, int))]
+        """
+        sizes = self._sizes
+        offsets = self._offsets
+        children = self._children
+        stack = [(index, rect)]
+        while stack:
+            node, node_rect = stack.pop()
+            total = sizes[node]
+            # Empty folders and files, and deleted leaves, are not shown.
+            if not total:
+                continue
+            first, last = offsets[node], offsets[node + 1] - 1
+            if first > last or node_rect[2] * node_rect[3] < min_area:
+                yield node, node_rect
+                continue
+            if squarified:
+                # The squarified algorithm works on handles, which are only
+                # made for the folders.
+                stack.extend((child._index, child_rect) for child, child_rect
+                             in reversed(squarify_rect(ArrayNode(self, node),
+                                                       node_rect)))
+                continue
+            # Slice the rectangle among the children as _slice_rect does:
+            # vertically if it is wider than it is tall, rounding each slice
+            # down, with the last child taking whatever is left over.
+            x, y, width, height = node_rect
+            vertical = width > height
+            slices = list()
+            for child in children[first:last]:
+                if not total:
+                    continue
+                child_size = sizes[child]
+                if vertical:
+                    new_width = math.floor(width * (child_size / total))
+                    slices.append((child, (x, y, new_width, height)))
+                    x += new_width
+                    width -= new_width
+                else:
+                    new_height = math.floor(height * (child_size / total))
+                    slices.append((child, (x, y, width, new_height)))
+                    y += new_height
+                    height -= new_height
+                total -= child_size
+            slices.append((children[last], (x, y, width, height)))
+            slices.reverse()
+            stack.extend(slices)
+
+    def _adjust_size(self, index, change):
+        """Add <change> to the data_size of node <index> and of each of its
+        ancestors.
+
+        @type self: ArrayTree
+        @type index: int
+        @type change: int
+        @rtype: None
+        """
+        while index >= 0:
+            self._sizes[index] += change
+            forget_order(ArrayNode(self, index))
+            index = self._parents[index]
+
+
+class ArrayNode:
+    """A handle on one node of an ArrayTree, which can be used like an
+    AbstractTree.
+
+    Two handles on the same node are equal.
+
+    === Public Attributes ===
+    @type colour_policy: ColourPolicy
+        The policy choosing the colours of nodes. This belongs to the class,
+        not to each handle.
+
+    === Private Attributes ===
+    @type _tree: ArrayTree
+        The tree the node is in.
+    @type _index: int
+        The index of the node in <_tree>.
+    """
+    __slots__ = ('_tree', '_index')
+
+    colour_policy = PathColours()
+
+    def __init__(self, tree, index):
+        """Initialize a handle on node <index> of <tree>.
+
+        @type self: ArrayNode
+        @type tree: ArrayTree
+        @type index: int
+        @rtype: None
+        """
+        self._tree = tree
+        self._index = index
+
+    def __eq__(self, other):
+        return (isinstance(other, ArrayNode) and self._tree is other._tree and
+                self._index == other._index)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((id(self._tree), self._index))
+
+    @property
+    def data_size(self):
+        """The total size of all leaves of this node.
+
+        @type self: ArrayNode
+        @rtype: int
+        """
+        return self._tree._sizes[self._index]
+
+    @property
+    def colour(self):
+        """The RGB colour of this node, as chosen by colour_policy.
+
+        @type self: ArrayNode
+        @rtype: (int, int, int)
+        """
+        return self.colour_policy.colour(self)
+
+    @property
+    def _root(self):
+        """The name of this node, or None if it has been deleted.
+
+        @type self: ArrayNode
+        @rtype: str | None
+        """
+        name_id = self._tree._name_ids[self._index]
+        if name_id < 0:
+            return None
+        return self._tree._names[name_id]
+
+    @property
+    def _subtrees(self):
+        """Handles on the children of this node, in order.
+
+        @type self: ArrayNode
+        @rtype: list[ArrayNode]
+        """
+        tree = self._tree
+        return [ArrayNode(tree, child) for child in tree._children[
+            tree._offsets[self._index]:tree._offsets[self._index + 1]]]
+
+    @property
+    def _order(self):
+        """The non-empty children of this node, largest first, once
+        tree_squarify.sorted_subtrees has sorted them, or None.
+
+        @type self: ArrayNode
+        @rtype: list[ArrayNode] | None
+        """
+        return self._tree._orders.get(self._index)
+
+    @_order.setter
+    def _order(self, order):
+        """Keep <order> as the sorted children of this node, or forget them
+        if it is None.
+
+        @type self: ArrayNode
+        @type order: list[ArrayNode] | None
+        @rtype: None
+        """
+        if order is None:
+            self._tree._orders.pop(self._index, None)
+        else:
+            self._tree._orders[self._index] = order
+
+    @property
+    def _parent_tree(self):
+        """A handle on the parent of this node, or None if it has none.
+
+        @type self: ArrayNode
+        @rtype: ArrayNode | None
+        """
+        parent = self._tree._parents[self._index]
+        if parent < 0:
+            return None
+        return ArrayNode(self._tree, parent)
+
+    def is_empty(self):
+        """Return True if this node is empty, i.e. a deleted leaf.
+
+        @type self: ArrayNode
+        @rtype: bool
+        """
+        return self._tree._name_ids[self._index] < 0
+
+    def generate_treemap(self, rect, squarified=False):
+        """Run the treemap algorithm on this node and return the rectangles,
+        as AbstractTree.generate_treemap does.
+
+        @type self: ArrayNode
+        @type rect: (int, int, int, int)
+        @type squarified: bool
+        @rtype: list[((int, int, int, int), (int, int, int))]
+
+        >>> tree = ArrayTree(['A', 'f1', 'f2', 'f3'], [-1, 0, 0, 0],
+        ...                  [0, 15, 5, 10])
+        >>> for result in tree.root().generate_treemap((0, 0, 800, 1000)):
+        ...     print(result[0])
+        (0, 0, 800, 500)
+        (0, 500, 800, 166)
+        (0, 666, 800, 334)
+        """
+        return self.layout(rect, squarified=squarified).treemap()
+
+    def rect_dict(self, rect, squarified=False):
+        """Return a dictionary mapping the rectangle of each non-empty leaf
+        of this node to a handle on the leaf, as AbstractTree.rect_dict
+        does.
+
+        @type self: ArrayNode
+        @type rect: (int, int, int, int)
+        @type squarified: bool
+        @rtype: dict[tuple, ArrayNode]
+        """
+        return self.layout(rect, squarified=squarified).rect_dict()
+
+    def layout(self, rect, min_area=0, squarified=False):
+        """Run the treemap algorithm on this node once, and return the
+        result, as AbstractTree.layout does.
+
+        @type self: ArrayNode
+        @type rect: (int, int, int, int)
+        @type min_area: int
+        @type squarified: bool
+        @rtype: TreeLayout
+        """
+        tree = self._tree
+        leaves = list()
+        rects = list()
+        for leaf, leaf_rect in tree._leaf_rects(self._index, rect, min_area,
+                                                squarified):
+            leaves.append(ArrayNode(tree, leaf))
+            rects.append(leaf_rect)
+        return TreeLayout(rect, leaves, rects, None, min_area, squarified)
+
+    def relayout(self, layout, node):
+        """Bring <layout>, a layout of this node, up to date after the
+        data_size of <node> has changed, as AbstractTree.relayout does.
+
+        The layout of an ArrayTree is always made again from scratch, since
+        slicing its arrays is already quick.
+
+        @type self: ArrayNode
+        @type layout: TreeLayout
+        @type node: ArrayNode | None
+        @rtype: None
+        """
+        fresh = self.layout(layout.rect, layout.min_area, layout.squarified)
+        layout._reset(fresh._leaves, fresh._rects, None)
+
+    def del_leaf(self, data_size=0):
+        """Delete this node if it is a leaf, as AbstractTree.del_leaf does:
+        it becomes an empty tree, and its size is taken off its ancestors'.
+
+        If this node has children, <data_size> is taken off it and its
+        ancestors instead.
+
+        @type self: ArrayNode
+        @type data_size: int
+        @rtype: None
+
+        >>> tree = ArrayTree(['A', 'f1', 'f2'], [-1, 0, 0], [0, 15, 5])
+        >>> f1 = tree.root()._subtrees[0]
+        >>> f1.del_leaf()
+        >>> f1.data_size, f1.is_empty(), f1._parent_tree, tree.root().data_size
+        (0, True, None, 5)
+        """
+        tree = self._tree
+        index = self._index
+        if tree._offsets[index] == tree._offsets[index + 1]:
+            parent = tree._parents[index]
+            if parent >= 0:
+                tree._adjust_size(parent, -tree._sizes[index])
+            tree._sizes[index] = 0
+            tree._name_ids[index] = ~tree._name_ids[index]
+            tree._parents[index] = -1
+        else:
+            tree._adjust_size(index, -data_size)
+
+    def _undelete(self, parent, name, data_size, rank):
+        """Undo del_leaf on this leaf, which had a size of <data_size> and
+        was a child of <parent>, as AbstractTree._undelete does.
+
+        <name> and <rank> are not needed, since a deleted leaf keeps its
+        name and its place in the tree.
+
+        @type self: ArrayNode
+        @type parent: ArrayNode | None
+        @type name: str
+        @type data_size: int
+        @type rank: int
+        @rtype: None
+        """
+        tree = self._tree
+        tree._name_ids[self._index] = ~tree._name_ids[self._index]
+        if parent is not None:
+            tree._parents[self._index] = parent._index
+        tree._adjust_size(self._index, data_size)
+
+    def alt_size(self, data_size=0, positive=True):
+        """Change the data_size of this leaf by one percent, and its
+        ancestors' with it, as AbstractTree.alt_size does.
+
+        If this node has children, it and its ancestors are changed by
+        <data_size> instead.
+
+        @type self: ArrayNode
+        @type data_size: int
+        @type positive: bool
+        @rtype: None
+
+        >>> tree = ArrayTree(['A', 'f1', 'f2'], [-1, 0, 0], [0, 15, 2])
+        >>> f2 = tree.root()._subtrees[1]
+        >>> f2.alt_size(positive=False)
+        >>> f2.data_size, tree.root().data_size
+        (1, 16)
+        """
+        tree = self._tree
+        index = self._index
+        if tree._offsets[index] == tree._offsets[index + 1]:
+            tree._adjust_size(index, alt_change(tree._sizes[index],
+                                                positive))
+        elif positive:
+            tree._adjust_size(index, data_size)
+        else:
+            tree._adjust_size(index, -data_size)
+
+    def _adjust_size(self, change):
+        """Add <change> to the data_size of this node and of each of its
+        ancestors.
+
+        @type self: ArrayNode
+        @type change: int
+        @rtype: None
+        """
+        self._tree._adjust_size(self._index, change)
+
+    def get_separator(self):
+        """Return the names from the root of the tree down to this node,
+        separated by the tree's separator.
+
+        @type self: ArrayNode
+        @rtype: str
+
+        >>> tree = ArrayTree(['B', 'A', 'f1'], [-1, 0, 1], [0, 0, 15])
+        >>> tree.root()._subtrees[0]._subtrees[0].get_separator()
+        'B\\\\A\\\\f1'
+        """
+        return self._tree._paths.path(self)
+
+
+def array_tree_from_tree(tree, separator='\\'):
+    """Return an ArrayTree with the same nodes as <tree>.
+
+    Deleted leaves are left out.
+
+    @type tree: AbstractTree
+    @type separator: str
+    @rtype: ArrayTree
+    """
+    return ArrayTree(*flatten_tree(tree), separator=separator)
+
+
+def scan_array_tree(path):
+    """Return an ArrayTree of the given file or folder.
+
+    The file system is scanned straight into arrays, without building a
+    FileSystemTree first.
+
+    Precondition: <path> is a valid path for this computer.
+
+    @type path: str
+    @rtype: ArrayTree
+    """
+    return ArrayTree(*scan_flat(path))
+
+
+def load_array_snapshot(filename):
+    """Return an ArrayTree of the tree stored in the snapshot file
+    <filename>.
+
+    Raise ValueError if <filename> is not a snapshot this module can read.
+
+    @type filename: str
+    @rtype: ArrayTree
+    """
+    with Snapshot(filename) as snapshot:
+        names = [snapshot.name(index) for index in range(len(snapshot))]
+        return ArrayTree(names, snapshot.parents, snapshot.sizes)
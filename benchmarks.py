@@ -0,0 +1,1414 @@
+"""Assignment 2: Benchmarks
+
+=== Module Description ===
+This module contains benchmarks comparing the different ways of building and
+using trees for the treemap visualiser.
+
+Each benchmark prints a small table of its measurements. Run this module with
+a path to benchmark on that folder, e.g.
+    python benchmarks.py /usr/share
+
+NumPy is only needed by the benchmarks of the layout made with it, which
+import it when they are run.
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from tree_data import FileSystemTree, _slice_rect
+from file_scanner import scan_file_system, scan_file_system_threaded, \
+    scan_file_system_sharded, rescan_file_system, build_flat_tree
+import file_scanner
+from tree_snapshot import save_snapshot, load_snapshot
+from lazy_tree import lazy_scan, lazy_load_snapshot
+from scan_filter import ScanFilter
+import tree_data
+from array_tree import ArrayTree, array_tree_from_tree
+from tree_layout import LayoutCache
+import tree_squarify
+from latency_histogram import LatencyHistogram
+
+
+##############################################################################
+# Helpers
+##############################################################################
+def _time_call(function, *args):
+    """Return how many seconds it takes to call <function> with <args>, along
+    with the value it returns.
+
+    @type function: callable
+    @rtype: (float, object)
+    """
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def _best_time(function, args, repeat):
+    """Return the fastest of <repeat> timings of calling <function> with
+    <args>.
+
+    @type function: callable
+    @type args: tuple
+    @type repeat: int
+    @rtype: float
+    """
+    return min(_time_call(function, *args)[0] for _ in range(repeat))
+
+
+def _print_table(title, header, rows):
+    """Print a table of benchmark results.
+
+    @type title: str
+    @type header: list[str]
+    @type rows: list[list[object]]
+    @rtype: None
+    """
+    print(title)
+    widths = [max(len(str(row[i])) for row in [header] + rows)
+              for i in range(len(header))]
+    for row in [header] + rows:
+        print('  '.join(str(cell).rjust(width)
+                        for cell, width in zip(row, widths)))
+    print()
+
+
+class _SyscallCounter:
+    """Count the calls a scanner makes into the operating system.
+
+    While counting, os.stat, os.listdir and os.scandir are replaced by
+    wrappers that count every call before forwarding it. os.path.isfile and
+    os.path.getsize both call os.stat, so they are counted as well. The
+    DirEntry objects returned by os.scandir are wrapped so that the stat
+    calls made through them are counted too.
+
+    Each counted call corresponds to one stat system call, or to one
+    open/read/close sequence on a directory.
+
+    === Public Attributes ===
+    @type stats: int
+        The number of stat calls made.
+    @type listings: int
+        The number of directory listings made.
+    """
+    def __init__(self):
+        """Initialize a new _SyscallCounter with no calls counted.
+
+        @type self: _SyscallCounter
+        @rtype: None
+        """
+        self.stats = 0
+        self.listings = 0
+        self._originals = None
+
+    def __enter__(self):
+        """Start counting calls.
+
+        @type self: _SyscallCounter
+        @rtype: _SyscallCounter
+        """
+        self._originals = (os.stat, os.listdir, os.scandir)
+        real_stat, real_listdir, real_scandir = self._originals
+
+        def counting_stat(*args, **kwargs):
+            self.stats += 1
+            return real_stat(*args, **kwargs)
+
+        def counting_listdir(*args, **kwargs):
+            self.listings += 1
+            return real_listdir(*args, **kwargs)
+
+        def counting_scandir(*args, **kwargs):
+            self.listings += 1
+            return _CountingScandir(real_scandir(*args, **kwargs), self)
+
+        os.stat, os.listdir, os.scandir = \
+            counting_stat, counting_listdir, counting_scandir
+        return self
+
+    def __exit__(self, *exc_info):
+        """Stop counting calls.
+
+        @type self: _SyscallCounter
+        @rtype: None
+        """
+        os.stat, os.listdir, os.scandir = self._originals
+
+
+class _CountingScandir:
+    """A wrapper around an os.scandir iterator whose entries count their stat
+    calls in a _SyscallCounter.
+    """
+    def __init__(self, scan, counter):
+        """Initialize a new _CountingScandir.
+
+        @type self: _CountingScandir
+        @type scan: iterator
+        @type counter: _SyscallCounter
+        @rtype: None
+        """
+        self._scan = scan
+        self._counter = counter
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._scan.close()
+
+    def __iter__(self):
+        for entry in self._scan:
+            yield _CountingEntry(entry, self._counter)
+
+
+class _CountingEntry:
+    """A wrapper around an os.DirEntry that counts its stat calls.
+
+    DirEntry caches the result of its first stat call, so only that one is
+    counted.
+    """
+    def __init__(self, entry, counter):
+        """Initialize a new _CountingEntry.
+
+        @type self: _CountingEntry
+        @type entry: os.DirEntry
+        @type counter: _SyscallCounter
+        @rtype: None
+        """
+        self._entry = entry
+        self._counter = counter
+        self._stat_done = False
+
+    def __getattr__(self, name):
+        return getattr(self._entry, name)
+
+    def stat(self, **kwargs):
+        """Return the stat of the wrapped entry, counting the first call.
+
+        @type self: _CountingEntry
+        @rtype: os.stat_result
+        """
+        if not self._stat_done:
+            self._counter.stats += 1
+            self._stat_done = True
+        return self._entry.stat(**kwargs)
+
+
+def _format_time(function, args, repeat):
+    """Return the fastest of <repeat> timings of calling <function> with
+    <args>, formatted for a table, or the name of the error raised if the
+    call fails.
+
+    @type function: callable
+    @type args: tuple
+    @type repeat: int
+    @rtype: str
+    """
+    try:
+        return '{:.4f}'.format(_best_time(function, args, repeat))
+    except RecursionError:
+        return 'RecursionError'
+
+
+def _peak_memory(function, *args):
+    """Return the peak memory allocated by Python in this process while
+    calling <function> with <args>, in bytes.
+
+    Memory allocated by other processes, such as the workers of a process
+    pool, is not included.
+
+    @type function: callable
+    @rtype: int
+    """
+    tracemalloc.start()
+    try:
+        function(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _retained_memory(function, *args):
+    """Return the memory allocated by Python in this process by calling
+    <function> with <args> which is still in use when it returns, in bytes,
+    along with the value it returns.
+
+    @type function: callable
+    @rtype: (int, object)
+    """
+    tracemalloc.start()
+    try:
+        result = function(*args)
+        return tracemalloc.get_traced_memory()[0], result
+    finally:
+        tracemalloc.stop()
+
+
+def _count_nodes(tree):
+    """Return the number of nodes in <tree>.
+
+    @type tree: AbstractTree
+    @rtype: int
+    """
+    count = 0
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(node._subtrees)
+    return count
+
+
+def _count_subtree_lists(tree):
+    """Return the number of different lists of subtrees in <tree>.
+
+    @type tree: AbstractTree
+    @rtype: int
+    """
+    lists = set()
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        lists.add(id(node._subtrees))
+        stack.extend(node._subtrees)
+    return len(lists)
+
+
+def _deep_narrow_tree(depth):
+    """Return a FileSystemTree with <depth> nested folders, each holding one
+    file, plus one more file at the bottom.
+
+    @type depth: int
+    @rtype: FileSystemTree
+    """
+    tree = FileSystemTree('f.txt', [], 200)
+    for _ in range(depth):
+        tree = FileSystemTree('d', [FileSystemTree('g.txt', [], 100), tree])
+    return tree
+
+
+def _shallow_wide_tree(folders, files):
+    """Return a FileSystemTree with <folders> folders of <files> files each.
+
+    @type folders: int
+    @type files: int
+    @rtype: FileSystemTree
+    """
+    return FileSystemTree('root', [
+        FileSystemTree('d', [FileSystemTree('f.txt', [], 100 + i)
+                             for i in range(files)])
+        for _ in range(folders)])
+
+
+def _deep_folder_tree(depth, files):
+    """Return a FileSystemTree of <depth> nested folders, with <files> files
+    in the deepest one.
+
+    @type depth: int
+    @type files: int
+    @rtype: FileSystemTree
+    """
+    tree = FileSystemTree('d', [FileSystemTree('f{}.txt'.format(i), [], 1)
+                                for i in range(files)])
+    for i in range(depth - 1):
+        tree = FileSystemTree('d{}'.format(i), [tree])
+    return tree
+
+
+def _scanned_wide_tree(folders, files):
+    """Return a FileSystemTree with <folders> folders of <files> files each,
+    in which every node's name is a new string, as it is when the names come
+    from os.scandir.
+
+    @type folders: int
+    @type files: int
+    @rtype: FileSystemTree
+    """
+    return FileSystemTree('root', [
+        FileSystemTree('d{}'.format(j), [
+            FileSystemTree('f{}.txt'.format(i), [], 100 + i)
+            for i in range(files)])
+        for j in range(folders)])
+
+
+def _shallow_wide_flat_tree(folders, files):
+    """Return the compact form, as returned by file_scanner.flatten_tree, of
+    a tree with <folders> folders of <files> files each.
+
+    @type folders: int
+    @type files: int
+    @rtype: (list[str], list[int], list[int])
+    """
+    names = ['root']
+    parents = [-1]
+    sizes = [0]
+    for _ in range(folders):
+        folder = len(names)
+        names.append('d')
+        parents.append(0)
+        sizes.append(0)
+        for i in range(files):
+            names.append('f{}.txt'.format(i))
+            parents.append(folder)
+            sizes.append(100 + i)
+    return names, parents, sizes
+
+
+def _make_deep_narrow_folder(path, depth):
+    """Create <depth> nested folders inside <path>, each holding one file.
+
+    @type path: str
+    @type depth: int
+    @rtype: None
+    """
+    # os.makedirs is recursive, so make one level at a time.
+    for _ in range(depth):
+        path = os.path.join(path, 'd')
+        os.mkdir(path)
+        with open(os.path.join(path, 'f.txt'), 'w') as f:
+            f.write('x' * 100)
+
+
+def _make_shallow_wide_folder(path, folders, files):
+    """Create <folders> folders of <files> files each inside <path>.
+
+    @type path: str
+    @type folders: int
+    @type files: int
+    @rtype: None
+    """
+    for i in range(folders):
+        folder = os.path.join(path, 'd' + str(i))
+        os.mkdir(folder)
+        for j in range(files):
+            with open(os.path.join(folder, 'f' + str(j)), 'w') as f:
+                f.write('x' * j)
+
+
+def _remove_folder(path):
+    """Remove the folder at <path> and everything in it, however deep.
+
+    shutil.rmtree and os.walk are both recursive, so the folders are found
+    with an explicit stack and removed in the reverse order they were found,
+    i.e. every folder after everything inside it.
+
+    @type path: str
+    @rtype: None
+    """
+    folders = list()
+    stack = [path]
+    while stack:
+        folder = stack.pop()
+        folders.append(folder)
+        with os.scandir(folder) as scan:
+            for entry in scan:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                else:
+                    os.remove(entry.path)
+    for folder in reversed(folders):
+        os.rmdir(folder)
+
+
+##############################################################################
+# Recursive reference implementations
+##############################################################################
+# These are the recursive versions of the tree operations that were replaced
+# by explicit-stack versions, kept to benchmark against.
+def _recursive_scan(path):
+    """Return a FileSystemTree of <path>, built the way the FileSystemTree
+    constructor used to, with one recursive call per path.
+
+    @type path: str
+    @rtype: FileSystemTree
+    """
+    if os.path.isfile(path):
+        return FileSystemTree(path, [], os.path.getsize(path))
+    return FileSystemTree(path, [_recursive_scan(os.path.join(path, name))
+                                 for name in os.listdir(path)])
+
+
+def _recursive_treemap(tree, rect):
+    """Return tree.generate_treemap(rect), computed with recursion.
+
+    @type tree: AbstractTree
+    @type rect: (int, int, int, int)
+    @rtype: list[((int, int, int, int), (int, int, int))]
+    """
+    if not tree.data_size:
+        return []
+    elif not tree._subtrees:
+        return [(rect, tree.colour)]
+    treemap = list()
+    for subtree, sub_rect in _slice_rect(tree, rect):
+        treemap.extend(_recursive_treemap(subtree, sub_rect))
+    return treemap
+
+
+def _recursive_rect_dict(tree, rect):
+    """Return tree.rect_dict(rect), computed with recursion.
+
+    @type tree: AbstractTree
+    @type rect: (int, int, int, int)
+    @rtype: dict[tuple, AbstractTree]
+    """
+    if not tree.data_size:
+        return {}
+    elif not tree._subtrees:
+        return {rect: tree}
+    pos_dict = dict()
+    for subtree, sub_rect in _slice_rect(tree, rect):
+        pos_dict.update(_recursive_rect_dict(subtree, sub_rect))
+    return pos_dict
+
+
+def _recursive_adjust_size(tree, change):
+    """Add <change> to the data_size of <tree> and its ancestors, with
+    recursion, as del_leaf and alt_size used to.
+
+    @type tree: AbstractTree
+    @type change: int
+    @rtype: None
+    """
+    tree.data_size += change
+    if tree._parent_tree:
+        _recursive_adjust_size(tree._parent_tree, change)
+
+
+def _recursive_separator(tree):
+    """Return tree.get_separator(), computed with recursion.
+
+    @type tree: FileSystemTree
+    @rtype: str
+    """
+    if tree._parent_tree:
+        return _recursive_separator(tree._parent_tree) + '\\' + tree._root
+    return tree._root
+
+
+def _joined_path(tree):
+    """Return tree.get_separator(), computed by walking up to the root and
+    joining every name, without a PathTable.
+
+    @type tree: FileSystemTree
+    @rtype: str
+    """
+    names = list()
+    while tree is not None:
+        names.append(tree._root)
+        tree = tree._parent_tree
+    names.reverse()
+    return '\\'.join(names)
+
+
+def _deepest_leaf(tree):
+    """Return the last leaf in the last folder at each level of <tree>.
+
+    @type tree: AbstractTree
+    @rtype: AbstractTree
+    """
+    while tree._subtrees:
+        tree = tree._subtrees[-1]
+    return tree
+
+
+##############################################################################
+# Benchmarks
+##############################################################################
+def compare_scanners(path, repeat=3):
+    """Compare building a tree of <path> with the FileSystemTree constructor
+    against building it with the scanners in file_scanner.
+
+    Both the number of calls into the operating system and the best wall-clock
+    time over <repeat> runs are reported. The calls are counted in a separate
+    run, so that counting does not slow down the timed runs.
+
+    @type path: str
+    @type repeat: int
+    @rtype: None
+    """
+    rows = list()
+    for name, scanner in [('FileSystemTree', FileSystemTree),
+                          ('scan_file_system', scan_file_system),
+                          ('threaded, 4 workers',
+                           lambda p: scan_file_system_threaded(p, 4)),
+                          ('threaded, 16 workers',
+                           lambda p: scan_file_system_threaded(p, 16))]:
+        with _SyscallCounter() as counter:
+            nodes = _count_nodes(scanner(path))
+        seconds = _best_time(scanner, (path,), repeat)
+        rows.append([name, nodes, counter.stats, counter.listings,
+                     counter.stats + counter.listings,
+                     '{:.3f}'.format(seconds)])
+    _print_table('Scanning ' + path,
+                 ['scanner', 'nodes', 'stats', 'listings', 'calls',
+                  'seconds'], rows)
+
+
+def compare_sharded_scan(path, max_workers=None, repeat=3):
+    """Compare a single-process scan of <path> against
+    file_scanner.scan_file_system_sharded.
+
+    The best wall-clock time over <repeat> runs and the peak memory
+    allocated in this (the parent) process are reported. Memory is measured
+    in a separate run, since tracing allocations slows the scan down.
+
+    @type path: str
+    @type max_workers: int | None
+    @type repeat: int
+    @rtype: None
+    """
+    rows = list()
+    for name, scanner in [('single process', scan_file_system),
+                          ('sharded', lambda p: scan_file_system_sharded(
+                              p, max_workers))]:
+        seconds = _best_time(scanner, (path,), repeat)
+        peak = _peak_memory(scanner, path)
+        rows.append([name, '{:.3f}'.format(seconds),
+                     '{:.1f}'.format(peak / 2 ** 20)])
+    _print_table('Sharded scan of ' + path,
+                 ['scan', 'seconds', 'peak parent MiB'], rows)
+
+
+def compare_recursive_and_iterative(depth=20000, folders=1000, files=100,
+                                    repeat=3):
+    """Compare the recursive tree operations against their explicit-stack
+    versions, on a deep-narrow and a shallow-wide synthetic tree.
+
+    Scanning is compared on folders created in a temporary directory. These
+    are smaller than the synthetic trees, since a path can only be a few
+    thousand characters long.
+
+    A recursive operation that fails on a deep tree is reported with
+    RecursionError instead of a time.
+
+    @type depth: int
+    @type folders: int
+    @type files: int
+    @type repeat: int
+    @rtype: None
+    """
+    rect = (0, 0, 1024, 738)
+    rows = list()
+    for shape, tree in [('deep-narrow', _deep_narrow_tree(depth)),
+                        ('shallow-wide', _shallow_wide_tree(folders, files))]:
+        leaf = _deepest_leaf(tree)
+        # Each operation, with its recursive and iterative versions and the
+        # arguments to call each of them with.
+        for operation, recursive, recursive_args, iterative, args in [
+                ('generate_treemap', _recursive_treemap, (tree, rect),
+                 tree.generate_treemap, (rect,)),
+                ('rect_dict', _recursive_rect_dict, (tree, rect),
+                 tree.rect_dict, (rect,)),
+                ('ancestor update', _recursive_adjust_size, (leaf, 0),
+                 leaf._adjust_size, (0,)),
+                ('get_separator', _recursive_separator, (leaf,),
+                 leaf.get_separator, ())]:
+            rows.append([shape, operation,
+                         _format_time(recursive, recursive_args, repeat),
+                         _format_time(iterative, args, repeat)])
+
+    tmp = tempfile.mkdtemp()
+    try:
+        deep_path = os.path.join(tmp, 'deep')
+        wide_path = os.path.join(tmp, 'wide')
+        os.mkdir(deep_path)
+        os.mkdir(wide_path)
+        _make_deep_narrow_folder(deep_path, min(depth, 1500))
+        _make_shallow_wide_folder(wide_path, folders // 10, files)
+        for shape, path in [('deep-narrow', deep_path),
+                            ('shallow-wide', wide_path)]:
+            rows.append([shape, 'scan', _format_time(_recursive_scan,
+                                                      (path,), repeat),
+                         _format_time(FileSystemTree, (path,), repeat)])
+    finally:
+        _remove_folder(tmp)
+
+    _print_table('Recursive and explicit-stack tree operations',
+                 ['tree', 'operation', 'recursive', 'explicit stack'], rows)
+
+
+def compare_snapshot(path, repeat=3):
+    """Compare scanning <path> against saving and loading a snapshot of it.
+
+    @type path: str
+    @type repeat: int
+    @rtype: None
+    """
+    tree = scan_file_system(path)
+    handle, filename = tempfile.mkstemp(suffix='.tmap')
+    os.close(handle)
+    try:
+        rows = [['scan', _format_time(scan_file_system, (path,), repeat)],
+                ['save snapshot', _format_time(save_snapshot,
+                                               (tree, filename), repeat)],
+                ['load snapshot', _format_time(load_snapshot, (filename,),
+                                               repeat)]]
+        title = 'Snapshot of {} ({} nodes, {} bytes)'.format(
+            path, _count_nodes(tree), os.path.getsize(filename))
+    finally:
+        os.remove(filename)
+    _print_table(title, ['operation', 'seconds'], rows)
+
+
+def compare_incremental_rescan(folders=200, files=50, changed=5, repeat=3):
+    """Compare a full scan against an incremental rescan of a folder, after
+    <changed> of its <folders> sub-folders have had a file added.
+
+    The folder is created in a temporary directory, and the benchmark waits
+    until its stamps are old enough to be trusted by rescan_file_system.
+
+    @type folders: int
+    @type files: int
+    @type changed: int
+    @type repeat: int
+    @rtype: None
+    """
+    tmp = tempfile.mkdtemp()
+    try:
+        _make_shallow_wide_folder(tmp, folders, files)
+        time.sleep(file_scanner._RACY_WINDOW / 10 ** 9)
+        full_seconds = _best_time(scan_file_system, (tmp, {}), repeat)
+        stamps = dict()
+        tree = scan_file_system(tmp, stamps)
+        for i in range(changed):
+            with open(os.path.join(tmp, 'd' + str(i), 'new'), 'w') as f:
+                f.write('x')
+        rescan_seconds, (relisted, listed) = _time_call(
+            rescan_file_system, tree, tmp, stamps)
+    finally:
+        _remove_folder(tmp)
+    _print_table('Rescan after changing {} of {} folders'.format(
+        changed, folders + 1),
+                 ['scan', 'folders listed', 'seconds'],
+                 [['full scan', listed, '{:.4f}'.format(full_seconds)],
+                  ['incremental rescan', relisted,
+                   '{:.4f}'.format(rescan_seconds)]])
+
+
+
+def _open_and_draw(function, *args):
+    """Return the tree returned by calling <function> with <args>, after
+    laying it out once in a window the size of the visualiser's.
+
+    @type function: callable
+    @rtype: AbstractTree
+    """
+    tree = function(*args)
+    tree.generate_treemap((0, 0, 1024, 738))
+    return tree
+
+
+def compare_lazy_tree(path, repeat=3):
+    """Compare the time and memory it takes to build the tree of <path> and
+    draw it once, with eager and lazy trees.
+
+    @type path: str
+    @type repeat: int
+    @rtype: None
+    """
+    handle, filename = tempfile.mkstemp(suffix='.tmap')
+    os.close(handle)
+    try:
+        save_snapshot(scan_file_system(path), filename)
+        rows = list()
+        for name, function, source in [
+                ('FileSystemTree', FileSystemTree, path),
+                ('scan_file_system', scan_file_system, path),
+                ('lazy_scan', lazy_scan, path),
+                ('load_snapshot', load_snapshot, filename),
+                ('lazy_load_snapshot', lazy_load_snapshot, filename)]:
+            seconds = _best_time(_open_and_draw, (function, source), repeat)
+            memory = _peak_memory(_open_and_draw, function, source)
+            nodes = _count_nodes(_open_and_draw(function, source))
+            rows.append([name, '{:.4f}'.format(seconds),
+                         '{:.1f}'.format(memory / 2 ** 20), nodes])
+    finally:
+        os.remove(filename)
+    _print_table('Building and drawing the tree of {}'.format(path),
+                 ['tree', 'seconds', 'peak MiB', 'nodes built'], rows)
+
+
+def _prune(tree, names):
+    """Remove every subtree of <tree> whose name is in <names>, the way a
+    filter had to be applied before scans had rules.
+
+    @type tree: AbstractTree
+    @type names: list[str]
+    @rtype: AbstractTree
+    """
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        for subtree in list(node._subtrees):
+            if subtree._root in names:
+                node._remove_subtree(subtree)
+            else:
+                stack.append(subtree)
+    return tree
+
+
+def compare_scan_filter(path, names=('.git', '__pycache__'), repeat=3):
+    """Compare leaving the files and folders called one of <names> out of
+    the tree of <path> by scanning everything and then removing them,
+    against leaving them out with scan rules.
+
+    @type path: str
+    @type names: tuple[str]
+    @type repeat: int
+    @rtype: None
+    """
+    rules = ScanFilter(exclude=list(names))
+    rows = list()
+    for name, function, args in [
+            ('full scan', scan_file_system, (path,)),
+            ('scan, then prune',
+             lambda p: _prune(scan_file_system(p), names), (path,)),
+            ('scan with rules', scan_file_system, (path, None, rules))]:
+        with _SyscallCounter() as counter:
+            nodes = _count_nodes(function(*args))
+        seconds = _best_time(function, args, repeat)
+        rows.append([name, nodes, counter.stats + counter.listings,
+                     '{:.3f}'.format(seconds)])
+    _print_table('Leaving {} out of {}'.format(', '.join(names), path),
+                 ['scan', 'nodes', 'calls', 'seconds'], rows)
+
+
+def compare_array_tree(folders=1000, files=1000):
+    """Compare the memory used by a FileSystemTree and an ArrayTree of the
+    same tree, with <folders> folders of <files> files each, and the time it
+    takes to build and lay out each of them.
+
+    @type folders: int
+    @type files: int
+    @rtype: None
+    """
+    flat_tree = _shallow_wide_flat_tree(folders, files)
+    count = len(flat_tree[0])
+    rows = list()
+    for name, function in [('object tree', build_flat_tree),
+                           ('array tree', ArrayTree)]:
+        build_seconds = _time_call(function, *flat_tree)[0]
+        memory, tree = _retained_memory(function, *flat_tree)
+        if isinstance(tree, ArrayTree):
+            tree = tree.root()
+        layout_seconds = _best_time(tree.generate_treemap,
+                                    ((0, 0, 1024, 738),), 3)
+        del tree
+        rows.append([name, '{:.1f}'.format(memory / 2 ** 20),
+                     '{:.0f}'.format(memory / count),
+                     '{:.3f}'.format(build_seconds),
+                     '{:.3f}'.format(layout_seconds)])
+    _print_table('Memory of a tree of {} nodes'.format(count),
+                 ['tree', 'MiB', 'bytes per node', 'build seconds',
+                  'layout seconds'], rows)
+
+
+def measure_node_memory(folders=1000, files=1000):
+    """Measure the memory used by each node of a FileSystemTree with
+    <folders> folders of <files> files each, and how many nodes a second it
+    takes to build.
+
+    @type folders: int
+    @type files: int
+    @rtype: None
+    """
+    count = 1 + folders + folders * files
+    build_seconds = _best_time(_scanned_wide_tree, (folders, files), 3)
+    memory, tree = _retained_memory(_scanned_wide_tree, folders, files)
+    lists = _count_subtree_lists(tree)
+    del tree
+    _print_table('Nodes of a tree of {} nodes'.format(count),
+                 ['MiB', 'bytes per node', 'subtree lists', 'build seconds',
+                  'nodes per second'],
+                 [['{:.1f}'.format(memory / 2 ** 20),
+                   '{:.0f}'.format(memory / count), lists,
+                   '{:.3f}'.format(build_seconds),
+                   '{:.0f}'.format(count / build_seconds)]])
+
+
+def compare_path_table(depth=30, files=10000, repeat=3):
+    """Compare getting the path of every leaf of a tree of <depth> nested
+    folders, with <files> files in the deepest one, by joining the names up
+    to the root each time, with get_separator, which remembers the paths of
+    folders, and all at once with PathTable.paths.
+
+    @type depth: int
+    @type files: int
+    @type repeat: int
+    @rtype: None
+    """
+    tree = _deep_folder_tree(depth, files)
+    leaves = [leaf for leaf, _ in tree._leaf_rects((0, 0, 1024, 738))]
+    rows = list()
+    for name, function in [
+            ('joined', lambda: [_joined_path(leaf) for leaf in leaves]),
+            ('get_separator', lambda: [leaf.get_separator()
+                                       for leaf in leaves]),
+            ('PathTable.paths',
+             lambda: list(FileSystemTree._paths.paths(tree)))]:
+        rows.append([name, _format_time(function, (), repeat)])
+    _print_table('Paths of {} files, {} folders deep'.format(files, depth),
+                 ['paths', 'seconds'], rows)
+
+
+def _change_leaves(tree, leaves, batched, shrink):
+    """Delete every tenth leaf in <leaves>, which are the leaves of <tree>,
+    or halve the size of every leaf if <shrink> is True, one leaf at a time
+    or in one batch if <batched> is True.
+
+    @type tree: AbstractTree
+    @type leaves: list[AbstractTree]
+    @type batched: bool
+    @type shrink: bool
+    @rtype: None
+    """
+    if batched:
+        with tree.batch() as batch:
+            for leaf in leaves:
+                if shrink:
+                    batch.resize(leaf, leaf.data_size // 2)
+                elif leaf._root.endswith('0.txt'):
+                    batch.delete(leaf)
+    else:
+        for leaf in leaves:
+            if shrink:
+                leaf._adjust_size(leaf.data_size // 2 - leaf.data_size)
+            elif leaf._root.endswith('0.txt'):
+                leaf.del_leaf()
+
+
+def compare_batch(depth=10, folders=100, files=1000, repeat=3):
+    """Compare deleting and resizing many leaves one at a time against doing
+    it in a TreeBatch, on a tree of <folders> folders of <files> files each,
+    <depth> folders deep.
+
+    @type depth: int
+    @type folders: int
+    @type files: int
+    @type repeat: int
+    @rtype: None
+    """
+    rows = list()
+    for change, shrink in [('delete every tenth file', False),
+                           ('halve every file', True)]:
+        row = [change]
+        for batched in [False, True]:
+            best = None
+            for _ in range(repeat):
+                tree = _scanned_wide_tree(folders, files)
+                for i in range(depth - 1):
+                    tree = FileSystemTree('d{}'.format(i), [tree])
+                leaves = [leaf for leaf, _ in
+                          tree._leaf_rects((0, 0, 1024, 738))]
+                seconds = _time_call(_change_leaves, tree, leaves, batched,
+                                     shrink)[0]
+                best = seconds if best is None else min(best, seconds)
+            row.append('{:.3f}'.format(best))
+        rows.append(row)
+    _print_table('Changing the leaves of a tree of {} files, {} folders '
+                 'deep'.format(folders * files, depth),
+                 ['change', 'one at a time', 'batch'], rows)
+
+
+def compare_compaction(folders=100, files=1000, deleted=0.9, repeat=3):
+    """Compare laying out a tree of <folders> folders of <files> files each,
+    after the fraction <deleted> of the files have been deleted, with the
+    deleted files left in their folders and with them compacted out.
+
+    @type folders: int
+    @type files: int
+    @type deleted: float
+    @type repeat: int
+    @rtype: None
+    """
+    tree = _scanned_wide_tree(folders, files)
+    rect = (0, 0, 1024, 738)
+    leaves = [leaf for leaf, _ in tree._leaf_rects(rect)]
+    # Stop the folders being compacted as the files are deleted.
+    min_deleted = tree_data.COMPACT_MIN_DELETED
+    tree_data.COMPACT_MIN_DELETED = len(leaves) + 1
+    try:
+        for i, leaf in enumerate(leaves):
+            if i % files < files * deleted:
+                leaf.del_leaf()
+    finally:
+        tree_data.COMPACT_MIN_DELETED = min_deleted
+    rows = [['left in place', '{:.3f}'.format(
+        _best_time(tree.generate_treemap, (rect,), repeat))]]
+    seconds, removed = _time_call(tree.compact)
+    rows.append(['compacted', '{:.3f}'.format(
+        _best_time(tree.generate_treemap, (rect,), repeat))])
+    _print_table('Laying out {} files after deleting {:.0%} of them ({} '
+                 'removed in {:.3f}s)'.format(folders * files, deleted,
+                                              removed, seconds),
+                 ['deleted files', 'seconds'], rows)
+
+
+def _layout_twice(tree, rect):
+    """Lay out <tree> in <rect> once to select a leaf from, and again to
+    draw, as the visualiser used to after each event.
+
+    @type tree: AbstractTree
+    @type rect: (int, int, int, int)
+    @rtype: None
+    """
+    tree.rect_dict(rect)
+    tree.generate_treemap(rect)
+
+
+def _layout_once(tree, rect):
+    """Lay out <tree> in <rect> once, and both select a leaf from and draw
+    the layout.
+
+    @type tree: AbstractTree
+    @type rect: (int, int, int, int)
+    @rtype: None
+    """
+    layout = tree.layout(rect)
+    layout.rect_dict()
+    layout.treemap()
+
+
+def compare_layout_engine(folders=1000, files=100, repeat=3):
+    """Compare the layout work the visualiser does after each event on a
+    tree of <folders> folders of <files> files each: laying it out for
+    rect_dict and again for generate_treemap, against laying it out once.
+
+    @type folders: int
+    @type files: int
+    @type repeat: int
+    @rtype: None
+    """
+    tree = _scanned_wide_tree(folders, files)
+    args = (tree, (0, 0, 1024, 738))
+    _print_table('Layout work per event for {} files'.format(
+        folders * files), ['layouts', 'seconds'],
+                 [['rect_dict and generate_treemap', '{:.3f}'.format(
+                     _best_time(_layout_twice, args, repeat))],
+                  ['one layout', '{:.3f}'.format(
+                      _best_time(_layout_once, args, repeat))]])
+
+
+def _press_keys(tree, layout, leaves, incremental):
+    """Grow each leaf in <leaves> by one percent, as pressing the up arrow
+    does, then delete it, as right-clicking does, and bring <layout> up to
+    date after each change, by relayout if <incremental> is True or by
+    laying <tree> out again otherwise.
+
+    @type tree: AbstractTree
+    @type layout: TreeLayout
+    @type leaves: list[AbstractTree]
+    @type incremental: bool
+    @rtype: TreeLayout
+    """
+    for leaf in leaves:
+        for node in [leaf, leaf._parent_tree]:
+            if node is leaf:
+                leaf.alt_size()
+            else:
+                leaf.del_leaf()
+            if incremental:
+                tree.relayout(layout, node)
+            else:
+                layout = tree.layout(layout.rect)
+    return layout
+
+
+def compare_relayout(folders=100, files=100, presses=10):
+    """Compare the time to bring the layout of a tree of <folders> folders,
+    each holding <folders> folders of <files> files, up to date after a key
+    press or click which changes one leaf: laying out the whole tree again,
+    against relayout.
+
+    @type folders: int
+    @type files: int
+    @type presses: int
+    @rtype: None
+    """
+    tree = FileSystemTree('top', [_scanned_wide_tree(folders, files)
+                                  for _ in range(folders)])
+    rect = (0, 0, 1024, 738)
+    layout = tree.layout(rect)
+    all_leaves = list(layout._leaves)
+    step = len(all_leaves) // (2 * presses + 1)
+    rows = list()
+    for name, incremental, leaves in [
+            ('layout again', False, all_leaves[step::2 * step][:presses]),
+            ('relayout', True, all_leaves[2 * step::2 * step][:presses])]:
+        seconds, layout = _time_call(_press_keys, tree, layout, leaves,
+                                     incremental)
+        rows.append([name, '{:.4f}'.format(seconds / (2 * len(leaves)))])
+    # Check that the incremental layout is still right.
+    assert list(layout) == list(tree.layout(rect))
+    _print_table('Updating the layout of {} files after each change'.format(
+        len(all_leaves)), ['layout', 'seconds per change'], rows)
+
+
+def _three_level_array_tree(folders, files):
+    """Return an ArrayTree whose root has <folders> folders, each with
+    <folders> folders of <files> files of different sizes.
+
+    @type folders: int
+    @type files: int
+    @rtype: ArrayTree
+    """
+    parents = [-1]
+    sizes = [0]
+    for _ in range(folders):
+        top = len(parents)
+        parents.append(0)
+        sizes.append(0)
+        for _ in range(folders):
+            middle = len(parents)
+            parents.append(top)
+            sizes.append(0)
+            parents.extend([middle] * files)
+            sizes.extend(100 + (middle + i) % 1000 for i in range(files))
+    return ArrayTree(['f'] * len(parents), parents, sizes)
+
+
+def _three_level_tree(folders, files):
+    """Return a FileSystemTree with the same nodes as the ArrayTree returned
+    by _three_level_array_tree(<folders>, <files>).
+
+    @type folders: int
+    @type files: int
+    @rtype: FileSystemTree
+    """
+    count = 1
+    tops = list()
+    for _ in range(folders):
+        count += 1
+        middles = list()
+        for _ in range(folders):
+            middle = count
+            count += 1 + files
+            middles.append(FileSystemTree('f', [
+                FileSystemTree('f', [], 100 + (middle + i) % 1000)
+                for i in range(files)]))
+        tops.append(FileSystemTree('f', middles))
+    return FileSystemTree('f', tops)
+
+
+def compare_vectorised_layout(shapes=((20, 250), (50, 400), (100, 1000)),
+                              most_nodes=2 * 10 ** 6):
+    """Compare laying out ArrayTrees one node at a time against laying them
+    out with NumPy, for trees made by _three_level_array_tree with each of
+    the (folders, files) in <shapes>, from about 10 ** 5 to 10 ** 7 nodes.
+
+    The layout of a FileSystemTree with the same nodes is timed too, as the
+    baseline, but only for trees of at most <most_nodes> nodes, since
+    bigger ones take more memory than most computers have.
+
+    @type shapes: list[(int, int)]
+    @type most_nodes: int
+    @rtype: None
+    """
+    from array_layout import leaf_rect_arrays, VectorisedNode
+    rect = (0, 0, 1024, 738)
+    rows = list()
+    for folders, files in shapes:
+        tree = _three_level_array_tree(folders, files)
+        python_seconds, slices = _time_call(list, tree._leaf_rects(0, rect))
+        numpy_seconds, arrays = _time_call(leaf_rect_arrays, tree, 0, rect)
+        # The rectangles must be exactly the same.
+        assert arrays[0].tolist() == [leaf for leaf, _ in slices]
+        assert list(zip(*[array.tolist() for array in arrays[1:]])) == \
+            [leaf_rect for _, leaf_rect in slices]
+        del slices, arrays
+        layout_seconds = _time_call(tree.root().layout, rect)[0]
+        vector_seconds, layout = _time_call(VectorisedNode(tree, 0).layout,
+                                            rect)
+        if len(tree) <= most_nodes:
+            recursive_seconds, expected = _time_call(
+                _three_level_tree(folders, files).layout, rect)
+            assert [leaf_rect for _, leaf_rect in expected] == \
+                [leaf_rect for _, leaf_rect in layout]
+            recursive = '{:.3f}'.format(recursive_seconds)
+            del expected
+        else:
+            recursive = '-'
+        del layout
+        rows.append([len(tree), recursive, '{:.3f}'.format(python_seconds),
+                     '{:.3f}'.format(numpy_seconds),
+                     '{:.3f}'.format(layout_seconds),
+                     '{:.3f}'.format(vector_seconds)])
+    _print_table('Laying out ArrayTrees one node at a time and with NumPy, '
+                 'against a FileSystemTree',
+                 ['nodes', 'FileSystemTree layout', 'rectangles', 'NumPy',
+                  'layout', 'NumPy layout'], rows)
+
+
+def compare_level_of_detail(folders=100, files=100,
+                            areas=(0, 1, 16, 100, 400), repeat=3):
+    """Compare laying out a tree of <folders> folders, each holding
+    <folders> folders of <files> files, and an ArrayTree of the same shape
+    laid out with NumPy, with each of the least folder areas in <areas>.
+    Count the rectangles in each layout, and how many of them have any
+    area and so are drawn.
+
+    @type folders: int
+    @type files: int
+    @type areas: list[int]
+    @type repeat: int
+    @rtype: None
+    """
+    from array_layout import VectorisedNode
+    tree = FileSystemTree('top', [_scanned_wide_tree(folders, files)
+                                  for _ in range(folders)])
+    array_root = VectorisedNode(_three_level_array_tree(folders, files), 0)
+    rect = (0, 0, 1024, 738)
+    rows = list()
+    for min_area in areas:
+        layout = tree.layout(rect, min_area)
+        drawn = sum(1 for _, leaf_rect in layout
+                    if leaf_rect[2] and leaf_rect[3])
+        rows.append([min_area, len(layout), drawn, '{:.3f}'.format(
+            _best_time(tree.layout, (rect, min_area), repeat)),
+                     '{:.3f}'.format(_best_time(array_root.layout,
+                                                (rect, min_area), repeat))])
+        del layout
+    _print_table('Level of detail for {} files'.format(
+        folders * folders * files),
+                 ['least area', 'rectangles', 'drawn', 'layout',
+                  'NumPy layout'], rows)
+
+
+def compare_zoom(folders=100, files=100, visits=5):
+    """Compare the time to zoom into one folder of a tree of <folders>
+    folders, each holding <folders> folders of <files> files, then into one
+    of its folders, and back out to the whole tree, <visits> times: laying
+    out the folder shown each time, against keeping the layouts in a
+    LayoutCache.
+
+    @type folders: int
+    @type files: int
+    @type visits: int
+    @rtype: None
+    """
+    tree = FileSystemTree('top', [_scanned_wide_tree(folders, files)
+                                  for _ in range(folders)])
+    rect = (0, 0, 1024, 738)
+    path = [tree, tree._subtrees[0], tree._subtrees[0]._subtrees[0]]
+    # Into each folder and back out again.
+    shown = (path + path[-2::-1]) * visits
+    rows = list()
+    for name, cache in [('layout', None), ('LayoutCache', LayoutCache())]:
+        seconds = _time_call(_zoom, shown, rect, cache)[0]
+        rows.append([name, '{:.4f}'.format(seconds / len(shown))])
+    _print_table('Zooming in and out of a tree of {} files'.format(
+        folders * folders * files), ['layouts', 'seconds per zoom'], rows)
+
+
+def _forget_orders(tree):
+    """Forget the sorted subtrees of every folder in <tree>, so that the
+    next squarified layout sorts them again.
+
+    @type tree: AbstractTree
+    @rtype: None
+    """
+    stack = [tree]
+    while stack:
+        folder = stack.pop()
+        tree_squarify.forget_order(folder)
+        stack.extend(folder._subtrees)
+
+
+def compare_squarified(folders=100, files=100, wide=100000, repeat=3):
+    """Compare slicing and squarifying a tree of <folders> folders, each
+    holding <folders> folders of <files> files, and a folder of <wide>
+    files: the time to lay each out, the first time, when every folder's
+    subtrees are sorted, and after that, and how many of the rectangles are
+    less than a pixel across, and so cannot be seen.
+
+    @type folders: int
+    @type files: int
+    @type wide: int
+    @type repeat: int
+    @rtype: None
+    """
+    rect = (0, 0, 1024, 738)
+    rows = list()
+    for name, tree in [
+            ('{} files in folders'.format(folders * folders * files),
+             FileSystemTree('top', [_scanned_wide_tree(folders, files)
+                                    for _ in range(folders)])),
+            ('{} files in one folder'.format(wide),
+             _scanned_wide_tree(1, wide))]:
+        for squarified in (False, True):
+            _forget_orders(tree)
+            first, layout = _time_call(tree.layout, rect, 0, squarified)
+            seconds = _best_time(tree.layout, (rect, 0, squarified), repeat)
+            thin = sum(1 for _, (_, _, width, height) in layout
+                       if not width or not height)
+            rows.append([name, 'squarified' if squarified else 'slices',
+                         '{:.3f}'.format(first), '{:.3f}'.format(seconds),
+                         '{:.0f}'.format(len(layout) / seconds), thin])
+            del layout
+    _print_table('Slicing against squarifying', [
+        'tree', 'layout', 'first', 'seconds', 'rectangles/s', 'under 1 px'],
+                 rows)
+
+
+def compare_hit_testing(folders=100, files=100, clicks=100):
+    """Compare finding the leaf under each of <clicks> points in the layout
+    of a tree of <folders> folders, each holding <folders> folders of
+    <files> files, sliced and squarified: checking the rectangles one at a
+    time, as the visualiser used to, against going down through the
+    rectangles of the folders which contain the point, as the layout does,
+    both before and after the layout is brought up to date after a change,
+    and against looking the point up in labelled pixels, which an ArrayTree
+    layout labels before its first lookup.
+
+    @type folders: int
+    @type files: int
+    @type clicks: int
+    @rtype: None
+    """
+    tree = FileSystemTree('top', [_scanned_wide_tree(folders, files)
+                                  for _ in range(folders)])
+    rect = (0, 0, 1024, 738)
+    points = [(i * 7919 % rect[2], i * 104729 % rect[3])
+              for i in range(clicks)]
+    array = array_tree_from_tree(tree)
+    rows = list()
+    for squarified in (False, True):
+        layout = tree.layout(rect, squarified=squarified)
+        name = 'squarified' if squarified else 'slices'
+        seconds = _time_call(_find_leaves, _scan_for_leaf, layout,
+                             points)[0]
+        rows.append([name, 'every rectangle', '-',
+                     '{:.6f}'.format(seconds / clicks)])
+        seconds = _time_call(_find_leaves, type(layout).leaf_at, layout,
+                             points)[0]
+        rows.append([name, 'folder rectangles', '-',
+                     '{:.6f}'.format(seconds / clicks)])
+        # A change, as the visualiser makes before the next click.
+        leaf = layout.leaf_at(points[0])
+        leaf.alt_size(positive=False)
+        relaying = _time_call(tree.relayout, layout, leaf)[0]
+        seconds = _time_call(_find_leaves, type(layout).leaf_at, layout,
+                             points)[0]
+        rows.append([name, 'after a change', '{:.3f}'.format(relaying),
+                     '{:.6f}'.format(seconds / clicks)])
+        leaf.alt_size()
+        del layout
+        layout = array.root().layout(rect, squarified=squarified)
+        # The pixels are labelled by the first lookup.
+        labelling = _time_call(layout.leaf_at, points[0])[0]
+        seconds = _time_call(_find_leaves, type(layout).leaf_at, layout,
+                             points)[0]
+        rows.append([name, 'labelled pixels', '{:.3f}'.format(labelling),
+                     '{:.6f}'.format(seconds / clicks)])
+    _print_table('Finding the leaf under a point among {} files'.format(
+        folders * folders * files), ['layout', 'lookup', 'preparing',
+                                     'seconds per lookup'], rows)
+
+
+def compare_hover(folders=100, files=100, moves=10000):
+    """Time finding the leaf under the mouse, and the text to show for it,
+    for each of <moves> points the mouse moves through across the layout of
+    a tree of <folders> folders, each holding <folders> folders of <files>
+    files, as the visualiser does while hovering is on.
+
+    The times of each layout are put in a LatencyHistogram, which is
+    printed, since it is the slowest updates which the user notices.
+
+    @type folders: int
+    @type files: int
+    @type moves: int
+    @rtype: None
+    """
+    tree = FileSystemTree('top', [_scanned_wide_tree(folders, files)
+                                  for _ in range(folders)])
+    rect = (0, 0, 1024, 738)
+    # A diagonal sweep across the treemap, a pixel or so at a time.
+    points = [(i * rect[2] // moves, i * rect[3] // moves)
+              for i in range(moves)]
+    rows = list()
+    for squarified in (False, True):
+        layout = tree.layout(rect, squarified=squarified)
+        histogram = LatencyHistogram()
+        for point in points:
+            start = time.perf_counter()
+            leaf = layout.leaf_at(point)
+            if leaf is not None:
+                leaf.get_separator()
+            histogram.add(time.perf_counter() - start)
+        name = 'squarified' if squarified else 'slices'
+        rows.append([name, '{:.3f}'.format(1000 * histogram.percentile(0.5)),
+                     '{:.3f}'.format(1000 * histogram.percentile(0.99))])
+        print(name)
+        print(histogram)
+    _print_table('Hovering over {} files'.format(folders * folders * files),
+                 ['layout', 'half under ms', '99% under ms'], rows)
+
+
+def _find_leaves(find, layout, points):
+    """Return the leaf <find> finds in <layout> under each of <points>.
+
+    @type find: callable
+    @type layout: TreeLayout
+    @type points: list[(int, int)]
+    @rtype: list[AbstractTree | None]
+    """
+    return [find(layout, point) for point in points]
+
+
+def _scan_for_leaf(layout, pos):
+    """Return the first leaf of <layout> whose rectangle contains <pos>, by
+    checking each rectangle in turn.
+
+    @type layout: TreeLayout
+    @type pos: (int, int)
+    @rtype: AbstractTree | None
+    """
+    rect_dict = layout.rect_dict()
+    for rect in rect_dict:
+        x, y, width, height = rect
+        if x <= pos[0] <= x + width and y <= pos[1] <= y + height:
+            return rect_dict[rect]
+    return None
+
+
+def _zoom(nodes, rect, cache):
+    """Lay out each of <nodes> in <rect> in turn, as the visualiser does
+    when they are zoomed into, using <cache> if it is given.
+
+    @type nodes: list[AbstractTree]
+    @type rect: (int, int, int, int)
+    @type cache: LayoutCache | None
+    @rtype: None
+    """
+    for node in nodes:
+        if cache is None:
+            node.layout(rect)
+        else:
+            cache.layout(node, rect)
+
+
+if __name__ == '__main__':
+    BENCHMARK_PATH = sys.argv[1] if len(sys.argv) > 1 else os.getcwd()
+    compare_scanners(BENCHMARK_PATH)
+    compare_sharded_scan(BENCHMARK_PATH)
+    compare_snapshot(BENCHMARK_PATH)
+    compare_lazy_tree(BENCHMARK_PATH)
+    compare_scan_filter(BENCHMARK_PATH)
+    compare_incremental_rescan()
+    compare_array_tree()
+    measure_node_memory()
+    compare_path_table()
+    compare_batch()
+    compare_compaction()
+    compare_layout_engine()
+    compare_relayout()
+    compare_vectorised_layout()
+    compare_level_of_detail()
+    compare_zoom()
+    compare_squarified()
+    compare_hit_testing()
+    compare_hover()
+    compare_recursive_and_iterative()
@@ -0,0 +1,799 @@
+"""Assignment 2: Fast File System Scanners
+
+=== Module Description ===
+This module contains alternative ways of building a FileSystemTree.
+
+The FileSystemTree constructor asks the operating system about every path
+separately: os.path.isfile, and then os.path.getsize or os.listdir, which is
+two or three system calls per file. The scanners in this module are built on
+os.scandir instead, which returns the type of every entry together with the
+directory listing, so that each file only costs the one stat call needed for
+its size.
+
+Every scanner returns exactly the same tree as FileSystemTree(path): the same
+names, in the same order, with the same data_size and _parent_tree attributes.
+
+Most scanners can also be given a scan_filter.ScanFilter as their <rules>, to
+leave files and folders out of the tree without ever reading them.
+"""
+import collections
+import os
+import queue
+import stat
+import threading
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from tree_data import FileSystemTree
+
+
+# A folder changed less than this many nanoseconds before its stamp is taken
+# might change again without its stamp changing, on file systems whose clock
+# is coarse. Such a stamp is recorded as _RACY_STAMP instead.
+_RACY_WINDOW = 2 * 10 ** 9
+# A stamp that never matches a real one, so the folder is always listed again.
+_RACY_STAMP = (0, 0)
+
+
+def scan_file_system(path, stamps=None, rules=None):
+    """Return a FileSystemTree of the given file or folder, built with
+    os.scandir.
+
+    If <stamps> is given, the stamp of every folder in the tree (see
+    folder_stamp) is recorded in it, keyed by the folder's node. These are
+    what rescan_file_system uses to tell which folders have changed since.
+    Recording them costs one more stat call per folder.
+
+    If <rules> is given, the files and folders it leaves out are not
+    scanned.
+
+    Precondition: <path> is a valid path for this computer.
+
+    @type path: str
+    @type stamps: dict[FileSystemTree, (int, int)] | None
+    @type rules: ScanFilter | None
+    @rtype: FileSystemTree
+    """
+    # A single stat tells us both whether <path> is a regular file (which is
+    # what os.path.isfile checks) and its size.
+    path_stat = os.stat(path)
+    if stat.S_ISREG(path_stat.st_mode):
+        return FileSystemTree(path, [], path_stat.st_size)
+    return _scan_folder(path, stamps, path_stat, rules, 0, path_stat.st_dev)
+
+
+def _scan_folder(path, stamps=None, path_stat=None, rules=None, depth=0,
+                 device=None):
+    """Return a FileSystemTree of the folder at <path>.
+
+    Files are turned into leaves straight from their listing, and only
+    folders are descended into. An explicit stack of the folders currently
+    being read is used instead of recursion, so there is no limit on how deep
+    the folder can be.
+
+    If <stamps> is given, the stamp of every folder is recorded in it, as
+    for scan_file_system. <path_stat> is the stat of <path>, if it is already
+    known.
+
+    If <rules> is given, the files and folders it leaves out are not
+    scanned. <depth> and <device> are how many levels <path> is below the
+    folder being scanned, and the st_dev of that folder, as for
+    list_folder.
+
+    @type path: str
+    @type stamps: dict[FileSystemTree, (int, int)] | None
+    @type path_stat: os.stat_result | None
+    @type rules: ScanFilter | None
+    @type depth: int
+    @type device: int | None
+    @rtype: FileSystemTree
+    """
+    # Each frame holds a folder's path, an iterator over the part of its
+    # listing which has not been visited yet, its subtrees built so far and
+    # its stamp. A folder's stamp is taken before it is listed, so that a
+    # change made while it is being listed is seen by the next rescan.
+    root_stamp = None
+    if stamps is not None:
+        root_stamp = _recorded_stamp(folder_stamp(path, path_stat))
+    stack = [(path, iter(list_folder(path, rules, depth, device)), [],
+              root_stamp)]
+    while True:
+        folder, listing, subtrees, stamp = stack[-1]
+        entry = next(listing, None)
+        if entry is None:
+            # Every entry in this folder has been visited, so build it and
+            # attach it to the folder containing it.
+            stack.pop()
+            tree = FileSystemTree(folder, subtrees)
+            if stamps is not None:
+                stamps[tree] = stamp
+            if not stack:
+                return tree
+            stack[-1][2].append(tree)
+        elif entry[1] is None:
+            child = os.path.join(folder, entry[0])
+            child_stamp = None
+            if stamps is not None:
+                child_stamp = _recorded_stamp(folder_stamp(child))
+            # The folder on top of the stack is len(stack) - 1 levels below
+            # <path>, so the child is one more.
+            child_listing = list_folder(child, rules, depth + len(stack),
+                                        device)
+            stack.append((child, iter(child_listing), [], child_stamp))
+        else:
+            subtrees.append(FileSystemTree(entry[0], [], entry[1]))
+
+
+def folder_stamp(path, path_stat=None):
+    """Return the stamp of the folder at <path>: its modification time and
+    its status change time, in nanoseconds.
+
+    A folder's modification time changes whenever an entry is added to it,
+    removed from it or renamed, so a folder whose stamp has not changed
+    still has the same listing. The status change time also catches tools
+    that set the modification time back.
+
+    @type path: str
+    @type path_stat: os.stat_result | None
+        The stat of <path>, if it is already known.
+    @rtype: (int, int)
+    """
+    if path_stat is None:
+        path_stat = os.stat(path)
+    return path_stat.st_mtime_ns, path_stat.st_ctime_ns
+
+
+def _recorded_stamp(stamp):
+    """Return the stamp to record for a folder whose current stamp is
+    <stamp>.
+
+    This is <stamp> itself, unless the folder changed so recently that it
+    could change again without its stamp changing, in which case it is
+    _RACY_STAMP.
+
+    @type stamp: (int, int)
+    @rtype: (int, int)
+    """
+    if time.time_ns() - max(stamp) < _RACY_WINDOW:
+        return _RACY_STAMP
+    return stamp
+
+
+def rescan_file_system(tree, path, stamps, rules=None):
+    """Bring <tree>, a FileSystemTree of the folder at <path> scanned (or
+    loaded from a snapshot) with its folder stamps in <stamps>, up to date
+    with the file system.
+
+    Every folder is checked with one stat call, but only the folders whose
+    stamp has changed are listed again. In a changed folder, the subtrees of
+    entries that are still there are reused as they are, and new folders
+    are scanned. The data_size of a changed folder and of its ancestors is
+    then updated, and <stamps> is updated to match the new tree.
+
+    Since changing a file does not change the stamp of the folder it is in,
+    a file whose size has changed is only noticed if its folder has changed
+    too. A folder that changed within _RACY_WINDOW of its stamp being taken
+    is always listed again, since it might have changed again since without
+    its stamp changing.
+
+    Return the number of folders listed (those listed again, and new folders
+    scanned), and the number of folders in the updated tree, which is the
+    number a full scan would have listed.
+
+    If <path> is a file, it has no stamp, and only its size is checked and
+    updated, so (0, 0) is returned.
+
+    If <rules> is given, the files and folders it leaves out are left out of
+    the folders listed again.
+
+    Precondition: <tree> is a tree of the folder at <path>, and <stamps> holds
+                  the stamp of every folder in it. If <tree> was scanned
+                  with rules, <rules> are the same rules.
+
+    @type tree: FileSystemTree
+    @type path: str
+    @type stamps: dict[FileSystemTree, (int, int)]
+    @type rules: ScanFilter | None
+    @rtype: (int, int)
+    """
+    relisted = 0
+    folders = 0
+    # As in scan_file_system, a single stat tells whether <path> is a file.
+    path_stat = os.stat(path)
+    if stat.S_ISREG(path_stat.st_mode):
+        tree.data_size = path_stat.st_size
+        return relisted, folders
+    device = None
+    if rules is not None:
+        device = path_stat.st_dev
+    stack = [(tree, path, 0)]
+    while stack:
+        folder, folder_path, depth = stack.pop()
+        folders += 1
+        new_stamp = folder_stamp(folder_path)
+        if stamps.get(folder) == new_stamp:
+            # Only folders are in <stamps>.
+            sub_folders = [subtree for subtree in folder._subtrees
+                           if subtree in stamps]
+        else:
+            stamps[folder] = _recorded_stamp(new_stamp)
+            sub_folders, scanned = _relist_folder(folder, folder_path, stamps,
+                                                  rules, depth, device)
+            relisted += 1 + scanned
+            folders += scanned
+        stack.extend((subtree, os.path.join(folder_path, subtree._root),
+                      depth + 1) for subtree in sub_folders)
+    return relisted, folders
+
+
+def _relist_folder(folder, path, stamps, rules=None, depth=0, device=None):
+    """Replace the subtrees of <folder>, the node of the folder at <path>,
+    with its current listing, and update the data_size of it and its
+    ancestors.
+
+    Subtrees of entries that are still there (a file with the same size, or
+    a folder) are reused. New folders are scanned, and their stamps are
+    recorded in <stamps>. The stamps of removed folders are removed from
+    <stamps>.
+
+    Return the reused sub-folders, which still need to be checked, and the
+    number of new folders scanned.
+
+    <rules>, <depth> and <device> are as for list_folder.
+
+    @type folder: FileSystemTree
+    @type path: str
+    @type stamps: dict[FileSystemTree, (int, int)]
+    @type rules: ScanFilter | None
+    @type depth: int
+    @type device: int | None
+    @rtype: (list[FileSystemTree], int)
+    """
+    # Deleted leaves are empty trees, and are dropped here.
+    old_subtrees = dict()
+    for subtree in folder._subtrees:
+        if not subtree.is_empty():
+            old_subtrees[subtree._root] = subtree
+    folders_before = len(stamps)
+    new_subtrees = list()
+    reused_folders = list()
+    for name, size in list_folder(path, rules, depth, device):
+        old = old_subtrees.get(name)
+        was_folder = old in stamps
+        if size is None and was_folder:
+            reused_folders.append(old_subtrees.pop(name))
+            new_subtrees.append(old)
+        elif size is None:
+            new_subtrees.append(_scan_folder(os.path.join(path, name), stamps,
+                                             None, rules, depth + 1, device))
+        elif old is not None and not was_folder and old.data_size == size:
+            new_subtrees.append(old_subtrees.pop(name))
+        else:
+            new_subtrees.append(FileSystemTree(name, [], size))
+    # Every folder scanned above has added its stamp.
+    scanned = len(stamps) - folders_before
+    # Whatever is left over has been removed, or replaced by something new.
+    for old in old_subtrees.values():
+        _forget_stamps(old, stamps)
+
+    folder._replace_subtrees(new_subtrees)
+    folder._deleted = 0
+    return reused_folders, scanned
+
+
+def _forget_stamps(tree, stamps):
+    """Remove the stamps of every folder in <tree> from <stamps>.
+
+    @type tree: FileSystemTree
+    @type stamps: dict[FileSystemTree, (int, int)]
+    @rtype: None
+    """
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if stamps.pop(node, None) is not None:
+            stack.extend(node._subtrees)
+
+
+def scan_file_system_threaded(path, max_workers=8, rules=None):
+    """Return a FileSystemTree of the given file or folder, listing folders
+    in parallel on a pool of <max_workers> threads.
+
+    Listing a folder mostly waits on the disk (or the network, for remote
+    file systems) and releases the GIL while doing so, so several folders can
+    be read at the same time. Each worker takes a folder from a shared work
+    queue, lists it, and puts the folder's sub-folders back on the queue.
+    Once every folder has been listed, the tree is assembled bottom-up.
+
+    If any folder cannot be listed, or listing it fails in any other way,
+    e.g. because <rules> raises an error, the first error met is raised once
+    all workers have stopped.
+
+    If <rules> is given, the files and folders it leaves out are not
+    scanned.
+
+    Precondition: <path> is a valid path for this computer.
+                  max_workers >= 1
+
+    @type path: str
+    @type max_workers: int
+    @type rules: ScanFilter | None
+    @rtype: FileSystemTree
+    """
+    path_stat = os.stat(path)
+    if stat.S_ISREG(path_stat.st_mode):
+        return FileSystemTree(path, [], path_stat.st_size)
+
+    # Map each folder's path to its listing. Every folder is listed by
+    # exactly one worker, so the workers never write to the same key.
+    listings = dict()
+    errors = list()
+    work = queue.Queue()
+
+    def worker():
+        # Each folder is put on the queue with its depth below <path>. None
+        # is put on the queue once for each worker to stop them.
+        item = work.get()
+        while item is not None:
+            folder, depth = item
+            try:
+                listings[folder] = list_folder(folder, rules, depth,
+                                               path_stat.st_dev)
+                for name, size in listings[folder]:
+                    if size is None:
+                        work.put((os.path.join(folder, name), depth + 1))
+            # Any error is raised again by the caller. If it ended the
+            # worker, the folder would never be marked done, and work.join
+            # would wait forever.
+            except Exception as error:
+                errors.append(error)
+            finally:
+                work.task_done()
+            item = work.get()
+
+    threads = [threading.Thread(target=worker, daemon=True)
+               for _ in range(max_workers)]
+    for thread in threads:
+        thread.start()
+    work.put((path, 0))
+    # Wait until every folder put on the queue has been listed.
+    work.join()
+    for _ in threads:
+        work.put(None)
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        raise errors[0]
+    return _assemble(path, listings)
+
+
+class ProgressiveScan:
+    """A scan of a file or folder that runs in the background, and whose
+    tree can be shown while it is still being built.
+
+    A worker thread lists the folders breadth-first, so that the top levels
+    of the tree are known first. The tree itself is only ever changed by the
+    thread calling poll, which adds the listings made since the last call.
+    Until then, folders which have not been listed yet are in the tree as
+    empty folders.
+
+    Once the scan is done, the tree is exactly the same as
+    FileSystemTree(path).
+
+    === Public Attributes ===
+    @type tree: FileSystemTree
+        The tree built so far.
+    @type folders: int
+        The number of folders added to the tree so far.
+    @type files: int
+        The number of files added to the tree so far.
+    @type done: bool
+        Whether the scan has finished, or been stopped.
+
+    === Private Attributes ===
+    @type _listings: queue.Queue
+        The listings made by the worker which have not been added to the tree
+        yet, as tuples of the folder's node, its subtrees and the number of
+        files among them. The last item put on it is (None, error, 0), where
+        error is the error the scan stopped at, or None.
+    @type _stopped: threading.Event
+        Set to stop the worker early.
+    """
+    def __init__(self, path, rules=None):
+        """Start scanning the file or folder at <path>.
+
+        If <rules> is given, the files and folders it leaves out are not
+        scanned.
+
+        Precondition: <path> is a valid path for this computer.
+
+        @type self: ProgressiveScan
+        @type path: str
+        @type rules: ScanFilter | None
+        @rtype: None
+        """
+        self.folders = 0
+        self.files = 0
+        self.done = False
+        self._listings = queue.Queue()
+        self._stopped = threading.Event()
+        path_stat = os.stat(path)
+        if stat.S_ISREG(path_stat.st_mode):
+            self.tree = FileSystemTree(path, [], path_stat.st_size)
+            self.files = 1
+            self.done = True
+        else:
+            self.tree = FileSystemTree(path, [], 0)
+            # A daemon thread, so that closing the visualiser in the middle
+            # of a scan does not wait for the scan to finish.
+            threading.Thread(target=self._walk,
+                             args=(path, rules, path_stat.st_dev),
+                             daemon=True).start()
+
+    def _walk(self, path, rules, device):
+        """List every folder underneath <path>, breadth-first, and put the
+        listings on the queue.
+
+        This runs on the worker thread. The nodes it makes are not touched
+        again once they are on the queue.
+
+        @type self: ProgressiveScan
+        @type path: str
+        @type rules: ScanFilter | None
+        @type device: int
+            The st_dev of <path>.
+        @rtype: None
+        """
+        folders = collections.deque([(self.tree, path, 0)])
+        error = None
+        try:
+            while folders and not self._stopped.is_set():
+                folder, folder_path, depth = folders.popleft()
+                subtrees = list()
+                files = 0
+                for name, size in list_folder(folder_path, rules, depth,
+                                              device):
+                    if size is None:
+                        subtree = FileSystemTree(name, [], 0)
+                        folders.append((subtree,
+                                        os.path.join(folder_path, name),
+                                        depth + 1))
+                    else:
+                        subtree = FileSystemTree(name, [], size)
+                        files += 1
+                    subtrees.append(subtree)
+                self._listings.put((folder, subtrees, files))
+        # Any error is raised again by poll. Whatever ends the worker, the
+        # last item must be put on the queue, or the scan is never done.
+        except Exception as caught:
+            error = caught
+        finally:
+            self._listings.put((None, error, 0))
+
+    def poll(self, block=False):
+        """Add the listings made since the last call to the tree, and return
+        the number of folders added.
+
+        If <block> is False, this never waits for the worker, and a return
+        value of 0 means the tree is unchanged. Otherwise, it waits until the
+        scan is done.
+
+        Raise the error the scan stopped at, e.g. an OSError if a folder
+        could not be listed. The folders listed before it are still in the
+        tree.
+
+        @type self: ProgressiveScan
+        @type block: bool
+        @rtype: int
+        """
+        added = 0
+        while not self.done:
+            try:
+                folder, subtrees, files = self._listings.get(block)
+            except queue.Empty:
+                break
+            if folder is None:
+                self.done = True
+                # <subtrees> is the error the scan stopped at, if any.
+                if subtrees is not None:
+                    raise subtrees
+                break
+            # One pass up the tree per folder keeps every ancestor's
+            # data_size right.
+            folder._replace_subtrees(subtrees)
+            self.folders += 1
+            self.files += files
+            added += 1
+        return added
+
+    def stop(self):
+        """Stop the scan, once the folder being listed is done.
+
+        The tree is left as it is, with some folders missing or empty.
+
+        @type self: ProgressiveScan
+        @rtype: None
+        """
+        self._stopped.set()
+        self.done = True
+
+
+def scan_file_system_progressive(path, rules=None):
+    """Return a FileSystemTree of the given file or folder, built by a
+    ProgressiveScan.
+
+    This is mostly useful to compare with the other scanners: the point of
+    a ProgressiveScan is to use its tree before it is done.
+
+    If <rules> is given, the files and folders it leaves out are not
+    scanned.
+
+    Precondition: <path> is a valid path for this computer.
+
+    @type path: str
+    @type rules: ScanFilter | None
+    @rtype: FileSystemTree
+    """
+    scan = ProgressiveScan(path, rules)
+    scan.poll(block=True)
+    return scan.tree
+
+
+def scan_file_system_sharded(path, max_workers=None, mount_points=None):
+    """Return a FileSystemTree of the given file or folder, scanning its
+    sub-folders in parallel on a pool of <max_workers> processes.
+
+    Unlike threads, processes also share out the Python work of a scan:
+    joining paths and reading each entry. Each sub-folder of <path> is a
+    separate shard, which a worker process scans into the compact form
+    returned by flatten_tree. The shards are then built into trees and
+    grafted under the root in this process, in os.listdir order.
+
+    If <mount_points> is given, those folders are the shards instead, and
+    they are grafted directly under a root named after <path>, in the order
+    given. This is used to scan several file systems at once.
+
+    Precondition: <path> is a valid path for this computer, and so is every
+                  path in <mount_points>.
+
+    @type path: str
+    @type max_workers: int | None
+        The number of worker processes. If None, one per CPU is used.
+    @type mount_points: list[str] | None
+    @rtype: FileSystemTree
+    """
+    if mount_points is None:
+        path_stat = os.stat(path)
+        if stat.S_ISREG(path_stat.st_mode):
+            return FileSystemTree(path, [], path_stat.st_size)
+        listing = list_folder(path)
+        shards = [os.path.join(path, name)
+                  for name, size in listing if size is None]
+    else:
+        listing = [(point, None) for point in mount_points]
+        shards = list(mount_points)
+
+    # Files directly under the root are not worth sending to a worker.
+    shard_trees = list()
+    if shards:
+        with ProcessPoolExecutor(max_workers) as executor:
+            for flat_tree in executor.map(scan_flat, shards):
+                shard_trees.append(build_flat_tree(*flat_tree))
+    shard_trees.reverse()
+
+    subtrees = list()
+    for name, size in listing:
+        if size is None:
+            subtrees.append(shard_trees.pop())
+        else:
+            subtrees.append(FileSystemTree(name, [], size))
+    return FileSystemTree(path, subtrees)
+
+
+def flatten_tree(tree):
+    """Return a compact form of <tree>, made of three parallel sequences
+    with one entry per node, in preorder:
+      - the name of each node (its _root),
+      - the index of each node's parent, or -1 for the root, and
+      - the data_size of each leaf, or 0 for a node that has subtrees.
+
+    This is much smaller than the tree itself, and quick to pickle.
+    Empty trees (deleted leaves) are left out.
+
+    @type tree: AbstractTree
+    @rtype: (list[str], array, array)
+
+    >>> f1 = FileSystemTree('f1', [], 15)
+    >>> f2 = FileSystemTree('f2', [], 5)
+    >>> A = FileSystemTree('A', [f1, f2])
+    >>> names, parents, sizes = flatten_tree(FileSystemTree('B', [A]))
+    >>> names
+    ['B', 'A', 'f1', 'f2']
+    >>> list(parents)
+    [-1, 0, 1, 1]
+    >>> list(sizes)
+    [0, 0, 15, 5]
+    """
+    names = list()
+    parents = array('q')
+    sizes = array('q')
+    for node, parent in iter_preorder(tree):
+        names.append(node._root)
+        parents.append(parent)
+        sizes.append(0 if node._subtrees else node.data_size)
+    return names, parents, sizes
+
+
+def iter_preorder(tree):
+    """Yield each node of <tree> in preorder, together with the index of
+    its parent in that order, or -1 for the root.
+
+    This is the order of the nodes in the compact form returned by
+    flatten_tree. Empty trees (deleted leaves) are left out.
+
+    @type tree: AbstractTree
+    @rtype: iterator[(AbstractTree, int)]
+    """
+    index = 0
+    # An explicit stack of (node, parent index) is used to visit the nodes in
+    # preorder. Subtrees are pushed in reverse so that they are popped in
+    # order.
+    stack = [(tree, -1)]
+    while stack:
+        node, parent = stack.pop()
+        if node.is_empty():
+            continue
+        yield node, parent
+        stack.extend((subtree, index) for subtree in reversed(node._subtrees))
+        index += 1
+
+
+def build_flat_tree(names, parents, sizes):
+    """Return the FileSystemTree described by the compact form returned by
+    flatten_tree.
+
+    Precondition: <names> is not empty, and the nodes are in preorder.
+
+    @type names: list[str]
+    @type parents: array | list[int]
+    @type sizes: array | list[int]
+    @rtype: FileSystemTree
+
+    >>> tree = build_flat_tree(['B', 'A', 'f1', 'f2', 'f4'],
+    ...                        [-1, 0, 1, 1, 0], [0, 0, 15, 5, 10])
+    >>> tree.data_size
+    30
+    >>> [subtree._root for subtree in tree._subtrees]
+    ['A', 'f4']
+    """
+    # In preorder every node comes after its parent, so building the nodes
+    # from last to first builds every subtree before the tree containing it.
+    # children[i] holds the built subtrees of node i, in reverse order.
+    children = dict()
+    node = None
+    for index in range(len(names) - 1, -1, -1):
+        subtrees = children.pop(index, [])
+        subtrees.reverse()
+        node = FileSystemTree(names[index], subtrees,
+                              0 if subtrees else sizes[index])
+        if parents[index] >= 0:
+            children.setdefault(parents[index], []).append(node)
+    return node
+
+
+def scan_flat(path):
+    """Scan the given file or folder straight into the compact form returned
+    by flatten_tree, without building any trees.
+
+    This is run in the worker processes of scan_file_system_sharded, and
+    array_tree builds ArrayTrees from it, since the compact form is already
+    the arrays they keep.
+
+    @type path: str
+    @rtype: (list[str], array, array)
+    """
+    names = list()
+    parents = array('q')
+    sizes = array('q')
+    path_stat = os.stat(path)
+    if stat.S_ISREG(path_stat.st_mode):
+        root_size = path_stat.st_size
+    else:
+        root_size = None
+    # The stack holds (name, parent index, size, path) for every entry still
+    # to be visited, where the size is None for folders and path is only
+    # used for folders.
+    stack = [(os.path.basename(path), -1, root_size, path)]
+    while stack:
+        name, parent, size, folder = stack.pop()
+        index = len(names)
+        names.append(name)
+        parents.append(parent)
+        sizes.append(size or 0)
+        if size is None:
+            listing = list_folder(folder)
+            stack.extend((child, index, child_size,
+                          os.path.join(folder, child) if child_size is None
+                          else None)
+                         for child, child_size in reversed(listing))
+    return names, parents, sizes
+
+
+def list_folder(path, rules=None, depth=0, device=None):
+    """Return the listing of the folder at <path>, in os.listdir order.
+
+    Each entry is a tuple of its name and its size, where the size is None
+    for folders. This is how every scanner in this module, and the lazy
+    trees of lazy_tree, read a folder.
+
+    If <rules> is given, the entries it leaves out are not in the listing.
+    <depth> is how many levels <path> is below the folder being scanned, and
+    <device> is the st_dev of the folder being scanned, if known.
+
+    @type path: str
+    @type rules: ScanFilter | None
+    @type depth: int
+    @type device: int | None
+    @rtype: list[(str, int | None)]
+    """
+    # Read the whole listing before going any further, so that only one
+    # directory is ever open at a time no matter how deep the tree is.
+    # DirEntry objects keep their cached type and stat information after the
+    # scan is closed.
+    with os.scandir(path) as scan:
+        entries = list(scan)
+    listing = list()
+    for entry in entries:
+        # The rules on names and depth are checked first, since they cost
+        # no system calls.
+        if rules is not None and rules.excludes(entry, depth + 1):
+            continue
+        # Like os.path.isfile, is_file follows symbolic links. The type is
+        # usually known from the listing itself, so this costs no system call.
+        if entry.is_file():
+            size = entry.stat().st_size
+            if rules is None or rules.keeps_file(entry, size):
+                listing.append((entry.name, size))
+        elif rules is None or rules.keeps_folder(entry, device):
+            listing.append((entry.name, None))
+    return listing
+
+
+def _assemble(path, listings):
+    """Return the FileSystemTree of the folder at <path>, built bottom-up from
+    the folder listings in <listings>.
+
+    Each folder is only built once all of its sub-folders have been built, so
+    that AbstractTree.__init__ sets its data_size and the _parent_tree of its
+    subtrees.
+
+    Precondition: every folder underneath <path> (including <path> itself)
+                  has a listing in <listings>.
+
+    @type path: str
+    @type listings: dict[str, list[(str, int | None)]]
+    @rtype: FileSystemTree
+    """
+    # Folders that have been built but not yet attached to their parent.
+    built = dict()
+    # An explicit stack is used instead of recursion, so that there is no
+    # limit on how deep the tree can be. Each folder is pushed twice: first to
+    # push its sub-folders above it, and then to build it after them.
+    stack = [(path, False)]
+    while stack:
+        folder, ready = stack.pop()
+        if not ready:
+            stack.append((folder, True))
+            stack.extend((os.path.join(folder, name), False)
+                         for name, size in listings[folder] if size is None)
+        else:
+            subtrees = list()
+            for name, size in listings[folder]:
+                if size is None:
+                    subtrees.append(built.pop(os.path.join(folder, name)))
+                else:
+                    subtrees.append(FileSystemTree(name, [], size))
+            built[folder] = FileSystemTree(folder, subtrees)
+    return built[path]
@@ -0,0 +1,128 @@
+"""Assignment 2: Latency Histograms
+
+=== Module Description ===
+This module contains LatencyHistogram, which counts how long something
+took each time it was done, such as updating the text the visualiser shows
+for the leaf under the mouse.
+
+An average hides the slow updates the user notices, so the times are kept
+as a histogram instead. The buckets double in width, from under a
+microsecond up to several seconds, so a histogram takes the same small
+amount of memory however many times are added to it, and still tells a
+0.1 ms update from a 0.2 ms one.
+"""
+
+
+# The upper bound of the first bucket of a LatencyHistogram, in seconds.
+# Each bucket after it goes up to twice the one before.
+FIRST_BUCKET = 1e-6
+# The number of buckets. The last one also holds every longer time.
+BUCKETS = 24
+
+
+class LatencyHistogram:
+    """How many times something took each length of time.
+
+    === Private Attributes ===
+    @type _counts: list[int]
+        The number of times in each bucket. Bucket 0 holds the times less
+        than FIRST_BUCKET, and bucket i > 0 those from FIRST_BUCKET *
+        2 ** (i - 1) up to FIRST_BUCKET * 2 ** i, apart from the last
+        bucket, which holds every longer time too.
+    """
+    def __init__(self):
+        """Initialize a histogram with no times in it.
+
+        @type self: LatencyHistogram
+        @rtype: None
+        """
+        self._counts = [0] * BUCKETS
+
+    def __len__(self):
+        """Return the number of times added.
+
+        @type self: LatencyHistogram
+        @rtype: int
+        """
+        return sum(self._counts)
+
+    def add(self, seconds):
+        """Add a time of <seconds>.
+
+        @type self: LatencyHistogram
+        @type seconds: float
+        @rtype: None
+
+        >>> histogram = LatencyHistogram()
+        >>> histogram.add(0.0003)
+        >>> histogram.add(0.0005)
+        >>> len(histogram), histogram.percentile(0.5)
+        (2, 0.000512)
+        """
+        bucket = int(seconds / FIRST_BUCKET).bit_length()
+        self._counts[min(bucket, BUCKETS - 1)] += 1
+
+    def percentile(self, fraction):
+        """Return the upper bound, in seconds, of the bucket which the time
+        <fraction> of the way up the times added is in, e.g. 0.5 for the
+        median, or 0 if no times have been added.
+
+        So at least <fraction> of the times were no longer than this. The
+        bound of the last bucket is returned for longer times too.
+
+        @type self: LatencyHistogram
+        @type fraction: float
+        @rtype: float
+        """
+        total = len(self)
+        if not total:
+            return 0
+        seen = 0
+        for bucket, count in enumerate(self._counts):
+            seen += count
+            if seen >= fraction * total:
+                break
+        return FIRST_BUCKET * 2 ** bucket
+
+    def summary(self):
+        """Return a one line summary of this histogram, to show the user.
+
+        @type self: LatencyHistogram
+        @rtype: str
+
+        >>> histogram = LatencyHistogram()
+        >>> for seconds in [0.0001] * 98 + [0.003, 0.02]:
+        ...     histogram.add(seconds)
+        >>> histogram.summary()
+        '100 times, half under 0.128 ms, 99% under 4.096 ms'
+        """
+        return '{} times, half under {:.3f} ms, 99% under {:.3f} ms'.format(
+            len(self), 1000 * self.percentile(0.5),
+            1000 * self.percentile(0.99))
+
+    def __str__(self):
+        """Return the count of each bucket from the first one with any
+        times to the last, one per line, with a bar of up to 40 characters
+        in proportion to it.
+
+        @type self: LatencyHistogram
+        @rtype: str
+
+        >>> histogram = LatencyHistogram()
+        >>> for seconds in [0.00005] * 3 + [0.0001]:
+        ...     histogram.add(seconds)
+        >>> print(histogram)
+           < 0.064 ms ######################################## 3
+           < 0.128 ms ############# 1
+        """
+        used = [bucket for bucket, count in enumerate(self._counts) if count]
+        if not used:
+            return ''
+        most = max(self._counts)
+        lines = list()
+        for bucket in range(used[0], used[-1] + 1):
+            count = self._counts[bucket]
+            lines.append('{:>10} ms {} {}'.format(
+                '< {:.3f}'.format(1000 * FIRST_BUCKET * 2 ** bucket),
+                '#' * (40 * count // most), count))
+        return '\n'.join(lines)
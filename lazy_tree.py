@@ -0,0 +1,292 @@
+"""Assignment 2: Lazy Trees
+
+=== Module Description ===
+This module builds FileSystemTrees whose folders are only listed when they
+are needed.
+
+Only a few levels of a large tree can ever be seen at once in the
+visualiser: a folder whose rectangle has no area cannot show its subtrees.
+So instead of building a node for every file and folder up front, a lazy
+tree starts with just its root, which knows the total size of everything
+in it. The subtrees of a folder are added by its expand method, which the
+treemap layout calls the first time the folder's rectangle is at least
+EXPAND_AREA pixels. Until then, the folder looks like a leaf of its total
+size, and is drawn as a single rectangle.
+
+The total sizes come from one of two places:
+  - a size pass over the file system (folder_sizes), which lists every
+    folder but only keeps one number per folder, or
+  - a snapshot saved by tree_snapshot, in which case nothing at all is read
+    from the file system.
+
+A lazy tree can be used like any other tree. Once every folder in it has
+been expanded, it is the same as FileSystemTree(path). Note that anything
+which walks a lazy tree without calling expand, such as
+tree_snapshot.save_snapshot, sees folders that have not been expanded yet
+as files.
+"""
+import os
+import stat
+from array import array
+
+from tree_data import FileSystemTree
+from file_scanner import list_folder
+from tree_snapshot import Snapshot
+
+
+# The least area, in pixels, of a rectangle a folder is expanded to fill in
+# the treemap. Smaller folders are drawn as a single rectangle, since little
+# could be seen of their subtrees anyway.
+EXPAND_AREA = 100
+
+
+class LazyFileSystemTree(FileSystemTree):
+    """A folder in a FileSystemTree whose subtrees are only added when it is
+    expanded.
+
+    === Private Attributes ===
+    @type _source: _FolderSource | _SnapshotSource
+        Where the subtrees of this folder come from.
+    @type _key: str | int
+        What identifies this folder in <_source>: its path, or its index in
+        a snapshot.
+    @type _listed: bool
+        Whether this folder has been expanded.
+
+    === Representation Invariants ===
+    - If not _listed, then _subtrees is empty, and data_size is the total
+      size of the files in this folder.
+    """
+    __slots__ = ('_source', '_key', '_listed')
+
+    def __init__(self, name, data_size, source, key):
+        """Initialize a folder named <name>, whose files add up to
+        <data_size>, and whose subtrees will be read from <source>.
+
+        @type self: LazyFileSystemTree
+        @type name: str
+        @type data_size: int
+        @type source: _FolderSource | _SnapshotSource
+        @type key: str | int
+        @rtype: None
+        """
+        FileSystemTree.__init__(self, name, [], data_size)
+        self._source = source
+        self._key = key
+        self._listed = False
+
+    def expand(self, rect=None):
+        """Add the subtrees of this folder, if they have not been added yet,
+        and return True if any were added, or if the folder turned out to be
+        empty and its data_size went down to 0.
+
+        If <rect> is given and is smaller than EXPAND_AREA, nothing is done.
+
+        The data_size of this folder and its ancestors is updated to the
+        total of the subtrees, in case the folder has changed since its size
+        was taken. If the folder can no longer be listed, it is left as it
+        is.
+
+        @type self: LazyFileSystemTree
+        @type rect: (int, int, int, int) | None
+        @rtype: bool
+        """
+        if self._listed or self.is_empty():
+            return False
+        if rect is not None and rect[2] * rect[3] < EXPAND_AREA:
+            return False
+        self._listed = True
+        try:
+            listing = self._source.list_folder(self._key)
+        except OSError:
+            return False
+        subtrees = list()
+        for name, size, key in listing:
+            if key is None:
+                subtrees.append(FileSystemTree(name, [], size))
+            else:
+                subtrees.append(LazyFileSystemTree(name, size, self._source,
+                                                   key))
+        if not subtrees:
+            # The folder has been emptied since its size was taken.
+            if not self.data_size:
+                return False
+            self._adjust_size(-self.data_size)
+            return True
+        self._subtrees = subtrees
+        for subtree in subtrees:
+            subtree._parent_tree = self
+        self._adjust_size(sum(subtree.data_size for subtree in subtrees) -
+                          self.data_size)
+        return True
+
+
+class _FolderSource:
+    """The source of the subtrees of lazy folders on the file system.
+
+    === Private Attributes ===
+    @type _sizes: dict[str, int]
+        The total size of every folder which has not had its node made yet,
+        keyed by its path.
+    """
+    def __init__(self, sizes):
+        """Initialize a source with the folder sizes <sizes>.
+
+        @type self: _FolderSource
+        @type sizes: dict[str, int]
+        @rtype: None
+        """
+        self._sizes = sizes
+
+    def list_folder(self, path):
+        """Return the listing of the folder at <path>, in os.listdir order.
+
+        Each entry is a tuple of its name, its size and its path if it is a
+        folder, or None otherwise.
+
+        @type self: _FolderSource
+        @type path: str
+        @rtype: list[(str, int, str | None)]
+        """
+        listing = list()
+        for name, size in list_folder(path):
+            if size is not None:
+                listing.append((name, size, None))
+                continue
+            child = os.path.join(path, name)
+            if child not in self._sizes:
+                # The folder was made after the size pass.
+                self._sizes.update(folder_sizes(child))
+            # Each folder's node is only made once, so its size is not needed
+            # again.
+            listing.append((name, self._sizes.pop(child), child))
+        return listing
+
+
+class _SnapshotSource:
+    """The source of the subtrees of lazy folders stored in a snapshot.
+
+    The snapshot stays open for as long as the tree is in use.
+
+    === Public Attributes ===
+    @type totals: array
+        The total size of the files in each node of the snapshot.
+
+    === Private Attributes ===
+    @type _snapshot: Snapshot
+        The open snapshot.
+    @type _ends: array
+        The index just past the last node of the subtree of each node of the
+        snapshot. Since the nodes are in preorder, the nodes of the subtree
+        of node i are the ones from i to _ends[i].
+    """
+    def __init__(self, snapshot):
+        """Initialize a source for the nodes in <snapshot>.
+
+        @type self: _SnapshotSource
+        @type snapshot: Snapshot
+        @rtype: None
+        """
+        self._snapshot = snapshot
+        count = len(snapshot)
+        self.totals = array('q', snapshot.sizes)
+        self._ends = array('q', range(1, count + 1))
+        parents = snapshot.parents
+        # Children come after their parents, so going backwards finishes
+        # every node before its parent is reached.
+        for index in range(count - 1, 0, -1):
+            parent = parents[index]
+            self.totals[parent] += self.totals[index]
+            if self._ends[index] > self._ends[parent]:
+                self._ends[parent] = self._ends[index]
+
+    def list_folder(self, index):
+        """Return the listing of the folder which is node <index> of the
+        snapshot, in the order it was saved in.
+
+        Each entry is a tuple of its name, its size and its index if it is
+        a folder with something in it, or None otherwise.
+
+        @type self: _SnapshotSource
+        @type index: int
+        @rtype: list[(str, int, int | None)]
+        """
+        listing = list()
+        child = index + 1
+        while child < self._ends[index]:
+            end = self._ends[child]
+            listing.append((self._snapshot.name(child), self.totals[child],
+                            child if end > child + 1 else None))
+            # The next child comes right after this child's subtree.
+            child = end
+        return listing
+
+
+def folder_sizes(path):
+    """Return the total size of the files in every folder underneath the
+    folder at <path>, including <path> itself, keyed by the folder's path.
+
+    This lists every folder, like a scan does, but keeps one number per
+    folder instead of a node per file and folder.
+
+    Precondition: <path> is a valid path to a folder on this computer.
+
+    @type path: str
+    @rtype: dict[str, int]
+    """
+    # The folders are listed breadth-first, so every folder comes after its
+    # parent, and the totals can be added up by going backwards.
+    folders = [path]
+    parents = [-1]
+    totals = list()
+    index = 0
+    while index < len(folders):
+        total = 0
+        for name, size in list_folder(folders[index]):
+            if size is None:
+                folders.append(os.path.join(folders[index], name))
+                parents.append(index)
+            else:
+                total += size
+        totals.append(total)
+        index += 1
+    for index in range(len(folders) - 1, 0, -1):
+        totals[parents[index]] += totals[index]
+    return dict(zip(folders, totals))
+
+
+def lazy_scan(path):
+    """Return a lazy FileSystemTree of the given file or folder.
+
+    Only the total sizes of the folders are read now, by folder_sizes. The
+    folders themselves are listed again when they are expanded.
+
+    Precondition: <path> is a valid path for this computer.
+
+    @type path: str
+    @rtype: FileSystemTree
+    """
+    path_stat = os.stat(path)
+    if stat.S_ISREG(path_stat.st_mode):
+        return FileSystemTree(path, [], path_stat.st_size)
+    sizes = folder_sizes(path)
+    return LazyFileSystemTree(path, sizes.pop(path), _FolderSource(sizes),
+                              path)
+
+
+def lazy_load_snapshot(filename):
+    """Return a lazy FileSystemTree of the tree stored in the snapshot file
+    <filename>.
+
+    Only the total sizes of the folders are worked out now. The names and
+    sizes of a folder's subtrees are read from the snapshot when it is
+    expanded, so the snapshot file stays open while the tree is in use.
+
+    Raise ValueError if <filename> is not a snapshot this module can read.
+
+    @type filename: str
+    @rtype: FileSystemTree
+    """
+    snapshot = Snapshot(filename)
+    source = _SnapshotSource(snapshot)
+    return LazyFileSystemTree(snapshot.name(0), source.totals[0], source, 0)
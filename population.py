@@ -37,6 +37,7 @@ import json
 import urllib.request as request
 
 from tree_data import AbstractTree
+from tree_paths import PathTable
 
 
 # Constants for the World Bank API urls.
@@ -64,6 +65,10 @@ class PopulationTree(AbstractTree):
 
     See https://datahelpdesk.worldbank.org/ for details about this API.
     """
+    __slots__ = ()
+
+    _paths = PathTable('\\')
+
     def __init__(self, world, root=None, subtrees=None, data_size=0):
         """Initialize a new PopulationTree.
 
@@ -97,13 +102,13 @@ class PopulationTree(AbstractTree):
 
         self._root always has a value i.e. not an empty tree.
 
+        The path of each region is remembered in _paths, so this only walks
+        up the tree once per region.
+
         @type self: PopulationTree
         @rtype: str
         """
-        if self._parent_tree:
-            return self._parent_tree.get_separator() + '\\' + self._root
-        else:
-            return self._root
+        return self._paths.path(self)
 
 
 def _load_data():
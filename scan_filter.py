@@ -0,0 +1,177 @@
+"""Assignment 2: Scan Filters
+
+=== Module Description ===
+This module contains ScanFilter, a set of rules for leaving files and
+folders out of a scan.
+
+The rules are checked while folders are listed, before anything is done with
+an entry: a folder that is left out is never listed, and a file that is left
+out by its name is never stat'ed. So an excluded subtree costs nothing,
+unlike building the whole FileSystemTree and deleting parts of it.
+
+The scanners in file_scanner take a ScanFilter as their <rules> argument.
+"""
+import fnmatch
+import os
+import re
+
+
+class ScanFilter:
+    """Rules for which files and folders a scan leaves out.
+
+    The patterns are glob patterns, as for the fnmatch module. A pattern
+    with a '/' in it is matched against the whole path of a file or folder
+    (with '/' between the names, on every platform), e.g. '/proc' or
+    '*/build/*.o'. Any other pattern is matched against the name alone, e.g.
+    '.git' or '*.tmp'. Patterns are case-insensitive where file names are,
+    i.e. on Windows.
+
+    === Public Attributes ===
+    @type one_file_system: bool
+        Whether to leave out folders on a different device (i.e. a different
+        mounted file system) from the folder being scanned.
+    @type max_depth: int | None
+        How many levels of folders below the folder being scanned are
+        listed. Folders deeper than this are left out, along with everything
+        in them. If None, there is no limit.
+    @type min_size: int
+        The size, in bytes, below which files are left out.
+
+    === Private Attributes ===
+    @type _exclude_name: callable | None
+        Matches the names of files and folders to leave out.
+    @type _exclude_path: callable | None
+        Matches the paths of files and folders to leave out.
+    @type _include_name: callable | None
+        Matches the names of the files to keep, or None to keep every file.
+    @type _include_path: callable | None
+        Matches the paths of the files to keep.
+
+    === Representation Invariants ===
+    - max_depth is None or max_depth >= 0
+    - min_size >= 0
+    """
+    def __init__(self, exclude=(), include=(), one_file_system=False,
+                 max_depth=None, min_size=0):
+        """Initialize a filter that leaves out files and folders matching
+        a pattern in <exclude>.
+
+        If <include> is not empty, files are also left out unless they match
+        a pattern in it. Folders are not, so that files are looked for in
+        every folder which is not excluded.
+
+        The patterns are compiled here, once, into a single regular
+        expression for each kind of pattern.
+
+        @type self: ScanFilter
+        @type exclude: list[str]
+        @type include: list[str]
+        @type one_file_system: bool
+        @type max_depth: int | None
+        @type min_size: int
+        @rtype: None
+        """
+        self._exclude_name = _compile(p for p in exclude if '/' not in p)
+        self._exclude_path = _compile(p for p in exclude if '/' in p)
+        self._include_name = _compile(p for p in include if '/' not in p)
+        self._include_path = _compile(p for p in include if '/' in p)
+        self.one_file_system = one_file_system
+        self.max_depth = max_depth
+        self.min_size = min_size
+
+    def excludes(self, entry, depth):
+        """Return True if the directory entry <entry>, which is <depth>
+        levels below the folder being scanned, is left out because of its
+        name, its path or its depth.
+
+        This makes no system calls on platforms where os.scandir returns the
+        type of each entry, which includes Linux, Mac OS and Windows.
+
+        @type self: ScanFilter
+        @type entry: os.DirEntry
+        @type depth: int
+        @rtype: bool
+        """
+        if self._exclude_name is not None and self._exclude_name(entry.name):
+            return True
+        if (self._exclude_path is not None and
+                self._exclude_path(_slashed(entry.path))):
+            return True
+        # Files are always listed along with their folder, so only folders
+        # can be too deep.
+        return (self.max_depth is not None and depth > self.max_depth and
+                entry.is_dir())
+
+    def keeps_file(self, entry, size):
+        """Return True if the file <entry>, whose size is <size>, is kept.
+
+        Precondition: <entry> is not excluded.
+
+        @type self: ScanFilter
+        @type entry: os.DirEntry
+        @type size: int
+        @rtype: bool
+        """
+        if size < self.min_size:
+            return False
+        if self._include_name is None and self._include_path is None:
+            return True
+        return bool((self._include_name is not None and
+                     self._include_name(entry.name)) or
+                    (self._include_path is not None and
+                     self._include_path(_slashed(entry.path))))
+
+    def keeps_folder(self, entry, device):
+        """Return True if the folder <entry> is kept, given that the folder
+        being scanned is on the device <device>.
+
+        Precondition: <entry> is not excluded.
+
+        @type self: ScanFilter
+        @type entry: os.DirEntry
+        @type device: int | None
+            The st_dev of the folder being scanned, or None if it is not
+            known.
+        @rtype: bool
+        """
+        if not self.one_file_system or device is None:
+            return True
+        try:
+            return entry.stat().st_dev == device
+        except OSError:
+            # Let the scan report the folder's error when it is listed.
+            return True
+
+
+def _compile(patterns):
+    """Return the match method of a regular expression which matches a
+    string matching any of <patterns>, or None if there are no patterns.
+
+    @type patterns: iterable[str]
+    @rtype: callable | None
+
+    >>> match = _compile(['*.tmp', '.git'])
+    >>> bool(match('a.tmp')), bool(match('.git')), bool(match('a.tmpx'))
+    (True, True, False)
+    >>> _compile([]) is None
+    True
+    """
+    patterns = list(patterns)
+    if not patterns:
+        return None
+    flags = 0
+    if os.path.normcase('A') == 'a':
+        flags = re.IGNORECASE
+    return re.compile('|'.join(fnmatch.translate(pattern)
+                               for pattern in patterns), flags).match
+
+
+def _slashed(path):
+    """Return <path> with '/' between its names.
+
+    @type path: str
+    @rtype: str
+    """
+    if os.sep == '/':
+        return path
+    return path.replace(os.sep, '/')
@@ -0,0 +1,377 @@
+"""Assignment 2: Colour Policies
+
+=== Module Description ===
+This module contains the colour policies, which choose the colour each leaf
+of a tree is drawn in.
+
+Only leaves are ever drawn, so instead of choosing a colour for every node
+when it is made, a tree asks its policy for a colour the first time the
+treemap needs one. The colours are worked out from the tree itself rather
+than chosen at random, so the same tree always looks the same: a folder
+scanned twice, or loaded from a snapshot, is drawn in the same colours.
+
+PathColours works out the colour of a leaf again each time it is drawn,
+which only costs hashing its name, as it keeps the hashes of the folders
+the last leaf was in, and the treemap draws the leaves of each folder one
+after the other. It keeps nothing for each leaf, so it costs no more for a
+tree of millions of leaves, and keeps no trees which are no longer drawn.
+The other policies give many leaves the same colour, so they remember the
+colours they have chosen by what they depend on, in a table of at most
+CACHE_SIZE entries. Once the table is full, the oldest entries are dropped.
+
+There are three policies:
+  - PathColours, which hashes the path from the root of the tree to each
+    leaf,
+  - ExtensionColours, which gives files of the same kind the same colour,
+    and
+  - DepthColours, which gives each level of the tree its own hue, lighter
+    for leaves which are a smaller part of their folder.
+"""
+import collections
+import os
+import zlib
+
+
+# The most entries kept in each of the tables of a policy.
+CACHE_SIZE = 2 ** 16
+
+# The colours of some common kinds of files, and their extensions.
+_KINDS = [
+    # Source code.
+    ((66, 133, 244), ['.py', '.c', '.h', '.cpp', '.java', '.js', '.ts',
+                      '.go', '.rs', '.rb', '.sh']),
+    # Images.
+    ((52, 168, 83), ['.png', '.jpg', '.jpeg', '.gif', '.bmp', '.svg',
+                     '.webp']),
+    # Audio and video.
+    ((234, 67, 53), ['.mp3', '.wav', '.flac', '.ogg', '.mp4', '.mkv',
+                     '.avi', '.mov']),
+    # Archives.
+    ((251, 188, 5), ['.zip', '.gz', '.tar', '.xz', '.bz2', '.7z', '.rar',
+                     '.whl']),
+    # Documents and data.
+    ((171, 71, 188), ['.txt', '.md', '.rst', '.pdf', '.doc', '.docx',
+                      '.html', '.json', '.xml', '.csv']),
+    # Compiled code.
+    ((0, 172, 193), ['.so', '.dll', '.exe', '.o', '.a', '.pyc', '.class',
+                     '.jar'])]
+
+# The colour of each extension in _KINDS.
+EXTENSION_COLOURS = {extension: colour for colour, extensions in _KINDS
+                     for extension in extensions}
+
+# The colour of files with no extension.
+_NO_EXTENSION = (128, 128, 128)
+
+# The hue of each level of a tree, used by DepthColours. Deeper levels reuse
+# them from the start.
+_DEPTH_HUES = [(31, 119, 180), (255, 127, 14), (44, 160, 44), (214, 39, 40),
+               (148, 103, 189), (140, 86, 75), (227, 119, 194),
+               (188, 189, 34), (23, 190, 207)]
+
+# How many shades of its level's hue DepthColours gives a leaf, by its share
+# of its folder's size.
+_SHADES = 4
+
+
+class ColourPolicy:
+    """Chooses the colours of the leaves of trees.
+
+    This is an abstract class. Each subclass decides what the colour of a
+    tree depends on, by overriding _key, and how it is chosen, by overriding
+    _choose.
+
+    === Public Attributes ===
+    @type name: str
+        What the colours show, for the user.
+
+    === Private Attributes ===
+    @type _cache: collections.OrderedDict[object, (int, int, int)]
+        The colours chosen so far, by key, oldest first.
+    @type _cache_size: int
+        The most colours kept in _cache.
+    """
+    name = ''
+
+    def __init__(self, cache_size=CACHE_SIZE):
+        """Initialize a policy which remembers at most <cache_size>
+        colours.
+
+        @type self: ColourPolicy
+        @type cache_size: int
+        @rtype: None
+        """
+        self._cache = collections.OrderedDict()
+        self._cache_size = cache_size
+
+    def colour(self, tree):
+        """Return the RGB colour of <tree>.
+
+        @type self: ColourPolicy
+        @type tree: AbstractTree | ArrayNode
+        @rtype: (int, int, int)
+        """
+        key = self._key(tree)
+        colour = self._cache.get(key)
+        if colour is None:
+            colour = self._choose(tree, key)
+            remember(self._cache, key, colour, self._cache_size)
+        return colour
+
+    def _key(self, tree):
+        """Return what the colour of <tree> depends on. Trees with the same
+        key have the same colour.
+
+        @type self: ColourPolicy
+        @type tree: AbstractTree | ArrayNode
+        @rtype: object
+        """
+        raise NotImplementedError
+
+    def _choose(self, tree, key):
+        """Return the colour of <tree>, whose key is <key>.
+
+        @type self: ColourPolicy
+        @type tree: AbstractTree | ArrayNode
+        @type key: object
+        @rtype: (int, int, int)
+        """
+        raise NotImplementedError
+
+
+class PathColours(ColourPolicy):
+    """Colours each tree by a hash of its path: the names from the root of
+    its tree down to it.
+
+    The hash is the CRC-32 of the names with '/' between them, which zlib
+    can carry on from the hash of a folder to the hash of anything in it.
+    So the hashes of the folders the last tree was in are remembered, and
+    hashing a leaf in one of them only costs the length of its own name.
+    Colours are not remembered, since they take no longer than that to
+    work out from the hash.
+
+    === Private Attributes ===
+    @type _chain: list[(AbstractTree | ArrayNode, int)]
+        The ancestors of the last tree coloured, from the root of its tree
+        down, each with the hash of its path.
+    @type _depths: dict[AbstractTree | ArrayNode, int]
+        The index of each node of _chain in it.
+    """
+    name = 'path'
+
+    def __init__(self):
+        """Initialize a policy which has not coloured any tree yet.
+
+        @type self: PathColours
+        @rtype: None
+        """
+        ColourPolicy.__init__(self)
+        self._chain = list()
+        self._depths = dict()
+
+    def colour(self, tree):
+        """Return the RGB colour of <tree>: the three low bytes of the hash
+        of its path.
+
+        @type self: PathColours
+        @type tree: AbstractTree | ArrayNode
+        @rtype: (int, int, int)
+        """
+        value = self._path_hash(tree)
+        return (value >> 16) & 255, (value >> 8) & 255, value & 255
+
+    def _path_hash(self, tree):
+        """Return the CRC-32 of the path of <tree>, and remember the hashes
+        of its ancestors in place of those of the last tree's.
+
+        @type self: PathColours
+        @type tree: AbstractTree | ArrayNode
+        @rtype: int
+
+        >>> from tree_data import AbstractTree
+        >>> f1 = AbstractTree('f1', [], 15)
+        >>> A = AbstractTree('A', [AbstractTree('B', [f1])])
+        >>> PathColours()._path_hash(f1) == zlib.crc32(b'A/B/f1')
+        True
+        """
+        chain, depths = self._chain, self._depths
+        # Walk up to the nearest folder in the chain, or the root, then
+        # hash the names on the way back down.
+        nodes = [tree]
+        depth = None
+        parent = tree._parent_tree
+        while parent is not None:
+            depth = depths.get(parent)
+            if depth is not None:
+                break
+            nodes.append(parent)
+            parent = parent._parent_tree
+        if depth is None:
+            depth = -1
+            value = None
+        else:
+            value = chain[depth][1]
+        for node, _ in chain[depth + 1:]:
+            del depths[node]
+        del chain[depth + 1:]
+        for node in reversed(nodes):
+            name = _encode(node._root)
+            if value is None:
+                value = zlib.crc32(name)
+            else:
+                value = zlib.crc32(b'/' + name, value)
+            if node is not tree:
+                depths[node] = len(chain)
+                chain.append((node, value))
+        return value
+
+
+class ExtensionColours(ColourPolicy):
+    """Colours each tree by the extension of its name, so that files of the
+    same kind have the same colour.
+
+    The extensions in the table of colours this policy is given have the
+    colour it gives them, and every other extension has a colour of its own,
+    made from a hash of the extension. Names without an extension, such as
+    most folders, are grey.
+
+    === Private Attributes ===
+    @type _colours: dict[str, (int, int, int)]
+        The colour of each extension in the table, in lower case.
+    """
+    name = 'extension'
+
+    def __init__(self, colours=None, cache_size=CACHE_SIZE):
+        """Initialize a policy with the table of colours <colours>, or
+        EXTENSION_COLOURS if it is None.
+
+        @type self: ExtensionColours
+        @type colours: dict[str, (int, int, int)] | None
+        @type cache_size: int
+        @rtype: None
+        """
+        ColourPolicy.__init__(self, cache_size)
+        if colours is None:
+            colours = EXTENSION_COLOURS
+        self._colours = {extension.lower(): colour
+                         for extension, colour in colours.items()}
+
+    def _key(self, tree):
+        """Return the extension of the name of <tree>, in lower case.
+
+        @type self: ExtensionColours
+        @type tree: AbstractTree | ArrayNode
+        @rtype: str
+
+        >>> from tree_data import AbstractTree
+        >>> ExtensionColours()._key(AbstractTree('a2.Tar.GZ', [], 1))
+        '.gz'
+        """
+        return os.path.splitext(str(tree._root))[1].lower()
+
+    def _choose(self, tree, key):
+        """Return the colour of the extension <key>.
+
+        @type self: ExtensionColours
+        @type tree: AbstractTree | ArrayNode
+        @type key: str
+        @rtype: (int, int, int)
+
+        >>> from tree_data import AbstractTree
+        >>> policy = ExtensionColours({'.py': (0, 0, 255)})
+        >>> policy.colour(AbstractTree('a.PY', [], 1))
+        (0, 0, 255)
+        >>> policy.colour(AbstractTree('README', [], 1))
+        (128, 128, 128)
+        """
+        if key in self._colours:
+            return self._colours[key]
+        if not key:
+            return _NO_EXTENSION
+        value = zlib.crc32(_encode(key))
+        return (value >> 16) & 255, (value >> 8) & 255, value & 255
+
+
+class DepthColours(ColourPolicy):
+    """Colours each tree by its depth, with one hue for each level of the
+    tree, in shades which are lighter the smaller a part of its folder the
+    tree is.
+    """
+    name = 'depth and size'
+
+    def _key(self, tree):
+        """Return the depth of <tree>, and its shade: how big a part of its
+        folder it is, from 0 for the smallest to _SHADES - 1 for the
+        largest.
+
+        @type self: DepthColours
+        @type tree: AbstractTree | ArrayNode
+        @rtype: (int, int)
+
+        >>> from tree_data import AbstractTree
+        >>> f1 = AbstractTree('f1', [], 15)
+        >>> A = AbstractTree('A', [f1, AbstractTree('f2', [], 45)])
+        >>> DepthColours()._key(f1), DepthColours()._key(A)
+        ((1, 1), (0, 3))
+        """
+        parent = tree._parent_tree
+        if parent is None or not parent.data_size:
+            return 0, _SHADES - 1
+        shade = min(tree.data_size * _SHADES // parent.data_size, _SHADES - 1)
+        depth = 1
+        parent = parent._parent_tree
+        while parent is not None:
+            depth += 1
+            parent = parent._parent_tree
+        return depth, shade
+
+    def _choose(self, tree, key):
+        """Return the colour of a tree whose depth and shade are <key>.
+
+        @type self: DepthColours
+        @type tree: AbstractTree | ArrayNode
+        @type key: (int, int)
+        @rtype: (int, int, int)
+        """
+        depth, shade = key
+        hue = _DEPTH_HUES[depth % len(_DEPTH_HUES)]
+        # The largest shade is the hue itself, and each smaller one is
+        # mixed a little more with white.
+        lighten = _SHADES - 1 - shade
+        return tuple(part + (255 - part) * lighten // (2 * _SHADES)
+                     for part in hue)
+
+
+def remember(table, key, value, size):
+    """Set <key> to <value> in <table>, first dropping the oldest entry of
+    <table> if it already has <size> entries.
+
+    @type table: collections.OrderedDict
+    @type key: object
+    @type value: object
+    @type size: int
+    @rtype: None
+
+    >>> table = collections.OrderedDict([('a', 1), ('b', 2)])
+    >>> remember(table, 'c', 3, 2)
+    >>> list(table.items())
+    [('b', 2), ('c', 3)]
+    """
+    # Unlike a dict, an OrderedDict finds its oldest entry straight away,
+    # however many entries have been dropped before it.
+    if len(table) >= size:
+        table.popitem(last=False)
+    table[key] = value
+
+
+def _encode(name):
+    """Return <name> as bytes, for hashing.
+
+    Names which are not strings, such as the roots of other kinds of trees,
+    are hashed by their str. File names which are not valid UTF-8 are kept
+    as they were on disk.
+
+    @type name: object
+    @rtype: bytes
+    """
+    return str(name).encode('utf-8', 'surrogateescape')
@@ -12,18 +12,57 @@ concrete implementation of a subclass to represent files and folders on your
 computer's file system.
 """
 import os
-from random import randint
+import sys
 import math
 
+from tree_colour import PathColours
+from tree_paths import PathTable
+from tree_layout import TreeLayout
+from tree_squarify import squarify_rect, forget_order
+
+
+class _NoSubtrees(list):
+    """The empty list of subtrees shared by every leaf.
+
+    A tree of files has far more leaves than folders, so instead of an empty
+    list of its own, each leaf gets this one. It cannot have anything added
+    to it: a leaf which becomes a folder is given a new list by
+    AbstractTree._add_subtree.
+    """
+    __slots__ = ()
+
+    def _unchangeable(self, *args):
+        """Raise TypeError, since this list cannot be changed.
+
+        @type self: _NoSubtrees
+        @rtype: None
+        """
+        raise TypeError('the subtrees of a leaf cannot be changed in place')
+
+    append = extend = insert = __setitem__ = __iadd__ = __imul__ = \
+        _unchangeable
+
+
+# The list of subtrees of every leaf.
+_NO_SUBTREES = _NoSubtrees()
+
+# A folder is compacted, i.e. its deleted leaves are taken out of its list of
+# subtrees, once at least COMPACT_MIN_DELETED of its leaves have been deleted
+# since it was last compacted, and they are more than COMPACT_RATIO of its
+# subtrees.
+COMPACT_MIN_DELETED = 16
+COMPACT_RATIO = 0.5
+
 
 class AbstractTree:
     """A tree that is compatible with the treemap visualiser.
 
     This is an abstract class that should not be instantiated directly.
 
-    You may NOT add any attributes, public or private, to this class.
-    However, part of this assignment will involve you adding and implementing
-    new public *methods* for this interface.
+    Each tree keeps only the attributes named in __slots__, and has no
+    __dict__. An attribute added to __slots__ costs memory for every node,
+    so anything which only some trees need is kept elsewhere, e.g. in a
+    TreeLayout, or by the class, as colour_policy and _paths are.
 
     === Public Attributes ===
     @type data_size: int
@@ -31,15 +70,31 @@ class AbstractTree:
     @type colour: (int, int, int)
         The RGB colour value of the root of this tree.
         Note: only the colours of leaves will influence what the user sees.
+        It is chosen by colour_policy when it is first needed, and cannot be
+        set.
+    @type colour_policy: ColourPolicy
+        The policy choosing the colours of this kind of tree. This belongs
+        to the class, not to each tree.
 
     === Private Attributes ===
     @type _root: obj | None
         The root value of this tree, or None if this tree is empty.
     @type _subtrees: list[AbstractTree]
-        The subtrees of this tree.
+        The subtrees of this tree. Every leaf shares _NO_SUBTREES, which
+        cannot be changed.
     @type _parent_tree: AbstractTree | None
         The parent tree of this tree; i.e., the tree that contains this tree
         as a subtree, or None if this tree is not part of a larger tree.
+    @type _paths: PathTable | None
+        The paths of the folders of this kind of tree, used by
+        get_separator, or None if this kind of tree does not use one. This
+        belongs to the class, not to each tree.
+    @type _deleted: int
+        The number of leaves deleted from the subtrees of this tree since it
+        was last compacted or listed again.
+    @type _order: list[AbstractTree] | None
+        The non-empty subtrees of this tree, largest first, once
+        tree_squarify.sorted_subtrees has sorted them, or None.
 
     === Representation Invariants ===
     - data_size >= 0
@@ -54,7 +109,22 @@ class AbstractTree:
       a bit easier).
 
     - if _parent_tree is not empty, then self is in _parent_tree._subtrees
+
+    - A leaf's _subtrees is usually _NO_SUBTREES, which is shared, so code
+      which gives a tree subtrees must replace its _subtrees with a list of
+      its own, as _add_subtree does, rather than change it in place.
+    - If _order is not None, then it is the non-empty subtrees of this tree,
+      largest first.
     """
+    # Trees can have millions of nodes, so they keep their attributes in
+    # slots rather than a __dict__ each. Subclasses should declare their own
+    # __slots__ too, or they get a __dict__ back.
+    __slots__ = ('_root', '_subtrees', '_parent_tree', 'data_size',
+                 '_deleted', '_order')
+
+    colour_policy = PathColours()
+    _paths = None
+
     def __init__(self, root, subtrees, data_size=0):
         """Initialize a new AbstractTree.
 
@@ -67,7 +137,8 @@ class AbstractTree:
 
         This method sets the _parent_tree attribute for each subtree to self.
 
-        A random colour is chosen for this tree.
+        If <subtrees> is empty, it is not kept: the tree shares _NO_SUBTREES
+        with every other leaf instead.
 
         Precondition: if <root> is None, then <subtrees> is empty.
 
@@ -78,12 +149,13 @@ class AbstractTree:
         @rtype: None
         """
         self._root = root
-        self._subtrees = subtrees
+        self._subtrees = subtrees if subtrees else _NO_SUBTREES
         self._parent_tree = None
+        self._deleted = 0
+        self._order = None
 
-        # 1. Initialize self.colour and self.data_size, according to the
-        # docstring.
-        self.colour = (randint(0, 255), randint(0, 255), randint(0, 255))
+        # 1. Initialize self.data_size, according to the docstring. The
+        # colour is only chosen if it is needed.
         # At this point, if it is a file, data_size will be specified. If it is
         # a folder, the data_size will be zero.
         self.data_size = data_size
@@ -96,6 +168,19 @@ class AbstractTree:
             if not subtree.is_empty():
                 subtree._parent_tree = self
 
+    @property
+    def colour(self):
+        """The RGB colour of this tree, as chosen by colour_policy.
+
+        @type self: AbstractTree
+        @rtype: (int, int, int)
+
+        >>> f1 = AbstractTree('f1', [], 15)
+        >>> f1.colour == AbstractTree('f1', [], 5).colour
+        True
+        """
+        return self.colour_policy.colour(self)
+
     def is_empty(self):
         """Return True if this tree is empty.
 
@@ -104,7 +189,7 @@ class AbstractTree:
         """
         return self._root is None
 
-    def generate_treemap(self, rect):
+    def generate_treemap(self, rect, squarified=False):
         """Run the treemap algorithm on this tree and return the rectangles.
 
         Each returned tuple contains a pygame rectangle and a colour:
@@ -115,6 +200,8 @@ class AbstractTree:
         @type self: AbstractTree
         @type rect: (int, int, int, int)
             Input is in the pygame format: (x, y, width, height)
+        @type squarified: bool
+            Whether to use the squarified algorithm; see layout.
         @rtype: list[((int, int, int, int), (int, int, int))]
 
         >>> empty_file = AbstractTree('f0', [], 0)
@@ -131,76 +218,9 @@ class AbstractTree:
         (0, 500, 800, 166)
         (0, 666, 800, 334)
         """
-        treemap = list()
-        x, y, width, height = rect
-        total_data_size = self.data_size
-
-        # If it is an empty tree, an empty folder or a file with zero
-        # data_size, then return an empty list i.e. not displayed through
-        # treemap visualiser.
-        # When a file is deleted, should also return an empty list.
-        if not self.data_size:
-            return []
-
-        # Since empty leaves are filtered above. So, AbstractTree with empty
-        # subtree list can only be displayable laef here. A tuple of pygame
-        # rectangle covering the whole displaying area and corresponding random
-        # RGB should be returned.
-        elif not self._subtrees:
-            return [(rect, self.colour)]
-
-        # (Trying hard to come up with some kind of helper method but failed
-        # because I tried to mutate global variables (e.g.coordinates and
-        # total_data_size) through the local ones inside the helper method,
-        # but if I return those variables through the helper method and change
-        # them under the global frame, this helper method will not make it
-        # any simpler.
-        # So, I ended up writing two trivial helper functions (_slice_helper
-        # and _update_helper). Although, _update_helper is not concise at all
-        # and takes many parameters, I still use it in order to make it more
-        # modular and avoid duplicates in code:)
-        elif width > height:
-            # If width is larger than height, slice vertically.
-            # Slice the first (n - 1)th rectangles for a tree with n elements
-            # in its subtree list.
-            for subtree in self._subtrees[:-1]:
-                # Avoid division by zero encountered when remaining subtrees
-                # are all empty folders or empty leaves caused by user's
-                # deletion, those empty folders or leaves will be ignored since
-                # they will not be displayed.
-                if total_data_size:
-                    new_width = _slice_helper(subtree.data_size,
-                                              total_data_size, width)
-                    treemap.extend(subtree.generate_treemap
-                                   ((x, y, new_width, height)))
-                    # Update the rectangle available to draw on and the total
-                    # data_size.
-                    x, width, total_data_size = \
-                        _update_helper(new_width, x, width, subtree.data_size,
-                                       total_data_size)
-            # Adjust the rectangle for the last element in the subtree list.
-            treemap.extend(self._subtrees[-1].generate_treemap
-                           ((x, y, width, height)))
-            return treemap
-
-        # If width is smaller or equal to height, slice horizontally. Procedures
-        # are similar.
-        elif width <= height:
-            for subtree in self._subtrees[:-1]:
-                if total_data_size:
-                    new_height = _slice_helper(subtree.data_size,
-                                               total_data_size, height)
-                    treemap.extend(subtree.generate_treemap
-                                   ((x, y, width, new_height)))
-                    y, height, total_data_size = \
-                        _update_helper(new_height, y, height,
-                                       subtree.data_size, total_data_size)
-            # Adjust the rectangle for the last element in the subtree list.
-            treemap.extend(self._subtrees[-1].generate_treemap
-                           ((x, y, width, height,)))
-            return treemap
-
-    def rect_dict(self, rect):
+        return self.layout(rect, squarified=squarified).treemap()
+
+    def rect_dict(self, rect, squarified=False):
         """Used by the treemap visualiser in order to get the AbstractTree
         according to the coordinate, so the keys of the returned dictionary
         are pygame rectangles and the values are AbstractTrees.
@@ -215,60 +235,168 @@ class AbstractTree:
         @type self: AbstractTree
         @type rect: (int, int, int, int)
             Input is in the pygame format: (x, y, width, height)
+        @type squarified: bool
+            Whether to use the squarified algorithm; see layout.
         @rtype: dict[tuple, AbstractTree]
         """
-        pos_dict = dict()
-        x, y, width, height = rect
-        total_data_size = self.data_size
-        # If it is an empty tree, an empty folder or a file with zero
-        # data_size, then return an empty dict i.e. has no chance of being
-        # selected by the user through treemap visualiser.
-        if not self.data_size:
-            return {}
-
-        # Similar to generate_treemap method, empty leaves are filtered above.
-        if not self._subtrees:
-            temp = dict()
-            temp[rect] = self
-            return temp
-
-        # Slice the same as generate_treemap.
-        elif width > height:
-            for subtree in self._subtrees[:-1]:
-                # Avoid division by zero encountered when
-                # remaining subtrees are all empty folders, those
-                # empty folders are ignored since they will not be
-                # displayed through visualiser.
-                if total_data_size:
-                    new_width = _slice_helper(subtree.data_size,
-                                              total_data_size, width)
-                    pos_dict.update(subtree.rect_dict
-                                    ((x, y, new_width, height)))
-                    # Update the rectangle available to draw on and the total
-                    # data_size.
-                    x, width, total_data_size = \
-                        _update_helper(new_width, x, width, subtree.data_size,
-                                       total_data_size)
-            # Adjust the rectangle for the last element in the subtree list.
-            pos_dict.update(self._subtrees[-1].rect_dict
-                            ((x, y, width, height)))
-            return pos_dict
-
-        elif width <= height:
-            for subtree in self._subtrees[:-1]:
-                if total_data_size:
-                    new_height = _slice_helper(subtree.data_size,
-                                               total_data_size, height)
-                    pos_dict.update(subtree.rect_dict
-                                    ((x, y, width, new_height)))
-                    # Update the rectangle and total_data_size.
-                    y, height, total_data_size = \
-                        _update_helper(new_height, y, height,
-                                       subtree.data_size, total_data_size)
-            # Adjust the rectangle for the last element in the subtree list.
-            pos_dict.update(self._subtrees[-1].rect_dict
-                            ((x, y, width, height,)))
-            return pos_dict
+        return self.layout(rect, squarified=squarified).rect_dict()
+
+    def layout(self, rect, min_area=0, squarified=False):
+        """Run the treemap algorithm on this tree once, and return the
+        result, from which the treemap can be both drawn and clicked on.
+
+        generate_treemap and rect_dict each lay the tree out again, so a
+        caller which needs both should use this instead.
+
+        If <min_area> is more than 0, a folder whose rectangle has a smaller
+        area, in pixels, is not sliced among its subtrees, but is in the
+        layout itself, as one block, as if it were a leaf. Most of the
+        leaves of a large tree are too small to see, so this lays it out
+        much faster, and draws far fewer rectangles.
+
+        If <squarified> is True, each folder's subtrees are laid out with the
+        squarified algorithm of tree_squarify, in rectangles as close to
+        squares as it can make them, instead of in slices.
+
+        @type self: AbstractTree
+        @type rect: (int, int, int, int)
+            Input is in the pygame format: (x, y, width, height)
+        @type min_area: int
+        @type squarified: bool
+        @rtype: TreeLayout
+
+        >>> f1 = AbstractTree('f1', [], 15)
+        >>> A = AbstractTree('A', [f1])
+        >>> list(A.layout((0, 0, 800, 1000))) == [(f1, (0, 0, 800, 1000))]
+        True
+        >>> list(A.layout((0, 0, 8, 10), 100)) == [(A, (0, 0, 8, 10))]
+        True
+        """
+        # Leaves are drawn in the same order as a recursive traversal would
+        # draw them, i.e. the order of each folder's subtree list.
+        leaves = list()
+        rects = list()
+        spans = dict()
+        expanded = _lay_out(self, rect, rect[:2], leaves, rects, spans,
+                            min_area, squarified)
+        layout = TreeLayout(rect, leaves, rects, spans, min_area, squarified)
+        layout.expanded = expanded
+        return layout
+
+    def relayout(self, layout, node):
+        """Bring <layout>, a layout of this tree, up to date after the
+        data_size of <node> has changed, e.g. because it is a leaf which has
+        been resized, or the folder a leaf has been deleted from.
+
+        Only the rectangles of <node> and its ancestors are sliced again.
+        Every other folder whose rectangle is the same size as before is
+        laid out exactly as before, only moved, so its leaves' rectangles
+        are copied from <layout>. The result is the same as laying out the
+        whole tree again, which is done instead if <node> is None or not in
+        this tree. The layout keeps the min_area it was made with, and is
+        still squarified if it was, and its expanded attribute tells whether
+        any lazy folder may have been expanded by bringing it up to date.
+
+        Precondition: apart from the change to <node>, which has been passed
+        up to its ancestors, this tree has not changed since <layout> was
+        made or last brought up to date.
+
+        @type self: AbstractTree
+        @type layout: TreeLayout
+        @type node: AbstractTree | None
+        @rtype: None
+
+        >>> f1 = AbstractTree('f1', [], 15)
+        >>> A = AbstractTree('A', [f1, AbstractTree('f2', [], 5)])
+        >>> layout = A.layout((0, 0, 800, 1000))
+        >>> f1.alt_size(positive=False)
+        >>> A.relayout(layout, f1)
+        >>> list(layout) == list(A.layout((0, 0, 800, 1000)))
+        True
+        """
+        chain = [node]
+        while chain[-1] is not None and chain[-1] is not self:
+            chain.append(chain[-1]._parent_tree)
+        leaves = list()
+        rects = list()
+        spans = layout._spans
+        expanded = False
+        changed = chain
+        if chain[-1] is None or spans is None:
+            fresh = self.layout(layout.rect, layout.min_area,
+                                layout.squarified)
+            leaves, rects, spans = fresh._leaves, fresh._rects, fresh._spans
+            expanded = fresh.expanded
+            changed = None
+        elif not _relay_chain(chain[::-1], layout, leaves, rects):
+            # A lazy folder may have been expanded before the layout was
+            # given up on, in which case the fresh layout does not expand
+            # it again.
+            fresh = self.layout(layout.rect, layout.min_area,
+                                layout.squarified)
+            leaves, rects, spans = fresh._leaves, fresh._rects, fresh._spans
+            expanded = True
+            changed = None
+        layout._reset(leaves, rects, spans, changed)
+        layout.expanded = expanded
+
+    def _leaf_rects(self, rect):
+        """Run the treemap algorithm on this tree, yielding each non-empty
+        leaf together with its pygame rectangle.
+
+        This is what layout is built from. The leaves are
+        visited in the same order as a recursive traversal, but an explicit
+        stack is used instead of recursion, so there is no limit on how deep
+        the tree can be.
+
+        @type self: AbstractTree
+        @type rect: (int, int, int, int)
+            Input is in the pygame format: (x, y, width, height)
+        @rtype: iterator[(AbstractTree, (int, int, int, int))]
+        """
+        stack = [(self, rect)]
+        while stack:
+            tree, tree_rect = stack.pop()
+            # If it is an empty tree, an empty folder or a file with zero
+            # data_size, then it is not displayed through treemap visualiser.
+            # When a file is deleted, it should not be displayed either.
+            if not tree.data_size:
+                continue
+            # Since empty leaves are filtered above, an AbstractTree with an
+            # empty subtree list can only be a displayable leaf here, which
+            # covers the whole of its rectangle. A lazy folder that has not
+            # been listed yet looks like a leaf too, until its rectangle is
+            # big enough for its subtrees to be worth drawing.
+            elif not tree._subtrees:
+                if tree.expand(tree_rect):
+                    stack.append((tree, tree_rect))
+                else:
+                    yield tree, tree_rect
+            # Otherwise, slice the rectangle among the subtrees, and push
+            # them in reverse so that they are popped in order.
+            else:
+                stack.extend(reversed(_slice_rect(tree, tree_rect)))
+
+    def expand(self, rect=None):
+        """Make sure every subtree of this tree is in its list of subtrees,
+        and return True if any were added.
+
+        Trees whose subtrees are only read when they are needed override
+        this. Every other tree already has all of its subtrees, so this does
+        nothing.
+
+        @type self: AbstractTree
+        @type rect: (int, int, int, int) | None
+            The pygame rectangle this tree is about to be drawn in, if it is
+            being expanded by the treemap algorithm. A tree may choose not to
+            expand if its subtrees would be too small to see. If None, the
+            tree is always expanded, e.g. because the user has chosen it.
+        @rtype: bool
+
+        >>> AbstractTree('f1', [], 15).expand()
+        False
+        """
+        return False
 
     def del_leaf(self, data_size=0):
         """Delete the selected leaf and update the data size of the deleted
@@ -301,19 +429,99 @@ class AbstractTree:
         """
         # If it is a leaf, delete it by making it an empty tree. (Since only
         # non-empty leaf can be chosen through visualiser)
-        # Then update its ancestors'data size.
+        # Then update its ancestors' data size.
         if not self._subtrees:
-            temp = self.data_size
+            parent = self._parent_tree
+            if parent:
+                parent._adjust_size(-self.data_size)
             self.data_size = 0
             self._root = None
-            if self._parent_tree:
-                self._parent_tree.del_leaf(temp)
-                self._parent_tree = None
-        # If it is a folder, update its data_size and its ancestors.
+            self._parent_tree = None
+            if parent:
+                _count_deleted(parent, 1)
+        # If it is a folder, update its data_size and its ancestors'.
         else:
-            self.data_size -= data_size
-            if self._parent_tree:
-                self._parent_tree.del_leaf(data_size)
+            self._adjust_size(-data_size)
+
+    def _undelete(self, parent, name, data_size, rank):
+        """Undo del_leaf on this leaf, which was named <name>, had a size of
+        <data_size> and was a subtree of <parent>, with <rank> subtrees
+        which had not been deleted before it.
+
+        del_leaf leaves a deleted leaf where it was in its parent's
+        subtrees, so it is usually still there. If <parent> has been
+        compacted since, the leaf is put back right after the subtree it
+        came after, which gives the same treemap as before it was deleted.
+
+        @type self: AbstractTree
+        @type parent: AbstractTree | None
+        @type name: object
+        @type data_size: int
+        @type rank: int
+        @rtype: None
+
+        >>> f1 = AbstractTree('f1', [], 15)
+        >>> f2 = AbstractTree('f2', [], 5)
+        >>> A = AbstractTree('A', [f1, f2, AbstractTree('f3', [], 5)])
+        >>> f2.del_leaf()
+        >>> A.compact()
+        1
+        >>> f2._undelete(A, 'f2', 5, 1)
+        >>> A.data_size, A._subtrees.index(f2)
+        (25, 1)
+        """
+        self._root = name
+        self._parent_tree = parent
+        if parent is not None and self not in parent._subtrees:
+            position = 0
+            for index, subtree in enumerate(parent._subtrees):
+                if not rank:
+                    break
+                if not subtree.is_empty():
+                    rank -= 1
+                    position = index + 1
+            parent._subtrees.insert(position, self)
+        self._adjust_size(data_size)
+
+    def compact(self, zero_size=False):
+        """Take the deleted leaves out of the subtrees of every folder in this
+        tree, and return the number taken out.
+
+        If <zero_size> is True, every other subtree with a data_size of 0,
+        such as an empty file or folder, is taken out too. This must not be
+        done to a tree which is being scanned or watched, whose empty
+        folders may be filled in later.
+
+        The last subtree of each folder is always kept, since the treemap
+        algorithm gives it whatever is left of the folder's rectangle: so
+        the treemap is exactly the same afterwards.
+
+        Folders are also compacted automatically as their leaves are
+        deleted; see COMPACT_MIN_DELETED.
+
+        @type self: AbstractTree
+        @type zero_size: bool
+        @rtype: int
+
+        >>> f1 = AbstractTree('f1', [], 15)
+        >>> f2 = AbstractTree('f2', [], 0)
+        >>> f3 = AbstractTree('f3', [], 0)
+        >>> A = AbstractTree('A', [f1, f2, f3])
+        >>> f1.del_leaf()
+        >>> A.compact(), [subtree._root for subtree in A._subtrees]
+        (1, ['f2', 'f3'])
+        >>> A.compact(zero_size=True), [subtree._root for subtree in
+        ...                             A._subtrees]
+        (1, ['f3'])
+        """
+        removed = 0
+        stack = [self]
+        while stack:
+            tree = stack.pop()
+            if tree._subtrees:
+                removed += _compact_folder(tree, zero_size)
+                stack.extend(tree._subtrees)
+        return removed
 
     def alt_size(self, data_size=0, positive=True):
         """Change the data_size of a file by one percent according to user's
@@ -358,35 +566,147 @@ class AbstractTree:
         # If it is a leaf, change its data_size by one percent, then update
         # its ancestors' if it has any.
         if not self._subtrees:
-            # Round up the changed data_size.
-            alt_size = math.ceil(self.data_size / 100)
-            # Here, multiple 'if' statements are used in order to avoid too many
-            # nested blocks and make the code as concise as possible.
-            if positive:
-                self.data_size += alt_size
-            # Update its parent tree if it has one.
-            if positive and self._parent_tree:
-                self._parent_tree.alt_size(alt_size)
-            # Update its parent tree if it has one. Here, the order of following
-            # 'if' condition matters because we should not subtract alt_size
-            # twice when determing whether data size is greater than 1.
-            if not positive and self._parent_tree:
-                if self.data_size - alt_size >= 1:
-                    self._parent_tree.alt_size(alt_size, positive=False)
-            if not positive:
-                if self.data_size - alt_size >= 1:
-                    self.data_size -= alt_size
-
+            self._adjust_size(alt_change(self.data_size, positive))
         # If it is a folder, update its data_size and its ancestors'.
+        elif positive:
+            self._adjust_size(data_size)
         else:
-            if positive:
-                self.data_size += data_size
-                if self._parent_tree:
-                    self._parent_tree.alt_size(data_size)
-            else:
-                self.data_size -= data_size
-                if self._parent_tree:
-                    self._parent_tree.alt_size(data_size, positive=False)
+            self._adjust_size(-data_size)
+
+    def batch(self):
+        """Return a new TreeBatch, to delete and resize many leaves of this
+        tree at once.
+
+        The changes are made when the batch is committed, which updates the
+        data_size of each ancestor of the changed leaves only once, rather
+        than once for every leaf. The batch only takes leaves of this tree.
+
+        @type self: AbstractTree
+        @rtype: TreeBatch
+
+        >>> f1 = AbstractTree('f1', [], 15)
+        >>> f2 = AbstractTree('f2', [], 5)
+        >>> A = AbstractTree('A', [AbstractTree('B', [f1, f2])])
+        >>> with A.batch() as batch:
+        ...     batch.delete(f1)
+        ...     batch.resize(f2, 8)
+        >>> A.data_size, f1.is_empty()
+        (8, True)
+        """
+        return TreeBatch(self)
+
+    def _adjust_size(self, change):
+        """Add <change> to the data_size of this tree and of each of its
+        ancestors.
+
+        This is the ancestor-propagation step shared by del_leaf and alt_size.
+        It walks up the tree with a loop rather than recursion, so it costs
+        one step per level and works on trees of any depth.
+
+        @type self: AbstractTree
+        @type change: int
+        @rtype: None
+
+        >>> f1 = AbstractTree('f1', [], 15)
+        >>> A = AbstractTree('A', [f1])
+        >>> B = AbstractTree('B', [A])
+        >>> f1._adjust_size(-5)
+        >>> f1.data_size, A.data_size, B.data_size
+        (10, 10, 10)
+        """
+        tree = self
+        while tree is not None:
+            tree.data_size += change
+            forget_order(tree)
+            tree = tree._parent_tree
+
+    def _add_subtree(self, subtree, index=None):
+        """Add <subtree> to the subtrees of this tree, and update the
+        data_size of this tree and its ancestors.
+
+        @type self: AbstractTree
+        @type subtree: AbstractTree
+        @type index: int | None
+            The position to insert <subtree> at, or None to add it at the end.
+        @rtype: None
+
+        >>> f1 = AbstractTree('f1', [], 15)
+        >>> A = AbstractTree('A', [f1])
+        >>> f2 = AbstractTree('f2', [], 5)
+        >>> A._add_subtree(f2, 0)
+        >>> [subtree._root for subtree in A._subtrees], A.data_size
+        (['f2', 'f1'], 20)
+        """
+        if self._subtrees is _NO_SUBTREES:
+            # This tree was a leaf, so it needs a list of its own.
+            self._subtrees = list()
+        if index is None:
+            self._subtrees.append(subtree)
+        else:
+            self._subtrees.insert(index, subtree)
+        subtree._parent_tree = self
+        self._adjust_size(subtree.data_size)
+
+    def _remove_subtree(self, subtree):
+        """Remove <subtree> from the subtrees of this tree, and update the
+        data_size of this tree and its ancestors.
+
+        Unlike del_leaf, <subtree> is taken out of _subtrees altogether, and
+        it can be a folder. It is left as it is, apart from no longer having
+        a parent tree.
+
+        Return the position <subtree> was at.
+
+        Precondition: <subtree> is one of the subtrees of this tree.
+
+        @type self: AbstractTree
+        @type subtree: AbstractTree
+        @rtype: int
+
+        >>> f1 = AbstractTree('f1', [], 15)
+        >>> f2 = AbstractTree('f2', [], 5)
+        >>> A = AbstractTree('A', [f1, f2])
+        >>> A._remove_subtree(f2), A.data_size, f2._parent_tree
+        (1, 15, None)
+        """
+        # Trees do not define __eq__, so this finds <subtree> itself.
+        index = self._subtrees.index(subtree)
+        del self._subtrees[index]
+        subtree._parent_tree = None
+        self._adjust_size(-subtree.data_size)
+        # <subtree> may be about to be moved or renamed, which would change
+        # the paths of the folders in it.
+        if self._paths is not None:
+            self._paths.clear()
+        return index
+
+    def _replace_subtrees(self, subtrees):
+        """Replace the subtrees of this tree with <subtrees>, and update the
+        data_size of this tree and its ancestors.
+
+        This does what _remove_subtree and _add_subtree would do for each
+        subtree, but only goes up the tree once.
+
+        @type self: AbstractTree
+        @type subtrees: list[AbstractTree]
+        @rtype: None
+
+        >>> f1 = AbstractTree('f1', [], 15)
+        >>> A = AbstractTree('A', [f1])
+        >>> B = AbstractTree('B', [A])
+        >>> A._replace_subtrees([AbstractTree('f2', [], 5), f1])
+        >>> [subtree._root for subtree in A._subtrees], B.data_size
+        (['f2', 'f1'], 20)
+        """
+        self._subtrees = subtrees if subtrees else _NO_SUBTREES
+        for subtree in subtrees:
+            subtree._parent_tree = self
+        self._adjust_size(sum(subtree.data_size for subtree in subtrees) -
+                          self.data_size)
+        # The subtrees replaced may be about to be moved, as for
+        # _remove_subtree.
+        if self._paths is not None:
+            self._paths.clear()
 
     def get_separator(self):
         """Return the string used to separate nodes in the string
@@ -415,32 +735,46 @@ class FileSystemTree(AbstractTree):
 
     The data_size attribute for regular files as simply the size of the file,
     as reported by os.path.getsize.
+
+    Names are interned, so that the many files which share a name, such as
+    __init__.py or index.html, share a single string.
     """
-    def __init__(self, path):
+    __slots__ = ()
+
+    _paths = PathTable('\\')
+
+    def __init__(self, path, subtrees=None, data_size=0):
         """Store the file tree structure contained in the given file or folder.
 
+        If <subtrees> is None, <path> is scanned and the whole file tree
+        structure underneath it is stored.
+        In this case, the other parameters are not used.
+
+        Otherwise, the file system is NOT accessed: the name of <path> and the
+        other arguments are passed directly to the superclass constructor.
+        This is used by the scanners in file_scanner, which read the file
+        system themselves.
+
         Precondition: <path> is a valid path for this computer.
 
         @type self: FileSystemTree
         @type path: str
+        @type subtrees: list[FileSystemTree] | None
+        @type data_size: int
         @rtype: None
         """
-        if os.path.isfile(path):
+        name = sys.intern(os.path.basename(path))
+        if subtrees is not None:
+            AbstractTree.__init__(self, name, subtrees, data_size)
+        elif os.path.isfile(path):
             # If it is a file, construct an AbstractTree with its size passed
             # in as a parameter.
-            AbstractTree.__init__(self, os.path.basename(path),
-                                  [], os.path.getsize(path))
+            AbstractTree.__init__(self, name, [], os.path.getsize(path))
             # A file with positive size will contain an empty list as its
             # subtree. (Leaf type 1)
         else:
-            file_list = os.listdir(path)
-            subtrees_list = list()
-            for file in file_list:
-                file_tree = FileSystemTree(os.path.join(path, file))
-                subtrees_list.append(file_tree)
-            AbstractTree.\
-                __init__(self, os.path.basename(path), subtrees_list)
-            # Since it is a file, the data_size will not be passed
+            AbstractTree.__init__(self, name, _walk_folder(path))
+            # Since it is a folder, the data_size will not be passed
             # in as a parameter.
             # Here, if it is an empty folder or a file with zero size, then it
             # will be a leaf with empty subtrees_list and the data size will be
@@ -456,18 +790,607 @@ class FileSystemTree(AbstractTree):
 
         self._root always has a value i.e. not an empty tree.
 
+        The paths of folders are remembered in _paths, so this only walks up
+        the tree the first time something in a folder is asked about.
+
         @type self: FileSystemTree
         @rtype: str
+
+        >>> f1 = FileSystemTree('f1', [], 15)
+        >>> A = FileSystemTree('A', [FileSystemTree('B', [f1])])
+        >>> f1.get_separator()
+        'A\\\\B\\\\f1'
+        """
+        return self._paths.path(self)
+
+
+class TreeBatch:
+    """A set of deletions and size changes to leaves, which are made all at
+    once when the batch is committed.
+
+    Deleting or resizing leaves one at a time updates every ancestor of
+    every leaf, so changing k leaves costs k times the depth of the tree.
+    A batch changes the leaves first, adding up the change to each folder,
+    and then passes the totals up the tree, so each ancestor is only
+    updated once, however many of the changed leaves are under it.
+
+    A batch can be used as a context manager, in which case it is committed
+    at the end of the with statement, unless an error is raised in it. So
+    either all of the changes are made, or none of them.
+
+    === Private Attributes ===
+    @type _tree: AbstractTree | None
+        The tree whose leaves this batch changes, or None if it takes leaves
+        of any tree.
+    @type _changes: list[(str, AbstractTree, int | bool | None)]
+        The changes to make, in order, as the name of the change, the leaf
+        to change and the argument of the change.
+    """
+    def __init__(self, tree=None):
+        """Initialize an empty batch of changes to the leaves of <tree>, or
+        of any tree if <tree> is None.
+
+        @type self: TreeBatch
+        @type tree: AbstractTree | None
+        @rtype: None
+        """
+        self._tree = tree
+        self._changes = list()
+
+    def __len__(self):
+        """Return the number of changes waiting to be made.
+
+        @type self: TreeBatch
+        @rtype: int
+        """
+        return len(self._changes)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+        else:
+            self._changes = list()
+
+    def delete(self, leaf):
+        """Delete <leaf>, as del_leaf does, when this batch is committed.
+
+        Precondition: <leaf> is a leaf.
+
+        @type self: TreeBatch
+        @type leaf: AbstractTree
+        @rtype: None
+        """
+        self._changes.append(('delete', leaf, None))
+
+    def resize(self, leaf, data_size):
+        """Set the data_size of <leaf> to <data_size> when this batch is
+        committed.
+
+        Precondition: <leaf> is a leaf, and data_size >= 0.
+
+        @type self: TreeBatch
+        @type leaf: AbstractTree
+        @type data_size: int
+        @rtype: None
         """
-        if self._parent_tree:
-            return self._parent_tree.get_separator() + '\\' + self._root
+        self._changes.append(('resize', leaf, data_size))
+
+    def alt_size(self, leaf, positive=True):
+        """Change the data_size of <leaf> by one percent, as alt_size does,
+        when this batch is committed.
+
+        Precondition: <leaf> is a leaf.
+
+        @type self: TreeBatch
+        @type leaf: AbstractTree
+        @type positive: bool
+        @rtype: None
+        """
+        self._changes.append(('alt_size', leaf, positive))
+
+    def commit(self):
+        """Make every change in this batch, in the order they were added,
+        and empty it. Return the number of leaves whose data_size changed.
+
+        Changes to a leaf which has already been deleted are ignored.
+
+        Raise ValueError, and make none of the changes, if this batch belongs
+        to a tree and one of the leaves is not in it. The batch is emptied
+        either way.
+
+        @type self: TreeBatch
+        @rtype: int
+
+        >>> f1 = AbstractTree('f1', [], 15)
+        >>> A = AbstractTree('A', [f1])
+        >>> batch = AbstractTree('B', [AbstractTree('f2', [], 5)]).batch()
+        >>> batch.delete(f1)
+        >>> batch.commit()
+        Traceback (most recent call last):
+        ...
+        ValueError: a leaf in the batch is not in its tree
+        >>> A.data_size
+        15
+        """
+        changes = self._changes
+        self._changes = list()
+        if self._tree is not None:
+            _check_in_tree(self._tree, changes)
+        # The total change to the data_size of each folder which has a
+        # changed leaf in it, from its leaves.
+        folder_changes = dict()
+        # The number of leaves deleted from each folder.
+        deleted = dict()
+        changed = 0
+        for kind, leaf, argument in changes:
+            # Deleted leaves are empty.
+            if leaf._root is None:
+                continue
+            old_size = leaf.data_size
+            parent = leaf._parent_tree
+            if kind == 'resize':
+                new_size = argument
+            elif kind == 'delete':
+                new_size = 0
+                leaf._root = None
+                leaf._parent_tree = None
+                if parent is not None:
+                    deleted[parent] = deleted.get(parent, 0) + 1
+            else:
+                new_size = old_size + alt_change(old_size, argument)
+            if new_size != old_size:
+                leaf.data_size = new_size
+                changed += 1
+                if parent is not None:
+                    if parent in folder_changes:
+                        folder_changes[parent] += new_size - old_size
+                    else:
+                        folder_changes[parent] = new_size - old_size
+        _pass_up(folder_changes)
+        for folder, count in deleted.items():
+            _count_deleted(folder, count)
+        return changed
+
+
+def _check_in_tree(tree, changes):
+    """Helper function for TreeBatch.commit. Raise ValueError if the leaf
+    of any of <changes>, as kept in TreeBatch._changes, is not in <tree>,
+    unless it has been deleted.
+
+    Each folder is only walked up from once, so this costs no more than
+    the number of leaves and of their ancestors.
+
+    @type tree: AbstractTree
+    @type changes: list[(str, AbstractTree, int | bool | None)]
+    @rtype: None
+    """
+    # The folders known to be in <tree>.
+    known = {tree}
+    for _, leaf, _ in changes:
+        node = leaf._parent_tree
+        # Most leaves are in a folder which is already known.
+        if node in known or leaf is tree or leaf._root is None:
+            continue
+        path = list()
+        while node not in known:
+            if node is None:
+                raise ValueError('a leaf in the batch is not in its tree')
+            path.append(node)
+            node = node._parent_tree
+        known.update(path)
+
+
+def _count_deleted(folder, count):
+    """Record that <count> more leaves of <folder> have been deleted, and
+    compact it if enough of its subtrees have been.
+
+    Compacting a folder takes time proportional to its number of subtrees,
+    but at least half of them have been deleted since it was last
+    compacted, so it only adds a constant amount of time to each deletion.
+
+    @type folder: AbstractTree
+    @type count: int
+    @rtype: None
+    """
+    folder._deleted += count
+    if (folder._deleted >= COMPACT_MIN_DELETED and
+            folder._deleted > COMPACT_RATIO * len(folder._subtrees)):
+        _compact_folder(folder, False)
+
+
+def _compact_folder(folder, zero_size):
+    """Take the deleted leaves, and the other subtrees with a data_size of 0
+    if <zero_size> is True, out of the subtrees of <folder>, apart from the
+    last one, and return the number taken out.
+
+    The subtrees are replaced by a new list rather than changed in place,
+    so that a loop over the old list is not disturbed.
+
+    Precondition: <folder> has at least one subtree.
+
+    @type folder: AbstractTree
+    @type zero_size: bool
+    @rtype: int
+    """
+    folder._deleted = 0
+    subtrees = folder._subtrees
+    if zero_size:
+        kept = [subtree for subtree in subtrees[:-1] if subtree.data_size]
+    else:
+        kept = [subtree for subtree in subtrees[:-1]
+                if subtree._root is not None]
+    if len(kept) == len(subtrees) - 1:
+        return 0
+    kept.append(subtrees[-1])
+    folder._subtrees = kept
+    return len(subtrees) - len(kept)
+
+
+def alt_change(data_size, positive):
+    """Return the change alt_size makes to a leaf of size <data_size>: one
+    percent of it, rounded up, but never taking it below 1.
+
+    Other kinds of trees, such as ArrayTree, use this to change the sizes of
+    their leaves exactly as AbstractTree.alt_size does.
+
+    @type data_size: int
+    @type positive: bool
+    @rtype: int
+
+    >>> alt_change(150, True), alt_change(150, False)
+    (2, -2)
+    >>> alt_change(1, False)
+    0
+    """
+    # Round up the changed data_size.
+    alt_size = math.ceil(data_size / 100)
+    # A leaf's data_size cannot decrease below 1, so in that case nothing
+    # changes at all.
+    if positive:
+        return alt_size
+    elif data_size - alt_size >= 1:
+        return -alt_size
+    return 0
+
+
+def _pass_up(changes):
+    """Add each change in <changes> to the data_size of its folder and of
+    each of the folder's ancestors.
+
+    Every ancestor is updated exactly once, with the total of the changes
+    below it: a folder is only updated once all of its subtrees with a
+    change have passed their total up to it.
+
+    @type changes: dict[AbstractTree, int]
+    @rtype: None
+
+    >>> f1 = AbstractTree('f1', [], 15)
+    >>> B = AbstractTree('B', [f1])
+    >>> C = AbstractTree('C', [AbstractTree('f2', [], 5)])
+    >>> A = AbstractTree('A', [B, C])
+    >>> _pass_up({B: -5, C: 2})
+    >>> A.data_size, B.data_size, C.data_size
+    (17, 10, 7)
+    """
+    # Find every tree the changes pass through, and count how many of each
+    # one's subtrees pass a change up to it. Each tree is only walked past
+    # once.
+    waiting = dict()
+    seen = set()
+    for folder in changes:
+        tree = folder
+        while tree not in seen:
+            seen.add(tree)
+            parent = tree._parent_tree
+            if parent is None:
+                break
+            waiting[parent] = waiting.get(parent, 0) + 1
+            tree = parent
+    # Start from the trees with nothing below them to wait for, and pass
+    # each total up once it is complete.
+    totals = dict(changes)
+    ready = [tree for tree in seen if tree not in waiting]
+    while ready:
+        tree = ready.pop()
+        total = totals.pop(tree, 0)
+        tree.data_size += total
+        forget_order(tree)
+        parent = tree._parent_tree
+        if parent is not None:
+            totals[parent] = totals.get(parent, 0) + total
+            waiting[parent] -= 1
+            if not waiting[parent]:
+                ready.append(parent)
+
+
+def _walk_folder(path):
+    """Return the subtrees of the folder at <path>, for the FileSystemTree
+    constructor.
+
+    The folder is walked with an explicit stack of the folders currently
+    being read instead of recursion, so there is no limit on how deep it can
+    be. Each path is checked with os.path.isfile, then os.path.getsize or
+    os.listdir, exactly as a recursive constructor would.
+
+    @type path: str
+    @rtype: list[FileSystemTree]
+    """
+    # Each frame holds a folder's path, an iterator over the names in it
+    # which have not been visited yet, and its subtrees built so far.
+    stack = [(path, iter(os.listdir(path)), [])]
+    while True:
+        folder, names, subtrees = stack[-1]
+        name = next(names, None)
+        if name is None:
+            # Every name in this folder has been visited, so build it and
+            # attach it to the folder containing it.
+            stack.pop()
+            if not stack:
+                return subtrees
+            stack[-1][2].append(FileSystemTree(folder, subtrees))
+        else:
+            child = os.path.join(folder, name)
+            if os.path.isfile(child):
+                subtrees.append(FileSystemTree(child, [],
+                                               os.path.getsize(child)))
+            else:
+                stack.append((child, iter(os.listdir(child)), []))
+
+
+def _lay_out(tree, rect, origin, leaves, rects, spans, min_area=0,
+             squarified=False):
+    """Helper function for layout and relayout. Run the treemap algorithm on
+    <tree> in <rect>, adding its non-empty leaves to <leaves> and their
+    rectangles to <rects>, and the span of each folder to <spans>, as
+    TreeLayout keeps them. <origin> is the corner of the rectangle of the
+    parent of <tree>. Folders whose rectangles have less than <min_area>
+    pixels are added as blocks, like leaves. If <squarified> is True, the
+    folders are laid out by squarify_rect instead of _slice_rect.
+
+    Return True if any lazy folder was expanded, which may have changed the
+    data_size of its ancestors.
+
+    @type tree: AbstractTree
+    @type rect: (int, int, int, int)
+    @type origin: (int, int)
+    @type leaves: list[AbstractTree]
+    @type rects: list[(int, int, int, int)]
+    @type spans: dict[AbstractTree, (int, int, int, int, int)]
+    @type min_area: int
+    @type squarified: bool
+    @rtype: bool
+    """
+    split = squarify_rect if squarified else _slice_rect
+    expanded = False
+    stack = [(tree, rect, origin)]
+    while stack:
+        node, node_rect, node_origin = stack.pop()
+        # A folder's span is finished once all of its leaves have been
+        # added. This is marked by the folder with no rectangle, and the
+        # number of leaves there were before it instead of its origin.
+        if node_rect is None:
+            spans[node] = spans[node][:4] + (len(leaves) - node_origin,)
+        # The same nodes are shown as by _leaf_rects.
+        elif not node.data_size:
+            continue
+        elif not node._subtrees:
+            if node.expand(node_rect):
+                expanded = True
+                stack.append((node, node_rect, node_origin))
+            else:
+                leaves.append(node)
+                rects.append(node_rect)
+        else:
+            x, y, width, height = node_rect
+            # A folder too small to slice is a block of its own, which
+            # counts as one leaf.
+            if width * height < min_area:
+                spans[node] = (x - node_origin[0], y - node_origin[1], width,
+                               height, 1)
+                leaves.append(node)
+                rects.append(node_rect)
+                continue
+            spans[node] = (x - node_origin[0], y - node_origin[1], width,
+                           height, 0)
+            stack.append((node, None, len(leaves)))
+            stack.extend((subtree, sub_rect, (x, y)) for subtree, sub_rect
+                         in reversed(split(node, node_rect)))
+    return expanded
+
+
+def _relay_chain(chain, layout, leaves, rects):
+    """Helper function for relayout. Lay out the tree <chain>[0] again in
+    layout.rect, adding its leaves to <leaves> and their rectangles to
+    <rects>, and updating layout._spans, where only the sizes of the nodes
+    in <chain> have changed since <layout> was made.
+
+    Each node in <chain> after the first is a subtree of the one before it.
+    The leaves of a folder which is not in <chain>, and whose rectangle is
+    the same size as before, are copied from <layout>. Every other subtree
+    of a node in <chain> is laid out by _lay_out.
+
+    Return False, and leave layout._spans in an unknown state, if <layout>
+    could not be brought up to date, e.g. because a lazy folder was
+    expanded, in which case the whole tree must be laid out again.
+
+    @type chain: list[AbstractTree]
+    @type layout: TreeLayout
+    @type leaves: list[AbstractTree]
+    @type rects: list[(int, int, int, int)]
+    @rtype: bool
+    """
+    old_leaves, old_rects, spans = layout._leaves, layout._rects, layout._spans
+    rect, min_area = layout.rect, layout.min_area
+    squarified = layout.squarified
+    # Each task is a node to add to the layout, its new rectangle, the new
+    # corner of its parent, and where its leaves were in the old layout: the
+    # index of the first one and how many there were. Nodes in the chain
+    # also have their parent's old corner and their depth in the chain, and
+    # folders which are copied have how far they have moved. Folders whose
+    # span is finished have no rectangle, as in _lay_out.
+    stack = [(chain[0], rect, rect[:2], 0, len(old_leaves), rect[:2], 0)]
+    while stack:
+        task = stack.pop()
+        node, node_rect, origin = task[:3]
+        if node_rect is None:
+            spans[node] = spans[node][:4] + (len(leaves) - task[3],)
+        elif len(task) == 7:
+            if not _relay_node(task, chain, spans, leaves, stack, min_area,
+                               squarified):
+                return False
+        elif len(task) == 6:
+            start, count, (dx, dy) = task[3:]
+            leaves.extend(old_leaves[start:start + count])
+            if dx or dy:
+                rects.extend([(x + dx, y + dy, width, height) for
+                              x, y, width, height in
+                              old_rects[start:start + count]])
+            else:
+                rects.extend(old_rects[start:start + count])
+        elif _lay_out(node, node_rect, origin, leaves, rects, spans,
+                      min_area, squarified):
+            return False
+    return True
+
+
+def _relay_node(task, chain, spans, leaves, stack, min_area, squarified):
+    """Helper function for _relay_chain. Slice the rectangle of the node in
+    <task>, which is in <chain>, among its subtrees, with squarify_rect if
+    <squarified> is True, and push the tasks for them onto <stack>.
+
+    Return False if the old layout of the node does not match its subtrees.
+
+    @type task: (AbstractTree, (int, int, int, int), (int, int), int, int,
+                 (int, int), int)
+    @type chain: list[AbstractTree]
+    @type spans: dict[AbstractTree, (int, int, int, int, int)]
+    @type leaves: list[AbstractTree]
+    @type stack: list[tuple]
+    @type min_area: int
+    @type squarified: bool
+    @rtype: bool
+    """
+    node, node_rect, origin, start, count, old_origin, depth = task
+    x, y, width, height = node_rect
+    # A node which was not shown as a folder before, or was a block, has
+    # nothing to copy, and neither does a node which is now a block, so it
+    # is laid out from scratch.
+    if (not count or not node.data_size or not node._subtrees or
+            node not in spans or width * height < min_area or
+            spans[node][2] * spans[node][3] < min_area):
+        stack.append((node, node_rect, origin))
+        return True
+    old_x = old_origin[0] + spans[node][0]
+    old_y = old_origin[1] + spans[node][1]
+    next_node = chain[depth + 1] if depth + 1 < len(chain) else None
+    if squarified:
+        slices = squarify_rect(node, node_rect)
+    else:
+        slices = _slice_rect(node, node_rect)
+    # The number of leaves each subtree had in the old layout. Only the
+    # next node in the chain has changed size, so the others still have as
+    # many, and the next node has whatever is left.
+    counts = list()
+    for subtree, _ in slices:
+        if subtree is next_node:
+            counts.append(0)
+        elif not subtree.data_size:
+            counts.append(0)
+        elif not subtree._subtrees:
+            counts.append(1)
+        elif subtree in spans:
+            counts.append(spans[subtree][4])
+        else:
+            return False
+    left_over = count - sum(counts)
+    if left_over < 0:
+        return False
+    # If the node is the last in the chain, the old layout of its subtrees
+    # does not match them when one has been deleted or added, so they are
+    # laid out from scratch.
+    if next_node is None and left_over:
+        stack.append((node, node_rect, origin))
+        return True
+    spans[node] = (x - origin[0], y - origin[1], width, height, 0)
+    # The span of the node is finished after all of its subtrees, so it is
+    # pushed first.
+    stack.append((node, None, origin, len(leaves)))
+    tasks = list()
+    for (subtree, sub_rect), sub_count in zip(slices, counts):
+        if subtree is next_node:
+            tasks.append((subtree, sub_rect, (x, y), start, left_over,
+                          (old_x, old_y), depth + 1))
+            sub_count = left_over
+        elif (sub_count and subtree._subtrees and
+              spans[subtree][2:4] == sub_rect[2:]):
+            span = spans[subtree]
+            tasks.append((subtree, sub_rect, (x, y), start, sub_count,
+                          (sub_rect[0] - old_x - span[0],
+                           sub_rect[1] - old_y - span[1])))
+            spans[subtree] = (sub_rect[0] - x, sub_rect[1] - y) + span[2:]
+        else:
+            tasks.append((subtree, sub_rect, (x, y)))
+        start += sub_count
+    stack.extend(reversed(tasks))
+    return True
+
+
+def _slice_rect(tree, rect):
+    """Helper function for _leaf_rects. Slice <rect> among the subtrees of
+    <tree> in proportion to their data_size.
+
+    The rectangle is sliced vertically if it is wider than it is tall, and
+    horizontally otherwise. Each slice is rounded down, and the last subtree
+    takes whatever is left over.
+
+    Precondition: <tree> has at least one subtree, and its data_size is not
+    zero.
+
+    @type tree: AbstractTree
+    @type rect: (int, int, int, int)
+    @rtype: list[(AbstractTree, (int, int, int, int))]
+        Each subtree together with its slice of <rect>.
+    """
+    slices = list()
+    x, y, width, height = rect
+    total_data_size = tree.data_size
+    # If width is larger than height, slice vertically. Otherwise, slice
+    # horizontally.
+    vertical = width > height
+    # Slice the first (n - 1)th rectangles for a tree with n elements in its
+    # subtree list.
+    for subtree in tree._subtrees[:-1]:
+        # Avoid division by zero encountered when remaining subtrees are all
+        # empty folders or empty leaves caused by user's deletion, those empty
+        # folders or leaves will be ignored since they will not be displayed.
+        if not total_data_size:
+            continue
+        elif vertical:
+            new_width = _slice_helper(subtree.data_size, total_data_size,
+                                      width)
+            slices.append((subtree, (x, y, new_width, height)))
+            # Update the rectangle available to draw on and the total
+            # data_size.
+            x, width, total_data_size = \
+                _update_helper(new_width, x, width, subtree.data_size,
+                               total_data_size)
         else:
-            # Base case: self is at top of the tree.
-            return self._root
+            new_height = _slice_helper(subtree.data_size, total_data_size,
+                                       height)
+            slices.append((subtree, (x, y, width, new_height)))
+            y, height, total_data_size = \
+                _update_helper(new_height, y, height, subtree.data_size,
+                               total_data_size)
+    # Adjust the rectangle for the last element in the subtree list.
+    slices.append((tree._subtrees[-1], (x, y, width, height)))
+    return slices
 
 
 def _slice_helper(sub_size, total_size, length):
-    """Helper function for generate_treemap and rect_dict. Help slice the
+    """Helper function for _slice_rect. Help slice the
     rectangle hrizontally or vertically.
 
     Total_size is Never zero.
@@ -488,7 +1411,7 @@ def _slice_helper(sub_size, total_size, length):
 
 
 def _update_helper(new_length, coordinate, length, sub_size, total_size):
-    """Helper function for generate_treemap and rect_dict. Used to updata the
+    """Helper function for _slice_rect. Used to updata the
     coordinate, length and the total_size.
 
     Length is greater or equal to new_length, and total_size is greater or
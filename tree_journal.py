@@ -0,0 +1,189 @@
+"""Assignment 2: Undoing Changes
+
+=== Module Description ===
+This module contains TreeJournal, which makes the changes the user makes to
+a tree in the visualiser, and keeps a record of them so that they can be
+undone and redone.
+
+Deleting a leaf does not take it out of its folder straight away: it is
+left in place as an empty tree, with no name and no parent. So the journal
+keeps the leaf itself, its folder, its name and its size to put it back.
+In case the folder is compacted in the meantime, which takes deleted leaves
+out, it also keeps the number of leaves before it in its folder which had
+not been deleted, so that it can be put back after the same one. Changing a
+leaf's size is undone by changing it back. Either way, undoing or redoing a
+change only updates the data_size of the leaf's ancestors, so it costs time
+proportional to the depth of the tree.
+
+The journal only keeps the last few changes, up to a limit, so that a long
+session does not keep every deleted leaf forever.
+"""
+import collections
+
+
+# The number of changes a TreeJournal can undo, unless it is given another
+# limit.
+HISTORY_LIMIT = 1000
+
+
+class TreeJournal:
+    """Makes changes to the leaves of a tree, and undoes and redoes them.
+
+    Each change is stored as a tuple of the name of the change, the leaf it
+    was made to, and what is needed to undo it:
+      - ('delete', leaf, (parent, name, data_size, rank)), where rank is
+        the number of subtrees of parent before leaf which had not been
+        deleted, or
+      - ('alt_size', leaf, change), where change is what was added to the
+        leaf's data_size.
+
+    === Private Attributes ===
+    @type _done: collections.deque[(str, AbstractTree | ArrayNode, object)]
+        The changes which can be undone, oldest first.
+    @type _undone: list[(str, AbstractTree | ArrayNode, object)]
+        The changes which can be redone, last undone last.
+    """
+    def __init__(self, limit=HISTORY_LIMIT):
+        """Initialize a journal which can undo up to <limit> changes.
+
+        @type self: TreeJournal
+        @type limit: int
+        @rtype: None
+        """
+        self._done = collections.deque(maxlen=limit)
+        self._undone = list()
+
+    def can_undo(self):
+        """Return True if there is a change to undo.
+
+        @type self: TreeJournal
+        @rtype: bool
+        """
+        return bool(self._done)
+
+    def can_redo(self):
+        """Return True if there is an undone change to redo.
+
+        @type self: TreeJournal
+        @rtype: bool
+        """
+        return bool(self._undone)
+
+    def clear(self):
+        """Forget every change, e.g. because the tree has been changed by
+        something else.
+
+        @type self: TreeJournal
+        @rtype: None
+        """
+        self._done.clear()
+        self._undone = list()
+
+    def del_leaf(self, leaf):
+        """Delete <leaf>, as leaf.del_leaf() does, and record it.
+
+        Precondition: <leaf> is a leaf which is not empty.
+
+        @type self: TreeJournal
+        @type leaf: AbstractTree | ArrayNode
+        @rtype: None
+        """
+        parent = leaf._parent_tree
+        change = ('delete', leaf, (parent, leaf._root, leaf.data_size,
+                                   _rank(leaf, parent)))
+        leaf.del_leaf()
+        self._add(change)
+
+    def alt_size(self, leaf, positive=True):
+        """Change the data_size of <leaf> by one percent, as
+        leaf.alt_size(positive=positive) does, and record it.
+
+        Precondition: <leaf> is a leaf which is not empty.
+
+        @type self: TreeJournal
+        @type leaf: AbstractTree | ArrayNode
+        @type positive: bool
+        @rtype: None
+        """
+        old_size = leaf.data_size
+        leaf.alt_size(positive=positive)
+        if leaf.data_size != old_size:
+            self._add(('alt_size', leaf, leaf.data_size - old_size))
+
+    def undo(self):
+        """Undo the last change which has not been undone, and return the
+        leaf it was made to, or None if there is nothing to undo.
+
+        @type self: TreeJournal
+        @rtype: AbstractTree | ArrayNode | None
+
+        >>> from tree_data import AbstractTree
+        >>> f1 = AbstractTree('f1', [], 15)
+        >>> A = AbstractTree('A', [f1, AbstractTree('f2', [], 5)])
+        >>> journal = TreeJournal()
+        >>> journal.del_leaf(f1)
+        >>> A.data_size
+        5
+        >>> journal.undo() is f1
+        True
+        >>> A.data_size, f1._root, f1._parent_tree is A
+        (20, 'f1', True)
+        """
+        if not self._done:
+            return None
+        change = self._done.pop()
+        kind, leaf, argument = change
+        if kind == 'delete':
+            leaf._undelete(*argument)
+        else:
+            leaf._adjust_size(-argument)
+        self._undone.append(change)
+        return leaf
+
+    def redo(self):
+        """Make the last undone change again, and return the leaf it was
+        made to, or None if there is nothing to redo.
+
+        @type self: TreeJournal
+        @rtype: AbstractTree | ArrayNode | None
+        """
+        if not self._undone:
+            return None
+        change = self._undone.pop()
+        kind, leaf, argument = change
+        if kind == 'delete':
+            leaf.del_leaf()
+        else:
+            leaf._adjust_size(argument)
+        self._done.append(change)
+        return leaf
+
+    def _add(self, change):
+        """Add <change>, which has just been made, to this journal.
+
+        A new change means the undone changes can no longer be redone.
+
+        @type self: TreeJournal
+        @type change: (str, AbstractTree | ArrayNode, object)
+        @rtype: None
+        """
+        self._done.append(change)
+        self._undone = list()
+
+
+def _rank(leaf, parent):
+    """Return the number of subtrees of <parent> before <leaf> which have not
+    been deleted, or 0 if <parent> is None.
+
+    @type leaf: AbstractTree | ArrayNode
+    @type parent: AbstractTree | ArrayNode | None
+    @rtype: int
+    """
+    rank = 0
+    if parent is not None:
+        for subtree in parent._subtrees:
+            if subtree == leaf:
+                break
+            if not subtree.is_empty():
+                rank += 1
+    return rank
@@ -0,0 +1,613 @@
+"""Assignment 2: Treemap Layouts
+
+=== Module Description ===
+This module contains TreeLayout, the result of running the treemap
+algorithm on a tree once: the rectangle of every leaf which is shown.
+
+The visualiser needs the rectangles twice after every change to the tree:
+to draw them, with their colours, and to find the leaf the user clicks on.
+Running the algorithm once for each means laying out the whole tree twice.
+Instead, the tree is laid out once into a TreeLayout, and both drawing and
+selecting are done from it. AbstractTree.generate_treemap and rect_dict are
+now just views of a layout.
+
+Finding the leaf under a point by checking every rectangle takes time
+proportional to the number of leaves, which is far too slow for a tree of
+millions of files. Instead, a layout finds it by going down from the root
+through the rectangles of the folders which contain the point, which it
+keeps anyway to be brought up to date. The first time a folder is looked
+in, its subtrees are put in an index of squares of its rectangle, so that
+the one containing the point is found among the few in one square,
+however many subtrees the folder has. A lookup then takes time
+proportional to the depth of the leaf. The index of a folder is kept when
+the layout is brought up to date, unless the folder has changed.
+
+Layouts which do not keep the folders' rectangles, such as those of an
+ArrayTree, instead label each pixel of their rectangle with the leaf drawn
+there the first time they are asked for a leaf, in a NumPy array, so that
+finding the leaf under any point after that is one lookup. If NumPy is not
+installed, they check every rectangle.
+
+A layout can also stop slicing at folders which are too small to be worth
+it, and show each of them as one block, which can be selected like a leaf,
+and it can be squarified rather than sliced.
+
+A layout is not changed when its tree is. Once a leaf is deleted or
+resized, the layout can be brought up to date with AbstractTree.relayout,
+which only slices again the rectangles which have changed size, or the tree
+has to be laid out again. The colours are not part of the layout, but
+looked up when it is drawn, so changing the colour policy does not need a
+new layout.
+
+LayoutCache keeps the layouts of the folders the user has zoomed into, so
+that going back to one of them does not lay it out again. It keeps the
+layouts it was most recently asked for, up to a budget of rectangles, and
+forgets those of the folders a change has been made in.
+"""
+import collections
+import itertools
+
+
+# The most rectangles a LayoutCache keeps in all its layouts together,
+# unless it is given another budget. Each takes about 120 bytes, counting
+# its tuple and its place in the layout's lists, so this is about 250 MB,
+# enough for the whole of a tree of a million files and a few of its
+# folders. Labelled pixels take 4 bytes each, so every 30 of them are
+# counted as one rectangle.
+CACHE_BUDGET = 2000000
+PIXELS_PER_RECT = 30
+
+# The side, in pixels, of the squares the rectangle of a folder is divided
+# into to find its subtrees. No more than this many squared rectangles can
+# be in one square, and each square is a list of its own.
+BUCKET_SIZE = 16
+
+
+class TreeLayout:
+    """The rectangles of the leaves of a tree, laid out in a rectangle.
+
+    === Public Attributes ===
+    @type rect: (int, int, int, int)
+        The pygame rectangle the tree was laid out in.
+    @type min_area: int
+        The least area, in pixels, of a folder which is sliced among its
+        subtrees. Smaller folders are in the layout as blocks, in place of
+        their leaves.
+    @type squarified: bool
+        Whether the folders were laid out by the squarified algorithm.
+    @type expanded: bool
+        Whether any lazy folder may have been expanded when the layout was
+        made or last brought up to date, which changes the tree, so that the
+        layouts of its other folders may be out of date.
+
+    === Private Attributes ===
+    @type _leaves: list[AbstractTree | ArrayNode]
+        The non-empty leaves and blocks of the tree, in the order they are
+        drawn.
+    @type _rects: list[(int, int, int, int)]
+        The pygame rectangle of each leaf in _leaves.
+    @type _rect_dict: dict[(int, int, int, int), AbstractTree | ArrayNode] |
+                      None
+        The leaf of each rectangle, or None if it has not been asked for.
+    @type _labels: numpy.ndarray | None
+        The index in _leaves of the leaf drawn at each pixel of rect, by row
+        and then column, or -1 where nothing is drawn. None if no leaf has
+        been looked up since the layout was made or brought up to date, or
+        if _spans is not None, as then the pixels are never labelled.
+    @type _spans: dict[AbstractTree, (int, int, int, int, int)] | None
+        For each folder which is shown, where its rectangle is relative to
+        its parent's, its width and height, and the number of its leaves in
+        _leaves, which come one after the other. None if the layout cannot
+        be brought up to date, but only made again.
+    @type _indexes: dict[AbstractTree, (int, int, int, list[list[tuple]])]
+        The index of each folder in _spans which has been looked in for a
+        leaf, as returned by _index_folder.
+    """
+    def __init__(self, rect, leaves, rects, spans=None, min_area=0,
+                 squarified=False):
+        """Initialize the layout of a tree in <rect>, whose leaves are
+        <leaves>, in the order they are drawn, and their rectangles are
+        <rects>, with folders smaller than <min_area> as blocks, laid out by
+        the squarified algorithm if <squarified> is True.
+
+        @type self: TreeLayout
+        @type rect: (int, int, int, int)
+        @type leaves: list[AbstractTree | ArrayNode]
+        @type rects: list[(int, int, int, int)]
+        @type spans: dict[AbstractTree, (int, int, int, int, int)] | None
+        @type min_area: int
+        @type squarified: bool
+        @rtype: None
+        """
+        self.rect = rect
+        self.min_area = min_area
+        self.squarified = squarified
+        self.expanded = False
+        self._reset(leaves, rects, spans)
+
+    def __len__(self):
+        """Return the number of leaves and blocks in this layout.
+
+        @type self: TreeLayout
+        @rtype: int
+        """
+        return len(self._leaves)
+
+    def __iter__(self):
+        """Return an iterator over the leaves and blocks of this layout, in
+        the order they are drawn, each together with its rectangle.
+
+        @type self: TreeLayout
+        @rtype: iterator[(AbstractTree | ArrayNode, (int, int, int, int))]
+        """
+        return zip(self._leaves, self._rects)
+
+    def treemap(self):
+        """Return the rectangle and colour of each leaf, in the order they
+        are drawn, as AbstractTree.generate_treemap does.
+
+        @type self: TreeLayout
+        @rtype: list[((int, int, int, int), (int, int, int))]
+        """
+        return [(leaf_rect, leaf.colour)
+                for leaf, leaf_rect in zip(self._leaves, self._rects)]
+
+    def rect_dict(self):
+        """Return a dictionary mapping each rectangle to its leaf, as
+        AbstractTree.rect_dict does.
+
+        The dictionary is only built once, and must not be changed.
+
+        @type self: TreeLayout
+        @rtype: dict[(int, int, int, int), AbstractTree | ArrayNode]
+        """
+        if self._rect_dict is None:
+            self._rect_dict = dict(zip(self._rects, self._leaves))
+        return self._rect_dict
+
+    def leaf_at(self, pos):
+        """Return the leaf drawn at the pixel <pos>, or None if there is
+        none, e.g. because nothing is shown or <pos> is in the text box.
+
+        As pygame draws a rectangle (x, y, width, height), it covers the
+        pixels from x up to but not including x + width, and likewise from
+        y, so every pixel is in at most one rectangle. Rectangles with no
+        area are not drawn, and are never found.
+
+        @type self: TreeLayout
+        @type pos: (int, int)
+        @rtype: AbstractTree | ArrayNode | None
+
+        >>> from tree_data import AbstractTree
+        >>> f1 = AbstractTree('f1', [], 15)
+        >>> f2 = AbstractTree('f2', [], 5)
+        >>> layout = AbstractTree('A', [f1, f2]).layout((0, 0, 800, 1000))
+        >>> layout.leaf_at((10, 900)) is f2, layout.leaf_at((10, 2000))
+        (True, None)
+        """
+        if self._spans is not None:
+            return self._find_leaf(pos)
+        if self._labels is None:
+            self._labels = self._label_pixels()
+        if self._labels is None:
+            return self._scan_for_leaf(pos)
+        row = pos[1] - self.rect[1]
+        column = pos[0] - self.rect[0]
+        if (0 <= row < self._labels.shape[0] and
+                0 <= column < self._labels.shape[1]):
+            index = self._labels[row, column]
+            if index >= 0:
+                return self._leaves[index]
+        return None
+
+    def cost(self):
+        """Return how many rectangles this layout counts as in the budget of
+        a LayoutCache, including the pixels it labels to find leaves, even
+        if it has not labelled them yet.
+
+        @type self: TreeLayout
+        @rtype: int
+        """
+        if self._spans is not None:
+            return len(self._leaves)
+        width, height = self.rect[2:]
+        return (len(self._leaves) +
+                max(width, 0) * max(height, 0) // PIXELS_PER_RECT)
+
+    def _find_leaf(self, pos):
+        """Return the leaf drawn at the pixel <pos>, or None, as leaf_at
+        does, by going down through the rectangles of the folders in
+        _spans which contain <pos>.
+
+        The subtree of each folder which contains <pos> is found in the
+        folder's index, which is made the first time it is needed. If the
+        tree has changed so that it no longer matches the layout, every
+        rectangle is checked instead.
+
+        @type self: TreeLayout
+        @type pos: (int, int)
+        @rtype: AbstractTree | None
+        """
+        leaves, rects, spans = self._leaves, self._rects, self._spans
+        if not leaves:
+            return None
+        # The root is the highest ancestor of any leaf which has a span.
+        node = leaves[0]
+        while node._parent_tree is not None and node._parent_tree in spans:
+            node = node._parent_tree
+        if node is leaves[0]:
+            # The tree is shown as one leaf or block.
+            return node if _contains(rects[0], pos) else None
+        left, top, _, _, end = spans[node]
+        if end != len(leaves):
+            return self._scan_for_leaf(pos)
+        left += self.rect[0]
+        top += self.rect[1]
+        start = 0
+        while True:
+            width, height = spans[node][2:4]
+            index = self._indexes.get(node)
+            if index is None or index[:2] != (width, height):
+                index = self._index_folder(node, start, end, left, top)
+                if index is None:
+                    return self._scan_for_leaf(pos)
+                self._indexes[node] = index
+            x = pos[0] - left
+            y = pos[1] - top
+            if not (0 <= x < width and 0 <= y < height):
+                return None
+            for sub_x, sub_y, sub_width, sub_height, offset, subtree, count \
+                    in index[3][y // BUCKET_SIZE * index[2] +
+                                x // BUCKET_SIZE]:
+                if (sub_x <= x < sub_x + sub_width and
+                        sub_y <= y < sub_y + sub_height):
+                    break
+            else:
+                return None
+            if subtree is leaves[start + offset]:
+                return subtree
+            # Look among the leaves of <subtree> only.
+            node = subtree
+            start += offset
+            end = start + count
+            left += sub_x
+            top += sub_y
+
+    def _index_folder(self, node, start, end, left, top):
+        """Return the index of the folder <node>, whose leaves are those of
+        _leaves from <start> up to <end>, and whose rectangle has its corner
+        at (<left>, <top>), or None if the tree no longer matches the
+        layout.
+
+        The index is the width and height of the folder's rectangle, the
+        number of buckets in each row of it, and the buckets, row by row.
+        Each bucket is a square of BUCKET_SIZE pixels of the folder's
+        rectangle, and holds every subtree of the folder whose rectangle
+        covers any of its pixels, as its rectangle, relative to the corner
+        of the folder's, the index of its first leaf, relative to <start>,
+        the subtree itself, and its number of leaves. The rectangles do not
+        overlap, so a bucket holds at most BUCKET_SIZE ** 2 of them, and
+        finding the one which contains a pixel takes no longer than that,
+        however many subtrees the folder has.
+
+        The subtrees are found from the leaves, in the order they are drawn,
+        by going up from the first leaf of each to the folder, and the
+        subtrees which are shown as folders are skipped over all at once.
+
+        Everything in the index is relative to the folder, and depends only
+        on the size of its rectangle and of its subtrees, so the index can
+        still be used once the layout is brought up to date, unless the
+        folder has changed size or its subtrees have changed.
+
+        @type self: TreeLayout
+        @type node: AbstractTree
+        @type start: int
+        @type end: int
+        @type left: int
+        @type top: int
+        @rtype: (int, int, int, list[list[tuple]]) | None
+        """
+        leaves, rects, spans = self._leaves, self._rects, self._spans
+        width, height = spans[node][2:4]
+        columns = width // BUCKET_SIZE + 1
+        rows = height // BUCKET_SIZE + 1
+        buckets = [[] for _ in range(columns * rows)]
+        index = start
+        while index < end:
+            leaf = leaves[index]
+            subtree = leaf
+            while subtree is not None and subtree._parent_tree is not node:
+                subtree = subtree._parent_tree
+            if subtree is None:
+                return None
+            if subtree is leaf:
+                x, y, sub_width, sub_height = rects[index]
+                x -= left
+                y -= top
+                count = 1
+            else:
+                span = spans.get(subtree)
+                if span is None or not span[4]:
+                    return None
+                x, y, sub_width, sub_height, count = span
+            # Rectangles with no area are never found.
+            if sub_width > 0 and sub_height > 0:
+                entry = (x, y, sub_width, sub_height, index - start, subtree,
+                         count)
+                first_column = max(x // BUCKET_SIZE, 0)
+                last_column = min((x + sub_width - 1) // BUCKET_SIZE,
+                                  columns - 1)
+                for row in range(max(y // BUCKET_SIZE, 0),
+                                 min((y + sub_height - 1) // BUCKET_SIZE,
+                                     rows - 1) + 1):
+                    for column in range(first_column, last_column + 1):
+                        buckets[row * columns + column].append(entry)
+            index += count
+        return width, height, columns, buckets
+
+    def _scan_for_leaf(self, pos):
+        """Return the leaf drawn at the pixel <pos>, or None, as leaf_at
+        does, by checking every rectangle.
+
+        @type self: TreeLayout
+        @type pos: (int, int)
+        @rtype: AbstractTree | ArrayNode | None
+        """
+        for leaf, leaf_rect in zip(self._leaves, self._rects):
+            if _contains(leaf_rect, pos):
+                return leaf
+        return None
+
+    def _label_pixels(self):
+        """Return an array of the index in _leaves of the leaf drawn at each
+        pixel of rect, as kept in _labels, or None if NumPy is not
+        installed.
+
+        @type self: TreeLayout
+        @rtype: numpy.ndarray | None
+        """
+        try:
+            import numpy
+        except ImportError:
+            return None
+        left, top, width, height = self.rect
+        # Reading the rectangles one number at a time is much faster than
+        # making an array of tuples.
+        rects = numpy.fromiter(itertools.chain.from_iterable(self._rects),
+                               dtype=numpy.int64,
+                               count=4 * len(self._rects)).reshape(-1, 4)
+        # Only the leaves which can be seen have any pixels.
+        index = numpy.flatnonzero(rects[:, 2] * rects[:, 3])
+        x, y, w, h = rects[index].T
+        x = x - left
+        y = y - top
+        # The rectangles do not overlap, so each pixel can be labelled with
+        # one more than its leaf's index by adding it at the top left corner
+        # of the leaf's rectangle, taking it away just past each of the other
+        # corners, and then summing along each row and down each column.
+        # Pixels outside every rectangle are left at 0.
+        sums = numpy.zeros((max(height, 0) + 1, max(width, 0) + 1),
+                           dtype=numpy.int64)
+        numpy.add.at(sums, (y, x), index + 1)
+        numpy.add.at(sums, (y, x + w), -index - 1)
+        numpy.add.at(sums, (y + h, x), -index - 1)
+        numpy.add.at(sums, (y + h, x + w), index + 1)
+        labels = sums.cumsum(axis=0).cumsum(axis=1)[:-1, :-1] - 1
+        return labels.astype(numpy.int32)
+
+    def _reset(self, leaves, rects, spans, changed=None):
+        """Replace the leaves, rectangles and spans of this layout, because
+        the tree has been laid out again, and forget the indexes of the
+        folders in <changed>, whose subtrees have changed size, or of every
+        folder if <changed> is None.
+
+        @type self: TreeLayout
+        @type leaves: list[AbstractTree | ArrayNode]
+        @type rects: list[(int, int, int, int)]
+        @type spans: dict[AbstractTree, (int, int, int, int, int)] | None
+        @type changed: list[AbstractTree] | None
+        @rtype: None
+        """
+        self._leaves = leaves
+        self._rects = rects
+        self._spans = spans
+        self._rect_dict = None
+        self._labels = None
+        if changed is None:
+            self._indexes = dict()
+        else:
+            for node in changed:
+                self._indexes.pop(node, None)
+
+
+def _contains(rect, pos):
+    """Return whether pygame draws the pixel <pos> when it draws <rect>,
+    i.e. the pixels from x up to but not including x + width, and likewise
+    from y.
+
+    @type rect: (int, int, int, int)
+    @type pos: (int, int)
+    @rtype: bool
+    """
+    return (rect[0] <= pos[0] < rect[0] + rect[2] and
+            rect[1] <= pos[1] < rect[1] + rect[3])
+
+
+class LayoutCache:
+    """The layouts of some folders of a tree, most recently used last.
+
+    A layout is kept for each folder, rectangle, min_area and algorithm it
+    has been asked for, until the rectangles of all the layouts kept, with
+    the pixels they label, would be more than the budget, and the least
+    recently used ones are dropped, or until the folder is changed.
+
+    === Private Attributes ===
+    @type _layouts: collections.OrderedDict[
+            (AbstractTree | ArrayNode, (int, int, int, int), int, bool),
+            TreeLayout]
+        The layouts kept, by their folder, rectangle, min_area and whether
+        they are squarified, least recently used first.
+    @type _budget: int
+        The most rectangles kept in _layouts.
+    @type _size: int
+        The number of rectangles in _layouts, counted by TreeLayout.cost, as
+        of when each was kept.
+    """
+    def __init__(self, budget=CACHE_BUDGET):
+        """Initialize an empty cache which keeps at most <budget>
+        rectangles.
+
+        @type self: LayoutCache
+        @type budget: int
+        @rtype: None
+        """
+        self._layouts = collections.OrderedDict()
+        self._budget = budget
+        self._size = 0
+
+    def __len__(self):
+        """Return the number of layouts kept.
+
+        @type self: LayoutCache
+        @rtype: int
+        """
+        return len(self._layouts)
+
+    def layout(self, node, rect, min_area=0, squarified=False):
+        """Return the layout of <node> in <rect>, as node.layout(rect,
+        min_area, squarified) does, laying it out only if it is not kept
+        already.
+
+        If laying <node> out expands any lazy folder, the data_size of its
+        ancestors and the subtrees of the folder change, so every other
+        layout kept is forgotten.
+
+        A layout from the cache must only be brought up to date with
+        LayoutCache.relayout, so that the cache knows it has changed.
+
+        @type self: LayoutCache
+        @type node: AbstractTree | ArrayNode
+        @type rect: (int, int, int, int)
+        @type min_area: int
+        @type squarified: bool
+        @rtype: TreeLayout
+
+        >>> from tree_data import AbstractTree
+        >>> A = AbstractTree('A', [AbstractTree('f1', [], 15)])
+        >>> cache = LayoutCache()
+        >>> layout = cache.layout(A, (0, 0, 800, 1000))
+        >>> cache.layout(A, (0, 0, 800, 1000)) is layout
+        True
+        >>> cache.layout(A, (0, 0, 800, 1000), 100) is layout
+        False
+        """
+        key = (node, rect, min_area, squarified)
+        layout = self._layouts.get(key)
+        if layout is None:
+            layout = node.layout(rect, min_area, squarified)
+            if layout.expanded:
+                self.clear()
+            self.add(node, layout)
+        else:
+            self._layouts.move_to_end(key)
+        return layout
+
+    def add(self, node, layout):
+        """Keep <layout>, which is an up to date layout of <node>, dropping
+        the least recently used layouts to stay within the budget.
+
+        A layout which costs more than the whole budget is not kept.
+
+        @type self: LayoutCache
+        @type node: AbstractTree | ArrayNode
+        @type layout: TreeLayout
+        @rtype: None
+        """
+        key = (node, layout.rect, layout.min_area, layout.squarified)
+        self._forget(key)
+        cost = layout.cost()
+        if cost > self._budget:
+            return
+        while self._size + cost > self._budget:
+            self._size -= self._layouts.popitem(last=False)[1].cost()
+        self._layouts[key] = layout
+        self._size += cost
+
+    def relayout(self, layout, root, node):
+        """Bring <layout>, a layout of <root> from this cache, up to date
+        after the data_size of <node> has changed, as root.relayout does,
+        and forget the layouts of <node> and its ancestors, which are out
+        of date.
+
+        The layouts of the other folders have not changed. If <root> is not
+        one of the ancestors of <node>, neither has <layout>. If <node> is
+        not in the tree, e.g. because it is a leaf which has been deleted
+        again, there is no telling which folders it has been taken out of,
+        so every layout is forgotten.
+
+        @type self: LayoutCache
+        @type layout: TreeLayout
+        @type root: AbstractTree | ArrayNode
+        @type node: AbstractTree | ArrayNode | None
+        @rtype: None
+
+        >>> from tree_data import AbstractTree
+        >>> f1 = AbstractTree('f1', [], 15)
+        >>> B = AbstractTree('B', [AbstractTree('f2', [], 5)])
+        >>> A = AbstractTree('A', [f1, B])
+        >>> cache = LayoutCache()
+        >>> layout = cache.layout(A, (0, 0, 800, 1000))
+        >>> B_layout = cache.layout(B, (0, 0, 800, 1000))
+        >>> f1.alt_size(positive=False)
+        >>> cache.relayout(layout, A, f1)
+        >>> list(layout) == list(A.layout((0, 0, 800, 1000)))
+        True
+        >>> cache.layout(A, (0, 0, 800, 1000)) is layout
+        True
+        >>> cache.layout(B, (0, 0, 800, 1000)) is B_layout
+        True
+        """
+        # The changed node and its ancestors, up to the root of its tree.
+        chain = list()
+        while node is not None:
+            chain.append(node)
+            node = node._parent_tree
+        if not chain or chain[-1].is_empty():
+            # Deleted leaves have no parent, so <node> may have been in any
+            # folder.
+            self.clear()
+        else:
+            for key in list(self._layouts):
+                if key[0] in chain:
+                    self._forget(key)
+            if root not in chain:
+                # Nothing in <root> has changed.
+                self.add(root, layout)
+                return
+        self._forget((root, layout.rect, layout.min_area, layout.squarified))
+        root.relayout(layout, chain[0] if chain else None)
+        if layout.expanded:
+            self.clear()
+        self.add(root, layout)
+
+    def clear(self):
+        """Forget every layout, e.g. because the tree has been changed in
+        ways which are not known.
+
+        @type self: LayoutCache
+        @rtype: None
+        """
+        self._layouts.clear()
+        self._size = 0
+
+    def _forget(self, key):
+        """Forget the layout kept under <key>, if there is one.
+
+        @type self: LayoutCache
+        @type key: (AbstractTree | ArrayNode, (int, int, int, int), int,
+                    bool)
+        @rtype: None
+        """
+        layout = self._layouts.pop(key, None)
+        if layout is not None:
+            self._size -= layout.cost()
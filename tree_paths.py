@@ -0,0 +1,130 @@
+"""Assignment 2: Tree Paths
+
+=== Module Description ===
+This module contains PathTable, which works out the paths of nodes in a
+tree: the names from the root of the tree down to a node, with a separator
+between them, as shown by the visualiser for the selected leaf.
+
+Building a path from scratch means walking up to the root and joining every
+name on the way, every time a leaf is selected or changed. But the leaves
+of the same folder share everything in their paths apart from their own
+names. So a PathTable remembers the path of each folder whose contents have
+been asked about, and the path of a leaf in a known folder only costs one
+lookup and one join.
+
+The table only goes out of date when a node is moved or renamed, which the
+trees do by removing it from its folder first, so AbstractTree clears the
+table whenever a subtree is removed. Adding subtrees does not change the
+path of anything already in the tree.
+
+For the paths of a whole tree at once, e.g. to export them, PathTable.paths
+builds each path from its folder's as the tree is walked, and only uses the
+table for the path of the node it starts from.
+"""
+import collections
+
+from tree_colour import remember
+
+
+# The most folder paths kept in a PathTable.
+CACHE_SIZE = 2 ** 16
+
+
+class PathTable:
+    """The paths of the folders of trees, by folder.
+
+    === Private Attributes ===
+    @type _separator: str
+        The string put between names.
+    @type _prefixes: collections.OrderedDict[AbstractTree | ArrayNode, str]
+        The paths of the folders whose contents have been asked about,
+        oldest first.
+    @type _size: int
+        The most paths kept in _prefixes.
+    """
+    def __init__(self, separator, size=CACHE_SIZE):
+        """Initialize an empty table of paths with <separator> between their
+        names, which remembers at most <size> of them.
+
+        @type self: PathTable
+        @type separator: str
+        @type size: int
+        @rtype: None
+        """
+        self._separator = separator
+        self._prefixes = collections.OrderedDict()
+        self._size = size
+
+    def path(self, tree):
+        """Return the path of <tree>.
+
+        @type self: PathTable
+        @type tree: AbstractTree | ArrayNode
+        @rtype: str
+
+        >>> from tree_data import AbstractTree
+        >>> f1 = AbstractTree('f1', [], 15)
+        >>> A = AbstractTree('A', [AbstractTree('B', [f1])])
+        >>> PathTable('/').path(f1)
+        'A/B/f1'
+        """
+        parent = tree._parent_tree
+        if parent is None:
+            return str(tree._root)
+        prefix = self._prefixes.get(parent)
+        if prefix is None:
+            # Collect the names up to the nearest folder whose path is
+            # known, or the root. Only the parent's path is remembered, so
+            # that a deep tree does not fill the table with long paths which
+            # are never asked about again.
+            names = list()
+            node = parent
+            while node is not None:
+                known = self._prefixes.get(node)
+                if known is not None:
+                    names.append(known)
+                    break
+                names.append(str(node._root))
+                node = node._parent_tree
+            names.reverse()
+            prefix = self._separator.join(names)
+            remember(self._prefixes, parent, prefix, self._size)
+        return prefix + self._separator + str(tree._root)
+
+    def paths(self, tree):
+        """Return an iterator over every node in <tree> which is not empty,
+        in preorder, together with its path.
+
+        Each path is built from its folder's, so this costs no more than
+        the total length of the paths, however deep <tree> is. Only the
+        path of <tree> itself is found with path, which may remember the
+        path of its parent; the paths of the other nodes are not put in the
+        table.
+
+        @type self: PathTable
+        @type tree: AbstractTree | ArrayNode
+        @rtype: iterator[(AbstractTree | ArrayNode, str)]
+
+        >>> from tree_data import AbstractTree
+        >>> A = AbstractTree('A', [AbstractTree('B', [AbstractTree('f1', [],
+        ...                                                         15)]),
+        ...                        AbstractTree('f2', [], 5)])
+        >>> [path for _, path in PathTable('/').paths(A)]
+        ['A', 'A/B', 'A/B/f1', 'A/f2']
+        """
+        stack = [(tree, self.path(tree))]
+        while stack:
+            node, path = stack.pop()
+            if node.is_empty():
+                continue
+            yield node, path
+            stack.extend((subtree, path + self._separator + str(subtree._root))
+                         for subtree in reversed(node._subtrees))
+
+    def clear(self):
+        """Forget every path, because nodes may have been moved or renamed.
+
+        @type self: PathTable
+        @rtype: None
+        """
+        self._prefixes.clear()
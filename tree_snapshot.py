@@ -0,0 +1,279 @@
+"""Assignment 2: Tree Snapshots
+
+=== Module Description ===
+This module saves a FileSystemTree to a compact binary snapshot file, and
+loads it back, so that the visualiser does not need to scan the file system
+again on every launch.
+
+A snapshot stores the compact form returned by file_scanner.flatten_tree:
+one entry per node, in preorder. It is laid out as follows, where every
+section starts on a multiple of 8 bytes:
+  - a header: the bytes b'TMAP', the format version, whether the arrays are
+    little-endian, the number of nodes n and the length of the names table,
+  - the offsets of each node's name in the names table (n + 1 int64s, so that
+    the name of node i is between offsets i and i + 1),
+  - the index of each node's parent, or -1 for the root (n int32s),
+  - the data_size of each leaf, or 0 for a node with subtrees (n int64s),
+  - the stamp of each folder, as returned by file_scanner.folder_stamp, or -1
+    for files and folders without a stamp (two arrays of n int64s: the
+    modification times and the status change times), and
+  - the names table: every name, encoded in UTF-8, one after the other.
+
+Version 1 snapshots, which have no stamps, can still be loaded.
+
+Snapshots are opened with memory mapping, so reading part of a snapshot only
+ever reads that part of the file from the disk.
+"""
+import mmap
+import struct
+import sys
+from array import array
+
+from file_scanner import iter_preorder, build_flat_tree
+
+
+# The header: magic bytes, version, little-endian flag, two bytes of padding,
+# the number of nodes and the length of the names table.
+_HEADER = struct.Struct('<4sBBxxqq')
+_MAGIC = b'TMAP'
+_VERSION = 2
+
+
+class Snapshot:
+    """An open snapshot file.
+
+    The arrays are memoryviews straight onto the memory-mapped file, so
+    nothing is read from the disk until it is used.
+
+    === Public Attributes ===
+    @type parents: memoryview
+        The index of each node's parent, or -1 for the root.
+    @type sizes: memoryview
+        The data_size of each leaf, or 0 for a node with subtrees.
+    @type mtimes: memoryview | None
+        The modification time in each folder's stamp, or -1 for nodes without
+        a stamp. None if the snapshot has no stamps.
+    @type ctimes: memoryview | None
+        The status change time in each folder's stamp, or -1 for nodes without
+        a stamp. None if the snapshot has no stamps.
+
+    === Private Attributes ===
+    @type _file: file
+        The open snapshot file.
+    @type _map: mmap.mmap
+        The memory map of the snapshot file.
+    @type _offsets: memoryview
+        The offsets of each node's name in _names.
+    @type _names: memoryview
+        The names table.
+
+    === Representation Invariants ===
+    - len(parents) == len(sizes) == len(_offsets) - 1
+    - The nodes are in preorder, so parents[i] < i for every node but the
+      root, which is node 0.
+    """
+    def __init__(self, filename):
+        """Open the snapshot file <filename>.
+
+        Raise ValueError if <filename> is not a snapshot this module can
+        read.
+
+        @type self: Snapshot
+        @type filename: str
+        @rtype: None
+        """
+        self._file = open(filename, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+        except ValueError:
+            # An empty file cannot be mapped.
+            self._file.close()
+            raise ValueError(filename + ' is not a tree snapshot')
+        try:
+            self._open_sections(filename)
+        except ValueError:
+            self._map.close()
+            self._file.close()
+            raise
+
+    def _open_sections(self, filename):
+        """Read the header of the snapshot, and set up the arrays on top of
+        the memory map.
+
+        @type self: Snapshot
+        @type filename: str
+        @rtype: None
+        """
+        if len(self._map) < _HEADER.size:
+            raise ValueError(filename + ' is not a tree snapshot')
+        magic, version, little_endian, count, names_length = \
+            _HEADER.unpack_from(self._map)
+        if magic != _MAGIC or version not in (1, _VERSION):
+            raise ValueError(filename + ' is not a tree snapshot')
+        if bool(little_endian) != (sys.byteorder == 'little'):
+            raise ValueError(filename + ' was saved on a machine with a '
+                             'different byte order')
+
+        # Work out where every section is, and check they all fit in the file
+        # before making any views onto it.
+        sections = [('q', count + 1), ('i', count), ('q', count)]
+        if version >= 2:
+            sections.extend([('q', count), ('q', count)])
+        sections.append(('B', names_length))
+        layout = list()
+        position = _HEADER.size
+        for typecode, length in sections:
+            end = position + length * struct.calcsize(typecode)
+            layout.append((typecode, position, end))
+            position = _align(end)
+        if end > len(self._map):
+            raise ValueError(filename + ' is truncated')
+
+        view = memoryview(self._map)
+        arrays = [view[start:end].cast(typecode)
+                  for typecode, start, end in layout]
+        view.release()
+        self._offsets, self.parents, self.sizes = arrays[:3]
+        self._names = arrays[-1]
+        if version >= 2:
+            self.mtimes, self.ctimes = arrays[3:5]
+        else:
+            self.mtimes = self.ctimes = None
+
+    def __len__(self):
+        """Return the number of nodes in this snapshot.
+
+        @type self: Snapshot
+        @rtype: int
+        """
+        return len(self.sizes)
+
+    def name(self, index):
+        """Return the name of node <index>.
+
+        @type self: Snapshot
+        @type index: int
+        @rtype: str
+        """
+        return str(self._names[self._offsets[index]:self._offsets[index + 1]],
+                   'utf-8', 'surrogateescape')
+
+    def build_tree(self, stamps=None):
+        """Return the FileSystemTree stored in this snapshot.
+
+        If <stamps> is given, the stamps of its folders are recorded in it,
+        keyed by the folder's node, as for file_scanner.scan_file_system.
+
+        @type self: Snapshot
+        @type stamps: dict[FileSystemTree, (int, int)] | None
+        @rtype: FileSystemTree
+        """
+        names = [self.name(index) for index in range(len(self))]
+        tree = build_flat_tree(names, self.parents, self.sizes)
+        if stamps is not None and self.mtimes is not None:
+            # The built tree has no empty trees in it, so its preorder is the
+            # order of the nodes in this snapshot.
+            for index, (node, _) in enumerate(iter_preorder(tree)):
+                if self.mtimes[index] >= 0:
+                    stamps[node] = (self.mtimes[index], self.ctimes[index])
+        return tree
+
+    def close(self):
+        """Close this snapshot. Its arrays cannot be used afterwards.
+
+        @type self: Snapshot
+        @rtype: None
+        """
+        # The memoryviews onto the map must be released before it can be
+        # closed.
+        for section in [self._offsets, self.parents, self.sizes, self.mtimes,
+                        self.ctimes, self._names]:
+            if section is not None:
+                section.release()
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def save_snapshot(tree, filename, stamps=None):
+    """Save <tree> to the snapshot file <filename>.
+
+    If <stamps> is given, the stamps of the folders in <tree> are saved as
+    well, so that the tree can be brought up to date with
+    file_scanner.rescan_file_system after it is loaded.
+
+    Deleted leaves are not saved.
+
+    Precondition: <tree> is not empty.
+
+    @type tree: AbstractTree
+    @type filename: str
+    @type stamps: dict[AbstractTree, (int, int)] | None
+    @rtype: None
+    """
+    if stamps is None:
+        stamps = dict()
+    offsets = array('q', [0])
+    parents = array('i')
+    sizes = array('q')
+    mtimes = array('q')
+    ctimes = array('q')
+    encoded = list()
+    for node, parent in iter_preorder(tree):
+        encoded.append(node._root.encode('utf-8', 'surrogateescape'))
+        offsets.append(offsets[-1] + len(encoded[-1]))
+        parents.append(parent)
+        sizes.append(0 if node._subtrees else node.data_size)
+        mtime, ctime = stamps.get(node, (-1, -1))
+        mtimes.append(mtime)
+        ctimes.append(ctime)
+    with open(filename, 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, sys.byteorder == 'little',
+                             len(encoded), offsets[-1]))
+        for section in [offsets, parents, sizes, mtimes, ctimes]:
+            section.tofile(f)
+            _pad(f)
+        f.write(b''.join(encoded))
+
+
+def load_snapshot(filename, stamps=None):
+    """Return the FileSystemTree stored in the snapshot file <filename>.
+
+    If <stamps> is given, the stamps of its folders are recorded in it, keyed
+    by the folder's node, as for file_scanner.scan_file_system.
+
+    Raise ValueError if <filename> is not a snapshot this module can read.
+
+    @type filename: str
+    @type stamps: dict[FileSystemTree, (int, int)] | None
+    @rtype: FileSystemTree
+    """
+    with Snapshot(filename) as snapshot:
+        return snapshot.build_tree(stamps)
+
+
+def _align(position):
+    """Return the first multiple of 8 at or after <position>.
+
+    @type position: int
+    @rtype: int
+
+    >>> _align(24), _align(25), _align(31)
+    (24, 32, 32)
+    """
+    return (position + 7) // 8 * 8
+
+
+def _pad(f):
+    """Write zero bytes to <f> until its position is a multiple of 8.
+
+    @type f: file
+    @rtype: None
+    """
+    f.write(bytes(_align(f.tell()) - f.tell()))
@@ -0,0 +1,217 @@
+"""Assignment 2: Squarified Layout
+
+=== Module Description ===
+This module contains the squarified treemap algorithm, which the visualiser
+can use instead of slicing each folder's rectangle in one direction.
+
+Slicing a folder with many subtrees in one direction gives each of them a
+long, thin slice, most of them less than a pixel across. The squarified
+algorithm (Bruls, Huizing and van Wijk) lays the subtrees out in rows
+instead, largest first. Each row is laid along the shorter side of what is
+left of the rectangle, and subtrees are added to it for as long as that
+brings the rectangles in it closer to squares. The row then takes its
+share of the rectangle, and the next row is laid out in what is left.
+
+As in _slice_rect, every length is rounded down, and the last row, and the
+last subtree in each row, take whatever is left over, so the rectangles
+fill the folder's rectangle exactly. The subtrees are returned in the order
+they are in the folder, not the order they are laid out in, so that the
+leaves of a layout are in the same order either way.
+
+Sorting a folder's subtrees by size takes longer than slicing them, so the
+order is kept in the folder's _order once it has been worked out, until the
+data_size of one of them changes. Whatever changes the data_size of a tree
+must call forget_order on it: AbstractTree._adjust_size, _pass_up and
+ArrayTree._adjust_size do. The order goes when the folder does.
+"""
+import math
+
+
+def squarify_rect(tree, rect):
+    """Lay out the non-empty subtrees of <tree> in <rect>, in proportion to
+    their data_size, with the squarified algorithm.
+
+    Return each subtree with its rectangle, in the order of tree._subtrees,
+    as _slice_rect does. The empty subtrees, which are not shown, are given
+    a rectangle with no area.
+
+    Precondition: the data_size of <tree> is not zero.
+
+    @type tree: AbstractTree | ArrayNode
+    @type rect: (int, int, int, int)
+    @rtype: list[(AbstractTree | ArrayNode, (int, int, int, int))]
+
+    >>> from tree_data import AbstractTree
+    >>> A = AbstractTree('A', [AbstractTree('f' + str(size), [], size)
+    ...                        for size in (1, 6, 3, 6, 2, 4, 2)])
+    >>> for subtree, sub_rect in squarify_rect(A, (0, 0, 600, 400)):
+    ...     print(subtree._root, sub_rect)
+    f1 (540, 233, 60, 167)
+    f6 (0, 0, 300, 200)
+    f3 (471, 0, 129, 233)
+    f6 (0, 200, 300, 200)
+    f2 (300, 233, 120, 167)
+    f4 (300, 0, 171, 233)
+    f2 (420, 233, 120, 167)
+    """
+    x, y, width, height = rect
+    empty = (x, y, 0, 0)
+    order = sorted_subtrees(tree)
+    total = tree.data_size
+    placed = dict()
+    start = 0
+    while start < len(order):
+        # Lay the next row along the shorter side, as a column on the left
+        # if the rectangle is wider than it is tall, or as a row along the
+        # top otherwise, like a slice of _slice_rect.
+        vertical = width > height
+        side, length = (height, width) if vertical else (width, height)
+        end = _row_end(order, start, side, length, total)
+        row_size = sum(subtree.data_size for subtree in order[start:end])
+        if end == len(order):
+            thickness = length
+        else:
+            thickness = math.floor(length * (row_size / total))
+        # Slice the row among its subtrees, rounding each one down.
+        position = y if vertical else x
+        left = side
+        remaining = row_size
+        for subtree in order[start:end - 1]:
+            sub_length = math.floor(left * (subtree.data_size / remaining))
+            if vertical:
+                placed[subtree] = (x, position, thickness, sub_length)
+            else:
+                placed[subtree] = (position, y, sub_length, thickness)
+            position += sub_length
+            left -= sub_length
+            remaining -= subtree.data_size
+        if vertical:
+            placed[order[end - 1]] = (x, position, thickness, left)
+            x += thickness
+            width -= thickness
+        else:
+            placed[order[end - 1]] = (position, y, left, thickness)
+            y += thickness
+            height -= thickness
+        total -= row_size
+        start = end
+    return [(subtree, placed.get(subtree, empty))
+            for subtree in tree._subtrees]
+
+
+def sorted_subtrees(tree):
+    """Return the non-empty subtrees of <tree>, largest first, and those of
+    the same size in the order they are in the tree.
+
+    The order is only sorted the first time it is asked for, or the first
+    time since forget_order was last called on <tree>. It must not be
+    changed.
+
+    @type tree: AbstractTree | ArrayNode
+    @rtype: list[AbstractTree | ArrayNode]
+
+    >>> from tree_data import AbstractTree
+    >>> A = AbstractTree('A', [AbstractTree('f1', [], 5),
+    ...                        AbstractTree('f2', [], 0),
+    ...                        AbstractTree('f3', [], 8)])
+    >>> [subtree._root for subtree in sorted_subtrees(A)]
+    ['f3', 'f1']
+    >>> sorted_subtrees(A) is sorted_subtrees(A)
+    True
+    """
+    order = tree._order
+    if order is None:
+        order = sorted((subtree for subtree in tree._subtrees
+                        if subtree.data_size),
+                       key=_size_of, reverse=True)
+        tree._order = order
+    return order
+
+
+def forget_order(tree):
+    """Forget the order of the subtrees of <tree>, because the data_size of
+    one of them has changed, or they have been replaced.
+
+    A change to the data_size of a tree changes its parent's too, so
+    calling this on every tree whose data_size changes, as _adjust_size
+    does, forgets exactly the orders which are out of date.
+
+    @type tree: AbstractTree | ArrayNode
+    @rtype: None
+    """
+    tree._order = None
+
+
+def _size_of(tree):
+    """Return the data_size of <tree>, to sort trees by.
+
+    @type tree: AbstractTree | ArrayNode
+    @rtype: int
+    """
+    return tree.data_size
+
+
+def _row_end(order, start, side, length, total):
+    """Helper function for squarify_rect. Return the position in <order>
+    just after the last subtree of the row which starts with <order>[start],
+    in a rectangle whose sides are <side>, along which the row is laid, and
+    <length>, in which the subtrees in <order> from <start> on have a total
+    data_size of <total>.
+
+    Subtrees are added to the row for as long as that does not make the
+    worst aspect ratio of the rectangles in it any worse.
+
+    @type order: list[AbstractTree | ArrayNode]
+    @type start: int
+    @type side: int
+    @type length: int
+    @type total: int
+    @rtype: int
+
+    >>> from tree_data import AbstractTree
+    >>> order = [AbstractTree('f', [], size) for size in (6, 6, 4, 3, 2)]
+    >>> _row_end(order, 0, 400, 600, 21)
+    2
+    """
+    # The area of the rectangle, in pixels, for each unit of data_size.
+    scale = side * length / total
+    if not scale:
+        # Every rectangle has no area, so they are all in one row.
+        return len(order)
+    end = start + 1
+    row_size = order[start].data_size
+    worst = _worst_ratio(row_size, row_size, row_size, side, scale)
+    while end < len(order):
+        # The subtrees are largest first, so the one added is the smallest.
+        smallest = order[end].data_size
+        ratio = _worst_ratio(order[start].data_size, smallest,
+                             row_size + smallest, side, scale)
+        if ratio > worst:
+            break
+        worst = ratio
+        row_size += smallest
+        end += 1
+    return end
+
+
+def _worst_ratio(largest, smallest, row_size, side, scale):
+    """Helper function for _row_end. Return the worst aspect ratio, the
+    longer side over the shorter, of the rectangles of a row whose largest
+    and smallest subtrees have data_size <largest> and <smallest>, and whose
+    total data_size is <row_size>, laid along a side <side> pixels long,
+    with <scale> pixels per unit of data_size.
+
+    @type largest: int
+    @type smallest: int
+    @type row_size: int
+    @type side: int
+    @type scale: float
+    @rtype: float
+
+    >>> _worst_ratio(4, 4, 4, 2, 1.0)
+    1.0
+    """
+    area = row_size * scale
+    squared = side * side
+    return max(squared * largest * scale / (area * area),
+               area * area / (squared * smallest * scale))
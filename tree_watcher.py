@@ -0,0 +1,443 @@
+"""Assignment 2: Watching the File System
+
+=== Module Description ===
+This module keeps a FileSystemTree in sync with the file system it was
+scanned from, using the inotify API of Linux.
+
+Every folder in the tree is watched. Whenever a file or folder is created,
+deleted, written to or renamed, the kernel queues an event, and
+TreeWatcher.poll turns the queued events into changes to the tree. Each
+change only updates the data_size of the changed node's ancestors, so it
+costs time proportional to the depth of the tree rather than a rescan.
+
+Events are applied in batches, one per call to poll. Within a batch, the
+events about the same entry are merged, so that a burst of writes to a file
+only updates the tree (and the treemap) once.
+
+Events name the entry they are about, so each watched folder which has had
+an event keeps its subtrees by name, and finding the subtree an event is
+about takes the same time however many files are beside it. Removing a
+subtree still takes time proportional to the number of its siblings, as
+AbstractTree._remove_subtree does.
+"""
+import ctypes
+import errno
+import os
+import stat
+import struct
+import sys
+
+from file_scanner import scan_file_system
+
+
+# Flags and event types, from <sys/inotify.h>.
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = 0o2000000
+
+# The events watched in every folder.
+_WATCH_MASK = (_IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO |
+               _IN_CREATE | _IN_DELETE | _IN_ONLYDIR)
+
+# The fixed-size part of struct inotify_event: wd, mask, cookie and len.
+_EVENT = struct.Struct('iIII')
+
+
+class TreeWatcher:
+    """Watches the file system underneath a FileSystemTree, and applies the
+    changes made to it to the tree.
+
+    === Private Attributes ===
+    @type _tree: FileSystemTree
+        The tree being kept in sync.
+    @type _path: str
+        The path of the folder <_tree> was scanned from.
+    @type _libc: ctypes.CDLL
+        The C library, which provides the inotify functions.
+    @type _fd: int
+        The inotify file descriptor, or -1 once it has been closed.
+    @type _folders: dict[int, FileSystemTree]
+        The folder node of each watch descriptor.
+    @type _watches: dict[FileSystemTree, int]
+        The watch descriptor of each folder node.
+    @type _names: dict[FileSystemTree,
+                       (list[FileSystemTree], int, dict[str, FileSystemTree])]
+        The subtrees of each watched folder which has had an event, by name,
+        along with the list of subtrees they were taken from, and its length
+        then.
+
+    === Representation Invariants ===
+    - _folders and _watches are inverses of each other, and hold every
+      folder in _tree.
+    - The subtrees by name of a folder in _names are up to date if its
+      _subtrees is still the same list, with the same length. Whatever else
+      changes the subtrees of a folder replaces the list, or adds or removes
+      one, so the names are only out of date if this TreeWatcher has not
+      kept them up to date.
+    """
+    def __init__(self, tree, path):
+        """Start watching every folder in <tree>, the FileSystemTree of the
+        folder at <path>.
+
+        Raise OSError if inotify is not available, or if the folders cannot
+        all be watched (e.g. because there are more than the system allows).
+
+        Precondition: <tree> is up to date with the folder at <path>.
+
+        @type self: TreeWatcher
+        @type tree: FileSystemTree
+        @type path: str
+        @rtype: None
+        """
+        if not sys.platform.startswith('linux'):
+            raise OSError(errno.ENOSYS, 'inotify is only available on Linux')
+        self._tree = tree
+        self._path = path
+        self._libc = ctypes.CDLL(None, use_errno=True)
+        self._fd = self._check(self._libc.inotify_init1(_IN_NONBLOCK |
+                                                        _IN_CLOEXEC))
+        self._folders = dict()
+        self._watches = dict()
+        self._names = dict()
+        try:
+            self._watch_tree(tree, path)
+        except OSError:
+            self.close()
+            raise
+
+    def fileno(self):
+        """Return the inotify file descriptor, which becomes readable when
+        there are events to poll.
+
+        @type self: TreeWatcher
+        @rtype: int
+        """
+        return self._fd
+
+    def close(self):
+        """Stop watching the file system. Closing it again does nothing.
+
+        @type self: TreeWatcher
+        @rtype: None
+        """
+        if self._fd < 0:
+            return
+        os.close(self._fd)
+        self._fd = -1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def poll(self):
+        """Apply every change queued since the last call to the tree, and
+        return the number of entries that changed.
+
+        This never blocks. A return value of 0 means that the tree, and so
+        its treemap, is unchanged.
+
+        @type self: TreeWatcher
+        @rtype: int
+        """
+        events = self._read_events()
+        # The (folder node, name) of each entry events were received about,
+        # in order. Their current state is only looked up once, after all the
+        # events have been seen.
+        dirty = dict()
+        # Renames are sent as a pair of events with the same cookie. The
+        # node moved away by the first is kept here until the second one.
+        moving = dict()
+        moved_to = set(cookie for _, mask, cookie, _ in events
+                       if mask & _IN_MOVED_TO)
+        changes = 0
+        for wd, mask, cookie, name in events:
+            if mask & _IN_Q_OVERFLOW:
+                # Some events were lost, so nothing is known to be in sync.
+                return self._rescan()
+            folder = self._folders.get(wd)
+            if mask & _IN_IGNORED:
+                # The folder is gone, and so is its watch.
+                self._forget(folder)
+            elif folder is None:
+                # The folder has been removed from the tree already.
+                continue
+            elif mask & _IN_MOVED_FROM and cookie in moved_to:
+                moving[cookie] = self._find_subtree(folder, name)
+                # In case the other half of the rename is never applied.
+                dirty[(folder, name)] = None
+            elif mask & _IN_MOVED_TO and moving.get(cookie) is not None:
+                self._move(moving.pop(cookie), folder, name)
+                changes += 1
+            else:
+                dirty[(folder, name)] = None
+        for folder, name in dirty:
+            # The folder may have been removed by an earlier change.
+            if folder in self._watches and self._update(folder, name):
+                changes += 1
+        return changes
+
+    def _read_events(self):
+        """Return every event queued on the inotify file descriptor, as
+        tuples of the watch descriptor, the event mask, the cookie and the
+        name of the entry.
+
+        @type self: TreeWatcher
+        @rtype: list[(int, int, int, str)]
+        """
+        data = b''
+        while True:
+            try:
+                chunk = os.read(self._fd, 65536)
+            except BlockingIOError:
+                break
+            if not chunk:
+                break
+            data += chunk
+        events = list()
+        position = 0
+        while position < len(data):
+            wd, mask, cookie, length = _EVENT.unpack_from(data, position)
+            position += _EVENT.size
+            name = data[position:position + length].rstrip(b'\0')
+            position += length
+            events.append((wd, mask, cookie, os.fsdecode(name)))
+        return events
+
+    def _update(self, folder, name):
+        """Bring the entry <name> in <folder> up to date with the file
+        system. Return True if the tree changed.
+
+        @type self: TreeWatcher
+        @type folder: FileSystemTree
+        @type name: str
+        @rtype: bool
+        """
+        path = os.path.join(self._node_path(folder), name)
+        try:
+            entry_stat = os.stat(path)
+        except OSError:
+            entry_stat = None
+        subtree = self._find_subtree(folder, name)
+
+        if entry_stat is not None and stat.S_ISREG(entry_stat.st_mode):
+            if subtree is not None and subtree not in self._watches:
+                # The file was already in the tree: only its size changes.
+                change = entry_stat.st_size - subtree.data_size
+                subtree._adjust_size(change)
+                return change != 0
+            self._remove(folder, subtree)
+            self._add(folder, type(folder)(name, [], entry_stat.st_size))
+            return True
+        elif entry_stat is not None and stat.S_ISDIR(entry_stat.st_mode):
+            if subtree in self._watches:
+                # Changes inside the folder have events of their own.
+                return False
+            self._remove(folder, subtree)
+            subtree = scan_file_system(path)
+            self._add(folder, subtree)
+            self._watch_tree(subtree, path)
+            return True
+        # The entry is gone, or is something which is neither a file nor a
+        # folder and so is not shown.
+        return self._remove(folder, subtree)
+
+    def _move(self, subtree, folder, name):
+        """Move <subtree>, which has been renamed, to the entry <name> in
+        <folder>.
+
+        The subtree itself is reused, along with the watches of any folders
+        in it.
+
+        @type self: TreeWatcher
+        @type subtree: FileSystemTree
+        @type folder: FileSystemTree
+        @type name: str
+        @rtype: None
+        """
+        # A rename replaces whatever had the new name.
+        self._remove(folder, self._find_subtree(folder, name))
+        if subtree._parent_tree is not None:
+            self._take_out(subtree._parent_tree, subtree)
+        subtree._root = sys.intern(name)
+        self._add(folder, subtree)
+
+    def _remove(self, folder, subtree):
+        """Remove <subtree> from <folder>, and stop watching the folders in
+        it. Return True if there was a subtree to remove.
+
+        @type self: TreeWatcher
+        @type folder: FileSystemTree
+        @type subtree: FileSystemTree | None
+        @rtype: bool
+        """
+        if subtree is None:
+            return False
+        self._take_out(folder, subtree)
+        stack = [subtree]
+        while stack:
+            node = stack.pop()
+            if node in self._watches:
+                # The watch is usually gone already, along with the folder,
+                # in which case this fails harmlessly.
+                self._libc.inotify_rm_watch(self._fd, self._watches[node])
+                self._forget(node)
+                stack.extend(node._subtrees)
+        return True
+
+    def _find_subtree(self, folder, name):
+        """Return the subtree of <folder> named <name>, or None if it has
+        none.
+
+        @type self: TreeWatcher
+        @type folder: FileSystemTree
+        @type name: str
+        @rtype: FileSystemTree | None
+        """
+        subtree = self._names_of(folder).get(name)
+        # A leaf deleted since is still in the list, but has no name.
+        if subtree is None or subtree._root != name:
+            return None
+        return subtree
+
+    def _names_of(self, folder):
+        """Return the subtrees of <folder> by name, finding them again if
+        they are out of date.
+
+        @type self: TreeWatcher
+        @type folder: FileSystemTree
+        @rtype: dict[str, FileSystemTree]
+        """
+        subtrees = folder._subtrees
+        entry = self._names.get(folder)
+        if entry is None or entry[0] is not subtrees or \
+                entry[1] != len(subtrees):
+            names = dict((subtree._root, subtree) for subtree in subtrees
+                         if subtree._root is not None)
+            entry = self._names[folder] = (subtrees, len(subtrees), names)
+        return entry[2]
+
+    def _add(self, folder, subtree):
+        """Add <subtree> to <folder>, keeping its subtrees by name up to
+        date.
+
+        @type self: TreeWatcher
+        @type folder: FileSystemTree
+        @type subtree: FileSystemTree
+        @rtype: None
+        """
+        names = self._names_of(folder)
+        folder._add_subtree(subtree)
+        names[subtree._root] = subtree
+        # A leaf is given a list of its own when it becomes a folder.
+        self._names[folder] = (folder._subtrees, len(folder._subtrees), names)
+
+    def _take_out(self, folder, subtree):
+        """Take <subtree> out of <folder>, keeping its subtrees by name up to
+        date.
+
+        @type self: TreeWatcher
+        @type folder: FileSystemTree
+        @type subtree: FileSystemTree
+        @rtype: None
+        """
+        names = self._names_of(folder)
+        folder._remove_subtree(subtree)
+        if names.get(subtree._root) is subtree:
+            del names[subtree._root]
+        self._names[folder] = (folder._subtrees, len(folder._subtrees), names)
+
+    def _forget(self, folder):
+        """Forget the watch of <folder>, if it has one.
+
+        @type self: TreeWatcher
+        @type folder: FileSystemTree | None
+        @rtype: None
+        """
+        wd = self._watches.pop(folder, None)
+        if wd is not None:
+            del self._folders[wd]
+        self._names.pop(folder, None)
+
+    def _rescan(self):
+        """Rescan the whole tree after events have been lost, and return the
+        number of changes, which is unknown and so counted as 1.
+
+        The root node is kept, so that the tree stays the same object.
+
+        @type self: TreeWatcher
+        @rtype: int
+        """
+        for wd in self._folders:
+            self._libc.inotify_rm_watch(self._fd, wd)
+        self._folders.clear()
+        self._watches.clear()
+        self._names.clear()
+        new_tree = scan_file_system(self._path)
+        for subtree in list(self._tree._subtrees):
+            self._tree._remove_subtree(subtree)
+        for subtree in new_tree._subtrees:
+            self._tree._add_subtree(subtree)
+        self._watch_tree(self._tree, self._path)
+        return 1
+
+    def _watch_tree(self, tree, path):
+        """Watch every folder in <tree>, the tree of <path>.
+
+        @type self: TreeWatcher
+        @type tree: FileSystemTree
+        @type path: str
+        @rtype: None
+        """
+        stack = [(tree, path)]
+        while stack:
+            node, node_path = stack.pop()
+            # Files with data are the only nodes known not to be folders.
+            # For the others, _IN_ONLYDIR makes the watch fail on files.
+            if node._subtrees or not node.data_size:
+                wd = self._libc.inotify_add_watch(
+                    self._fd, os.fsencode(node_path), _WATCH_MASK)
+                if wd >= 0:
+                    self._folders[wd] = node
+                    self._watches[node] = wd
+                elif ctypes.get_errno() != errno.ENOTDIR:
+                    self._check(wd)
+            stack.extend((subtree, os.path.join(node_path, subtree._root))
+                         for subtree in node._subtrees)
+
+    def _node_path(self, node):
+        """Return the path of <node>, which is in the tree being watched.
+
+        @type self: TreeWatcher
+        @type node: FileSystemTree
+        @rtype: str
+        """
+        names = list()
+        while node is not self._tree:
+            names.append(node._root)
+            node = node._parent_tree
+        names.reverse()
+        return os.path.join(self._path, *names)
+
+    def _check(self, result):
+        """Return <result>, the result of a C library call, or raise OSError
+        if it failed.
+
+        @type self: TreeWatcher
+        @type result: int
+        @rtype: int
+        """
+        if result < 0:
+            code = ctypes.get_errno()
+            raise OSError(code, os.strerror(code))
+        return result
+
@@ -12,9 +12,21 @@ concrete subclass, of course), rendering it to the user using pygame,
 and detecting user events like mouse clicks and key presses and responding
 to them.
 """
+import os
+import time
+
 import pygame
-from tree_data import FileSystemTree
+from file_scanner import scan_file_system, scan_file_system_threaded, \
+    rescan_file_system, ProgressiveScan
 from population import PopulationTree
+from tree_snapshot import save_snapshot, load_snapshot
+from tree_watcher import TreeWatcher
+from lazy_tree import lazy_scan, lazy_load_snapshot
+from array_tree import scan_array_tree
+from tree_colour import PathColours, ExtensionColours, DepthColours
+from tree_journal import TreeJournal
+from tree_layout import LayoutCache
+from latency_histogram import LatencyHistogram
 
 
 # Screen dimensions and coordinates
@@ -23,15 +35,45 @@ WIDTH = 1024
 HEIGHT = 768
 FONT_HEIGHT = 30                       # The height of the text display.
 TREEMAP_HEIGHT = HEIGHT - FONT_HEIGHT  # The height of the treemap display.
+TREEMAP_RECT = (0, 0, WIDTH, TREEMAP_HEIGHT)  # Where the treemap is drawn.
 
 # Font to use for the treemap program.
 FONT_FAMILY = 'Consolas'
 
-
-def run_visualisation(tree):
+# The least time between two checks for changes to a watched folder, in
+# milliseconds. The changes found by one check are all shown at once, so a
+# burst of changes only redraws the treemap once per frame.
+WATCH_INTERVAL = 1000 // 30
+# The least time between two redraws of the treemap of a scan in progress,
+# in milliseconds. Laying out a large tree takes a while, so this is longer.
+SCAN_INTERVAL = 250
+
+# The colour policies the user can switch between by pressing 'c'.
+COLOUR_POLICIES = [PathColours(), ExtensionColours(), DepthColours()]
+# How many deletions and size changes the user can undo.
+UNDO_LIMIT = 1000
+# When the user turns on level of detail by pressing 'l', folders with less
+# than this many pixels are drawn as one block, instead of their files.
+DETAIL_AREA = 100
+# Where the text is drawn, which is all that is redrawn when the mouse moves
+# over the treemap.
+TEXT_RECT = (0, TREEMAP_HEIGHT, WIDTH, FONT_HEIGHT)
+
+# The fonts loaded so far, by size. Finding a system font takes much longer
+# than drawing the text, so each one is only loaded once.
+_fonts = dict()
+
+
+def run_visualisation(tree, watcher=None, scan=None):
     """Display an interactive graphical display of the given tree's treemap.
 
+    If <watcher> is given, the display is kept up to date with the changes
+    it finds. If <scan> is given, <tree> is its tree, and the display is
+    redrawn as the scan goes on.
+
     @type tree: AbstractTree
+    @type watcher: TreeWatcher | None
+    @type scan: ProgressiveScan | None
     @rtype: None
     """
     # Setup pygame
@@ -39,13 +81,14 @@ def run_visualisation(tree):
     screen = pygame.display.set_mode((WIDTH, HEIGHT))
 
     # Render the initial display of the static treemap.
-    render_display(screen, tree, '')
+    layout = tree.layout(TREEMAP_RECT)
+    render_display(screen, tree, '', layout)
 
     # Start an event loop to respond to events.
-    event_loop(screen, tree)
+    event_loop(screen, tree, watcher, scan, layout)
 
 
-def render_display(screen, tree, text):
+def render_display(screen, tree, text, layout=None, squarified=False):
     """Render a treemap and text display to the given screen.
 
     Use the constants TREEMAP_HEIGHT and FONT_HEIGHT to divide the
@@ -55,15 +98,23 @@ def render_display(screen, tree, text):
     @type tree: AbstractTree
     @type text: str
         The text to render.
+    @type layout: TreeLayout | None
+        The layout of <tree> in TREEMAP_RECT, if it is already known.
+    @type squarified: bool
+        Whether to lay <tree> out with the squarified algorithm, if
+        <layout> is not given.
     @rtype: None
     """
     # First, clear the screen
     pygame.draw.rect(screen, pygame.color.THECOLORS['black'],
                      (0, 0, WIDTH, HEIGHT))
-    rect_lst = tree.generate_treemap((0, 0, WIDTH, TREEMAP_HEIGHT))
-    # Draw the rectangles.
-    for rect_i in rect_lst:
-        pygame.draw.rect(screen, rect_i[1], rect_i[0])
+    if layout is None:
+        layout = tree.layout(TREEMAP_RECT, squarified=squarified)
+    # Draw the rectangles. Those with no area cannot be seen, so they are
+    # skipped, without even looking up their colours.
+    for leaf, leaf_rect in layout:
+        if leaf_rect[2] and leaf_rect[3]:
+            pygame.draw.rect(screen, leaf.colour, leaf_rect)
     _render_text(screen, text)  # Display the text.
     # This must be called *after* all other pygame functions have run.
     pygame.display.flip()
@@ -77,7 +128,10 @@ def _render_text(screen, text):
     @rtype: None
     """
     # The font we want to use
-    font = pygame.font.SysFont(FONT_FAMILY, FONT_HEIGHT - 8)
+    font = _fonts.get(FONT_HEIGHT - 8)
+    if font is None:
+        font = pygame.font.SysFont(FONT_FAMILY, FONT_HEIGHT - 8)
+        _fonts[FONT_HEIGHT - 8] = font
     text_surface = font.render(text, 1, pygame.color.THECOLORS['white'])
 
     # Where to render the text_surface
@@ -85,7 +139,7 @@ def _render_text(screen, text):
     screen.blit(text_surface, text_pos)
 
 
-def event_loop(screen, tree):
+def event_loop(screen, tree, watcher=None, scan=None, layout=None):
     """Respond to events (mouse clicks, key presses) and update the display.
 
     Note that the event loop is an *infinite loop*: it continually waits for
@@ -93,23 +147,117 @@ def event_loop(screen, tree):
     of the visualisation or the tree itself, updating the display if necessary.
     This loop ends when the user closes the window.
 
+    If <watcher> is given, it is polled for changes to the tree whenever
+    there are no events, at most once every WATCH_INTERVAL milliseconds.
+    If <scan> is given, the listings it has made are added to the tree in
+    the same way, at most once every SCAN_INTERVAL milliseconds, and its
+    progress is shown while no leaf is selected.
+
+    If the user turns on level of detail, folders smaller than DETAIL_AREA
+    are shown as blocks, which can be selected but not changed. The user
+    can also switch between slicing folders and squarifying them.
+
+    If the user turns on hovering, the path and size of the leaf under the
+    mouse are shown as it moves, as if it had been clicked on, and the
+    selected leaf's, or the status, once it leaves the treemap. Only the
+    text is redrawn, and only when the leaf under the mouse changes. Each
+    update is timed in a LatencyHistogram, which is summed up when
+    hovering is turned off.
+
+    Middle-clicking on a folder zooms into it, so that only that folder is
+    shown, and the path of folders zoomed into is shown while no leaf is
+    selected. Backspace zooms back out of the last one. The layouts of the
+    folders zoomed into are kept in a LayoutCache, so going back to one of
+    them does not lay it out again, unless it has changed.
+
+    Deletions and size changes are recorded in a TreeJournal, so that the
+    last UNDO_LIMIT of them can be undone with Ctrl+Z and redone with
+    Ctrl+Y. The record is cleared whenever <watcher> or <scan> changes the
+    tree, since their changes cannot be undone.
+
+    The tree is laid out once after each change, and the same layout is
+    used both to draw the treemap and to find the leaf which is clicked on.
+    After the user changes a leaf, only the parts of the layout which have
+    moved are laid out again.
+
     @type screen: pygame.Surface
     @type tree: AbstractTree
+    @type watcher: TreeWatcher | None
+    @type scan: ProgressiveScan | None
+    @type layout: TreeLayout | None
+        The layout of <tree> in TREEMAP_RECT, if it is already known.
     @rtype: None
     """
     selected_leaf = None
-    rect_dict = tree.rect_dict((0, 0, WIDTH, TREEMAP_HEIGHT))
+    cache = LayoutCache()
+    # The folders zoomed into, starting from <tree>. The last one is shown.
+    zoomed = [tree]
+    if layout is None:
+        layout = tree.layout(TREEMAP_RECT)
+    cache.add(tree, layout)
+    last_refresh = pygame.time.get_ticks()
+    # The text shown when no leaf is selected.
+    status = ''
+    journal = TreeJournal(UNDO_LIMIT)
+    # The times taken to update the text while hovering is on, or None if
+    # it is off, and the leaf whose path is shown because the mouse is over
+    # it.
+    hover_times = None
+    hovered = None
 
     while True:
         # Wait for an event
         event = pygame.event.poll()
         if event.type == pygame.QUIT:
+            if scan:
+                scan.stop()
             return
 
+        # When nothing else is happening, check for changes to the tree.
+        elif event.type == pygame.NOEVENT and (watcher or scan):
+            interval = SCAN_INTERVAL if scan else WATCH_INTERVAL
+            waited = pygame.time.get_ticks() - last_refresh
+            if waited < interval:
+                # Sleep rather than spin, but wake up often enough to keep
+                # responding to events.
+                pygame.time.wait(min(interval - waited, WATCH_INTERVAL))
+                continue
+            last_refresh = pygame.time.get_ticks()
+            if scan:
+                try:
+                    changed = scan.poll()
+                    status = _scan_status(scan)
+                except OSError as error:
+                    changed = True
+                    status = 'Scan failed: ' + str(error)
+                if scan.done:
+                    # Show the final status once, then stop polling.
+                    changed = True
+                    scan = None
+            else:
+                changed = watcher.poll()
+            if changed:
+                journal.clear()
+                # There is no telling which folders have changed. The
+                # folders zoomed into may have been deleted too.
+                cache.clear()
+                while not _in_tree(zoomed[-1], tree):
+                    zoomed.pop()
+                layout = cache.layout(zoomed[-1], TREEMAP_RECT,
+                                      layout.min_area, layout.squarified)
+                # The selected file may have been deleted.
+                if selected_leaf and not _in_tree(selected_leaf, tree):
+                    selected_leaf = None
+                if selected_leaf:
+                    _display_helper(screen, tree, selected_leaf, layout)
+                else:
+                    render_display(screen, tree,
+                                   _zoom_text(zoomed, status), layout)
+
         # When the user left-clicks on a file.
         elif event.type == pygame.MOUSEBUTTONUP and event.button == 1:
             # Here, temp will be None if the screen is all black.
-            temp = _get_selected(event.pos, rect_dict)
+            temp = layout.leaf_at(event.pos)
             # If nothing is selected i.e. the whole screen appears black or
             # the user clicks on the text box, nothing should happen.
             if not temp:
@@ -117,90 +265,267 @@ def event_loop(screen, tree):
             # If it is the first click on the selected_leaf.
             elif temp != selected_leaf:
                 selected_leaf = temp
-                # Update the screen according to user's action.
-                _display_helper(screen, tree, selected_leaf)
+                # Update the screen according to user's action. The tree has
+                # not changed, so neither has its layout.
+                _display_helper(screen, tree, selected_leaf, layout)
             # If user clicks on the selected leaf again, make the current
             # selected leaf unselected.
             else:
-                render_display(screen, tree, '')
+                render_display(screen, tree, _zoom_text(zoomed, status),
+                               layout)
                 selected_leaf = None
 
         # When the user right_clicks on a file
         elif event.type == pygame.MOUSEBUTTONUP and event.button == 3:
             # Similarly, temp will be None if nothing is
             # displayed through screen.
-            temp = _get_selected(event.pos, rect_dict)
+            temp = layout.leaf_at(event.pos)
             # Only operate when temp is not None i.e. a leaf is
             # selected. Here, I use pass because I want to simplify the
-            # conditions of the following 'elif' statement.
-            if not temp:
+            # conditions of the following 'elif' statement. The block of a
+            # folder shown in less detail cannot be deleted either.
+            if not temp or temp._subtrees:
                 pass
             # If selected_leaf is not the leaf currently deleted by user and
             # is not None, then the text rendered below will not be changed.
             elif selected_leaf and temp != selected_leaf:
-                temp.del_leaf()
-                # Update the rect_dict in order to sync the position of each
-                # leaf.
-                rect_dict = tree.rect_dict((0, 0, WIDTH, TREEMAP_HEIGHT))
+                parent = temp._parent_tree
+                journal.del_leaf(temp)
+                # Lay the tree out again in order to sync the position of
+                # each leaf.
+                cache.relayout(layout, zoomed[-1], parent)
                 # Update the screen according to user's action. Here, text will
                 # not change.
-                _display_helper(screen, tree, selected_leaf)
+                _display_helper(screen, tree, selected_leaf, layout)
             # If selected_leaf is already None or it is exactly the same leaf
             # user is trying to delete, then display no text and set the
             # selected_leaf to None.
             else:
-                temp.del_leaf()
+                parent = temp._parent_tree
+                journal.del_leaf(temp)
+                selected_leaf = None
+                cache.relayout(layout, zoomed[-1], parent)
+                render_display(screen, tree, _zoom_text(zoomed, status),
+                               layout)
+
+        # When the user middle-clicks on a folder, zoom into it.
+        elif event.type == pygame.MOUSEBUTTONUP and event.button == 2:
+            folder = _zoom_target(layout.leaf_at(event.pos), zoomed[-1])
+            if folder is not None:
+                zoomed.append(folder)
+                layout = cache.layout(folder, TREEMAP_RECT, layout.min_area,
+                                      layout.squarified)
+                # The selected leaf may not be in the folder.
                 selected_leaf = None
-                rect_dict = tree.rect_dict((0, 0, WIDTH, TREEMAP_HEIGHT))
-                render_display(screen, tree, '')
+                render_display(screen, tree, _zoom_text(zoomed, status),
+                               layout)
+
+        # When the user presses Backspace, zoom out of the last folder
+        # zoomed into.
+        elif (event.type == pygame.KEYUP and event.key == pygame.K_BACKSPACE
+              and len(zoomed) > 1):
+            zoomed.pop()
+            layout = cache.layout(zoomed[-1], TREEMAP_RECT, layout.min_area,
+                                  layout.squarified)
+            if selected_leaf:
+                _display_helper(screen, tree, selected_leaf, layout)
+            else:
+                render_display(screen, tree, _zoom_text(zoomed, status),
+                               layout)
+
+        # When the user presses 'c', colour the treemap another way.
+        elif event.type == pygame.KEYUP and event.key == pygame.K_c:
+            # The colours are not part of the layout, so it is still valid.
+            policy = _next_colour_policy(tree)
+            if selected_leaf:
+                _display_helper(screen, tree, selected_leaf, layout)
+            else:
+                render_display(screen, tree, 'Colours: by ' + policy.name,
+                               layout)
+
+        # When the user presses 'l', turn level of detail on or off.
+        elif event.type == pygame.KEYUP and event.key == pygame.K_l:
+            min_area = 0 if layout.min_area else DETAIL_AREA
+            layout = cache.layout(zoomed[-1], TREEMAP_RECT, min_area,
+                                  layout.squarified)
+            if selected_leaf:
+                _display_helper(screen, tree, selected_leaf, layout)
+            else:
+                render_display(screen, tree, 'Level of detail: ' +
+                               ('on' if min_area else 'off'), layout)
+
+        # When the user presses 's', switch between slicing and squarifying
+        # the folders.
+        elif event.type == pygame.KEYUP and event.key == pygame.K_s:
+            squarified = not layout.squarified
+            layout = cache.layout(zoomed[-1], TREEMAP_RECT, layout.min_area,
+                                  squarified)
+            if selected_leaf:
+                _display_helper(screen, tree, selected_leaf, layout)
+            else:
+                render_display(screen, tree, 'Layout: ' + (
+                    'squarified' if squarified else 'slices'), layout)
+
+        # When the user presses Ctrl+Z or Ctrl+Y, undo or redo the last
+        # deletion or size change.
+        elif (event.type == pygame.KEYUP and event.mod & pygame.KMOD_CTRL and
+              event.key in (pygame.K_z, pygame.K_y)):
+            if event.key == pygame.K_z:
+                changed = journal.undo()
+            else:
+                changed = journal.redo()
+            if changed:
+                # A leaf whose deletion has been redone is no longer in the
+                # tree, so the whole tree is laid out again. The leaf may
+                # not be in the folder shown either, in which case it is not
+                # laid out at all.
+                cache.relayout(layout, zoomed[-1], changed)
+                # The selected leaf may have been deleted again.
+                if selected_leaf and selected_leaf.is_empty():
+                    selected_leaf = None
+                if selected_leaf:
+                    _display_helper(screen, tree, selected_leaf, layout)
+                else:
+                    render_display(screen, tree, _zoom_text(zoomed, status),
+                                   layout)
+
+        # When the user presses 'h', turn hovering on or off.
+        elif event.type == pygame.KEYUP and event.key == pygame.K_h:
+            if hover_times is None:
+                hover_times = LatencyHistogram()
+                text = 'Hover: on'
+            else:
+                text = 'Hover: off, ' + hover_times.summary()
+                hover_times = None
+            hovered = None
+            _render_text_strip(screen, text)
+
+        # When the mouse moves while hovering is on, show the leaf under it.
+        elif event.type == pygame.MOUSEMOTION and hover_times is not None:
+            start = time.perf_counter()
+            # Only where the mouse is now matters, so the movements which
+            # have queued up while the last one was being handled are
+            # skipped.
+            moves = pygame.event.get(pygame.MOUSEMOTION)
+            temp = layout.leaf_at(moves[-1].pos if moves else event.pos)
+            if temp != hovered:
+                hovered = temp
+                if temp:
+                    text = _leaf_text(temp)
+                elif selected_leaf:
+                    text = _leaf_text(selected_leaf)
+                else:
+                    text = _zoom_text(zoomed, status)
+                _render_text_strip(screen, text)
+                hover_times.add(time.perf_counter() - start)
 
         # When user presses the up arrow or down arrow.
-        # Only operate when a leaf is selected.
-        elif event.type == pygame.KEYUP and selected_leaf:
+        # Only operate when a leaf is selected, not the block of a folder.
+        elif (event.type == pygame.KEYUP and selected_leaf and
+              not selected_leaf._subtrees):
             if event.key == pygame.K_UP:
                 # Increase the size by one percent.
-                selected_leaf.alt_size()
+                journal.alt_size(selected_leaf)
             elif event.key == pygame.K_DOWN:
                 # Decrease the size by one percent.
-                selected_leaf.alt_size(positive=False)
-            # Update the rect_dict.
-            rect_dict = tree.rect_dict((0, 0, WIDTH, TREEMAP_HEIGHT))
+                journal.alt_size(selected_leaf, positive=False)
+            # Lay out again the parts of the tree which have moved.
+            cache.relayout(layout, zoomed[-1], selected_leaf)
             # Update the screen.
-            _display_helper(screen, tree, selected_leaf)
+            _display_helper(screen, tree, selected_leaf, layout)
+
 
+def _next_colour_policy(tree):
+    """Switch every tree of the same kind as <tree> to the colour policy
+    after the one it uses in COLOUR_POLICIES, and return the new policy.
 
-def _get_selected(pos, rect_dict):
-    """This is a helper method used to return the AbstractTree that is selected
-    by the user. Used by the treemap visualiser to keep track of the currently
-    selected leaf.
+    @type tree: AbstractTree | ArrayNode
+    @rtype: ColourPolicy
+    """
+    # The policy is a class attribute, so set it on the class it comes from,
+    # which the other classes in the tree (e.g. the files of a lazy tree)
+    # share.
+    owner = next(cls for cls in type(tree).__mro__
+                 if 'colour_policy' in vars(cls))
+    names = [policy.name for policy in COLOUR_POLICIES]
+    index = -1
+    if owner.colour_policy.name in names:
+        index = names.index(owner.colour_policy.name)
+    owner.colour_policy = COLOUR_POLICIES[(index + 1) % len(names)]
+    return owner.colour_policy
+
+
+def _scan_status(scan):
+    """Return the text describing the progress of <scan>.
+
+    @type scan: ProgressiveScan
+    @rtype: str
+    """
+    if scan.done:
+        return ''
+    return ('Scanning... ' + str(scan.folders) + ' folders, ' +
+            str(scan.files) + ' files')
 
-    Return None if it is an empty tree or the total data size is zero i.e.
-    when it displays nothing through visualiser.
 
-    The parameter pos is always within the boundry of treemap visualiser's
-    screen.
-    If rect_dict is not empty, then pos is always in the dictionary. (Within
-    the boundry of pygame rectangles contained in the dictionary.) Except the
-    user clicks on the text box, return None in this case.
+def _in_tree(leaf, tree):
+    """Return True if <leaf> is still part of <tree>.
 
-    @type pos: (int, int)
-        This tuple represents the coordinate of the event induced by
-        cursor's action.
-    @type rect_dict: dict [tuple, AbstractTree]
-        The key represents the pygame rectangle and the value represents
-        the corresponding AbstractTree i.e. non-empty leaf.
-    @rtype: AbstractTree | None
+    @type leaf: AbstractTree
+    @type tree: AbstractTree
+    @rtype: bool
     """
-    # If rect_dict is an empty dictionary, will skip the loop and return None.
-    for rect in rect_dict:
-        x, y, width, height = rect
-        # If the pos of event is in the range of a rectangle, return the
-        # corresponding AbstractTree.
-        if x <= pos[0] <= x + width and y <= pos[1] <= y + height:
-            return rect_dict[rect]
+    # Removed and deleted nodes have no parent tree.
+    while leaf._parent_tree is not None:
+        leaf = leaf._parent_tree
+    return leaf is tree
+
+
+def _zoom_target(leaf, folder):
+    """Return the subtree of <folder> which <leaf> is in, if it is a folder
+    which can be zoomed into, or None otherwise.
+
+    @type leaf: AbstractTree | ArrayNode | None
+        A leaf, or a block, of the layout of <folder>.
+    @type folder: AbstractTree | ArrayNode
+    @rtype: AbstractTree | ArrayNode | None
+
+    >>> from tree_data import AbstractTree
+    >>> f1 = AbstractTree('f1', [], 15)
+    >>> B = AbstractTree('B', [f1])
+    >>> A = AbstractTree('A', [B, AbstractTree('f2', [], 5)])
+    >>> _zoom_target(f1, A) is B, _zoom_target(f1, B)
+    (True, None)
+    """
+    if leaf is None or leaf == folder:
+        return None
+    while leaf._parent_tree != folder:
+        leaf = leaf._parent_tree
+    # A block of a folder shown in less detail can be zoomed into too.
+    if not leaf._subtrees:
+        return None
+    return leaf
+
+
+def _zoom_text(zoomed, status):
+    """Return the text to show when no leaf is selected: the path of the
+    folders in <zoomed>, if any have been zoomed into, or else <status>.
+
+    @type zoomed: list[AbstractTree | ArrayNode]
+    @type status: str
+    @rtype: str
+
+    >>> from tree_data import AbstractTree
+    >>> B = AbstractTree('B', [AbstractTree('f1', [], 15)])
+    >>> A = AbstractTree('A', [B])
+    >>> _zoom_text([A], 'Done'), _zoom_text([A, B], 'Done')
+    ('Done', 'A > B')
+    """
+    if len(zoomed) == 1:
+        return status
+    return ' > '.join(str(folder._root) for folder in zoomed)
 
 
-def _display_helper(screen, tree, selected_leaf):
+def _display_helper(screen, tree, selected_leaf, layout=None):
     """Helper function for displaying or updating the change of tree according
     to user's action on the screen.
 
@@ -209,22 +534,140 @@ def _display_helper(screen, tree, selected_leaf):
     @type screen: Pygame.Surface
     @type tree: AbstractTree
     @type selected_leaf: AbstractTree
+    @type layout: TreeLayout | None
+        The layout of <tree> in TREEMAP_RECT, if it is already known.
+    """
+    render_display(screen, tree, _leaf_text(selected_leaf), layout)
+
+
+def _leaf_text(leaf):
+    """Return the text shown for <leaf>: its path and its size.
+
+    @type leaf: AbstractTree | ArrayNode
+    @rtype: str
     """
-    txt = selected_leaf.get_separator()
-    prompt = '(' + str(selected_leaf.data_size) + ')'
-    render_display(screen, tree, txt + prompt)
+    txt = leaf.get_separator()
+    prompt = '(' + str(leaf.data_size) + ')'
+    return txt + prompt
 
 
-def run_treemap_file_system(path):
+def _render_text_strip(screen, text):
+    """Replace the text at the bottom of the display with <text>, without
+    drawing the treemap again, and show only that part of the display.
+
+    @type screen: pygame.Surface
+    @type text: str
+    @rtype: None
+    """
+    pygame.draw.rect(screen, pygame.color.THECOLORS['black'], TEXT_RECT)
+    _render_text(screen, text)
+    pygame.display.update(TEXT_RECT)
+
+
+def run_treemap_file_system(path, workers=None, snapshot=None, watch=False,
+                            lazy=False, rules=None):
     """Run a treemap visualisation for the given path's file structure.
 
+    If <workers> is given, folders are listed in parallel on that many
+    threads, which is faster on network file systems and fast disks.
+
+    If <snapshot> is given, the scanned tree is also saved to that snapshot
+    file, so that it can be opened again with run_treemap_snapshot without
+    scanning. If the snapshot file already exists, it is loaded instead of
+    scanning <path>, and only the folders that have changed since it was
+    saved are listed again. <workers> is not used in this case.
+
+    If <watch> is True, the treemap is kept up to date as files and folders
+    under <path> are changed. This is only available on Linux.
+
+    If <lazy> is True, only the total size of each folder is read up front,
+    and folders are listed when they first need to be drawn. This uses far
+    less memory for large folders. <watch> is not used in this case.
+
+    Otherwise, if neither <workers> nor <snapshot> is given, the folder is
+    scanned in the background, and the treemap is shown and redrawn while
+    the scan goes on.
+
+    If <rules> is given, the files and folders it leaves out are not
+    scanned. It is not used for <lazy> trees, or for the changes found in
+    <watch> mode.
+
+    Precondition: <path> is a valid path to a file or folder. If <snapshot>
+                  exists, it was saved by this function for the same <path>.
+
+    @type path: str
+    @type workers: int | None
+    @type snapshot: str | None
+    @type watch: bool
+    @type lazy: bool
+    @type rules: ScanFilter | None
+    @rtype: None
+    """
+    stamps = dict()
+    if snapshot and os.path.exists(snapshot):
+        file_tree = load_snapshot(snapshot, stamps)
+        rescan_file_system(file_tree, path, stamps, rules)
+    elif snapshot:
+        file_tree = scan_file_system(path, stamps, rules)
+    elif workers:
+        file_tree = scan_file_system_threaded(path, workers, rules)
+    elif lazy:
+        file_tree = lazy_scan(path)
+    elif watch:
+        file_tree = scan_file_system(path, rules=rules)
+    else:
+        scan = ProgressiveScan(path, rules)
+        run_visualisation(scan.tree, scan=scan)
+        return
+    if snapshot:
+        save_snapshot(file_tree, snapshot, stamps)
+    if watch and not lazy:
+        with TreeWatcher(file_tree, path) as watcher:
+            run_visualisation(file_tree, watcher)
+    else:
+        run_visualisation(file_tree)
+
+
+def run_treemap_snapshot(filename, lazy=False):
+    """Run a treemap visualisation for a file structure saved in a snapshot
+    file by run_treemap_file_system.
+
+    If <lazy> is True, folders are only read from the snapshot when they
+    first need to be drawn, so large snapshots open faster.
+
+    Precondition: <filename> is a snapshot file.
+
+    @type filename: str
+    @type lazy: bool
+    @rtype: None
+    """
+    if lazy:
+        run_visualisation(lazy_load_snapshot(filename))
+    else:
+        run_visualisation(load_snapshot(filename))
+
+
+def run_treemap_array(path, vectorised=False):
+    """Run a treemap visualisation for the given path's file structure,
+    stored in an ArrayTree.
+
+    This uses a small fraction of the memory of the other ways of running
+    the visualisation, for folders with millions of files.
+
+    If <vectorised> is True, the treemap is laid out with NumPy, which is
+    faster for trees with many folders. NumPy is only needed then.
+
     Precondition: <path> is a valid path to a file or folder.
 
     @type path: str
+    @type vectorised: bool
     @rtype: None
     """
-    file_tree = FileSystemTree(path)
-    run_visualisation(file_tree)
+    root = scan_array_tree(path).root()
+    if vectorised:
+        from array_layout import VectorisedNode
+        root = VectorisedNode(root._tree, root._index)
+    run_visualisation(root)
 
 
 def run_treemap_population():